@@ -0,0 +1,220 @@
+# batch_render.py
+# Headless batch renderer for comparing player looks side by side: each job sets a rotation, squish, zoom, light
+# direction and config overrides (PLAYER_SCALE, CULLING_THRESHOLD, PLAYER_RENDER_BACKEND, ...), and is drawn
+# offscreen with the game's player pipeline (model, LOD selection, draw_player backends) on a pool of worker
+# processes. Writes one PNG per job, a labelled contact sheet and a manifest, and reports images per second, so
+# it doubles as a rendering benchmark (--repeat N for longer runs).
+# Usage: python batch_render.py [JOBS.json|.jsonl] [--vary squish=0.6,1,1.4 --vary PLAYER_SCALE=0.8,1.2 ...]
+#        [--out renders] [--size 320x320] [--ground] [--jobs N] [--repeat N] [--model MODEL.vox]
+# A job is a JSON object; every field is optional:
+#   {"name": "squashed", "rotation": [w, x, y, z] or {"axis": [x, y, z], "degrees": a}, "yaw": deg, "tilt": deg,
+#    "squish": 1.0, "zoom": 1.0, "light": [x, y, z], "params": {"PLAYER_SCALE": 1.2, "CULLING_THRESHOLD": 0.1}}
+# yaw/tilt (about z, then x) are applied on top of rotation.
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy") # Offscreen only; workers inherit this
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import sys
+import time
+import pygame
+import game_config as cfg
+import voxel
+from voxel_math import normalize_vector, quat_from_axis_angle, quat_mult
+
+JOB_FIELDS = ("name", "rotation", "yaw", "tilt", "squish", "zoom", "light", "params")
+VARY_FIELDS = ("yaw", "tilt", "squish", "zoom") # --vary names that are job fields; anything else is a config override
+DEFAULT_LIGHT = tuple(voxel.light_direction)
+
+# --- Jobs ---
+def load_jobs(path):
+    """Jobs from a JSON list or a JSONL file (one job per line)."""
+    with open(path) as f: text = f.read()
+    if text.lstrip().startswith("["): return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+def parse_vary(spec):
+    """NAME=a,b,c -> (NAME, [values]); numbers are parsed, anything else is kept as a string."""
+    name, sep, values = spec.partition("=")
+    if not sep or not values: raise ValueError(f"expected NAME=a,b,c, not '{spec}'")
+    def value(v):
+        try: return json.loads(v)
+        except ValueError: return v
+    return name.strip(), [value(v.strip()) for v in values.split(",")]
+
+def expand_jobs(base_jobs, varies):
+    """Every base job crossed with every combination of the --vary values."""
+    jobs = []
+    for base in base_jobs:
+        for combo in itertools.product(*(values for _, values in varies)):
+            job = dict(base, params=dict(base.get("params", {})))
+            for (name, _), v in zip(varies, combo):
+                if name in VARY_FIELDS: job[name] = v
+                else: job["params"][name] = v
+            jobs.append(job)
+    return jobs
+
+def setting_name(key):
+    """voxel module global a config key (or the global's own name) overrides."""
+    name = voxel.CONFIG_KEY_GLOBALS.get(key, (key, None))[0]
+    if (name.isupper() or name.endswith("_cfg")) and hasattr(voxel, name): return name
+    raise ValueError(f"unknown setting {key!r}")
+
+def validate_job(job):
+    unknown = set(job) - set(JOB_FIELDS)
+    if unknown: raise ValueError(f"unknown job fields {sorted(unknown)} (expected {', '.join(JOB_FIELDS)})")
+    for key in job.get("params", {}): setting_name(key)
+    job_rotation(job)
+
+def job_rotation(job):
+    rotation = job.get("rotation", (1.0, 0.0, 0.0, 0.0))
+    if isinstance(rotation, dict): rotation = quat_from_axis_angle(normalize_vector(rotation["axis"]), math.radians(rotation["degrees"]))
+    elif len(rotation) != 4: raise ValueError(f"rotation must be [w, x, y, z] or {{axis, degrees}}, not {rotation!r}")
+    yaw, tilt = math.radians(job.get("yaw", 0.0)), math.radians(job.get("tilt", 0.0))
+    if yaw or tilt: rotation = quat_mult(quat_from_axis_angle((0, 0, 1), yaw), quat_mult(quat_from_axis_angle((1, 0, 0), tilt), rotation))
+    return normalize_vector(rotation)
+
+def job_label(job):
+    if job.get("name"): return str(job["name"])
+    parts = [f"{field} {job[field]:g}" for field in ("yaw", "tilt", "squish", "zoom") if field in job]
+    parts += [f"{key.replace('PLAYER_', '').lower()} {value}" for key, value in job.get("params", {}).items()]
+    return ", ".join(parts) or "default"
+
+# --- Worker ---
+worker = {} # Per process: lods by PLAYER_LOD_MAX_LEVELS, background, size, ground, light of the last ground drawn
+
+def init_worker(size, background, ground):
+    """Pool initializer: the game's startup for the player, in this process. Drawing to surfaces and saving PNGs
+    need no pygame.init(), which would also install SDL's SIGTERM handler and stop Pool.terminate() ending us."""
+    cfg.persist = False # Workers never write settings
+    voxel.load_physics_params_from_config()
+    voxel.quality_governor.set_level(0) # Previews are at full quality, whatever the game last settled on
+    voxel.player_voxel_model = voxel.load_player_voxel_model()
+    worker.update(size=size, background=background, ground=ground, light=None, lods={voxel.PLAYER_LOD_MAX_LEVELS: voxel.build_player_lods(voxel.player_voxel_model)})
+    if ground: voxel.build_terrain()
+
+def set_setting(key, value):
+    """Sets the global a config key overrides and drops the caches it makes stale, as a config reload would;
+    returns its previous value."""
+    name = setting_name(key)
+    old = getattr(voxel, name)
+    if name == "VOXEL_SIZE": voxel.set_voxel_size(value)
+    else:
+        convert = voxel.CONFIG_KEY_GLOBALS.get(key, (name, None))[1]
+        setattr(voxel, name, convert(value) if convert else value)
+    config_key = next((k for k, (n, _) in voxel.CONFIG_KEY_GLOBALS.items() if n == name), name)
+    stale = set(voxel.CONFIG_KEY_INVALIDATES.get(config_key, ())) - {"lods"} # worker["lods"] is already per PLAYER_LOD_MAX_LEVELS
+    if "terrain" in stale and not worker["ground"]: stale.remove("terrain") # Only drawn with --ground
+    if stale: voxel.invalidate_config_caches(stale)
+    return old
+
+def render_job(surf, job):
+    """Draws one job into surf as main() would draw the player (and, with --ground, the terrain under it)."""
+    current_zoom, squish = float(job.get("zoom", 1.0)), float(job.get("squish", 1.0))
+    voxel.light_direction = list(normalize_vector(job.get("light", DEFAULT_LIGHT)))
+    lods = worker["lods"].get(voxel.PLAYER_LOD_MAX_LEVELS)
+    if lods is None: lods = worker["lods"][voxel.PLAYER_LOD_MAX_LEVELS] = voxel.build_player_lods(voxel.player_voxel_model)
+    level = voxel.select_player_lod(0, voxel.player_voxel_px(current_zoom), len(lods)) # As zooming out from full detail
+    level = min(len(lods) - 1, level + voxel.quality_settings()["lod_bias"]) if voxel.PLAYER_LOD_ENABLED else 0
+    pos = (0.0, 0.0, 0.0)
+    if worker["ground"]: # Resting on the terrain, like a fresh BlobPhysics
+        surface_z = voxel.terrain.surface_z_below(0.0, 0.0, math.inf)
+        pos = (0.0, 0.0, (voxel.GROUND_LEVEL_Z if surface_z is None else surface_z) + voxel.player_model_radius(voxel.player_voxel_model) * voxel.PLAYER_SCALE_cfg)
+    sx, sy = voxel.project_iso(*pos, current_zoom)
+    origin = (surf.get_width() / 2 - sx, surf.get_height() / 2 - sy) # Player centre in the middle of the image
+    if worker["ground"]:
+        if worker["light"] != voxel.light_direction: voxel.ground_tiles.invalidate(); worker["light"] = voxel.light_direction # As the game does on a light change
+        voxel.render_ground_tile(surf, current_zoom, pygame.Rect(-int(origin[0]), -int(origin[1]), *surf.get_size()))
+    else: surf.fill(worker["background"])
+    voxel.draw_player(surf, lods[level], pos, job_rotation(job), squish, current_zoom, (int(origin[0]), int(origin[1])))
+    return level
+
+def run_job(item):
+    """Pool worker: (index, job, path) -> manifest entry."""
+    index, job, path = item
+    previous = {}
+    try:
+        for key, value in job.get("params", {}).items(): previous.setdefault(key, set_setting(key, value))
+        surf = pygame.Surface(worker["size"])
+        start = time.perf_counter()
+        level = render_job(surf, job)
+        render_ms = (time.perf_counter() - start) * 1000.0
+        start = time.perf_counter()
+        pygame.image.save(surf, path)
+        save_ms = (time.perf_counter() - start) * 1000.0
+    finally:
+        for key, value in previous.items(): set_setting(key, value) # Jobs must not leak into the next one on this worker
+    return {"index": index, "job": job, "label": job_label(job), "path": path, "lod_level": level, "render_ms": render_ms, "save_ms": save_ms, "pid": os.getpid()}
+
+# --- Contact sheet ---
+def build_contact_sheet(entries, path, thumb_width, columns, background):
+    """Grid of the rendered images, scaled to thumb_width, each labelled underneath."""
+    if not entries: return
+    first = pygame.image.load(entries[0]["path"])
+    thumb_size = (thumb_width, max(1, round(first.get_height() * thumb_width / first.get_width())))
+    font = pygame.font.Font(None, 18)
+    label_h, pad = font.get_linesize() + 4, 6
+    columns = columns or math.ceil(math.sqrt(len(entries)))
+    rows = math.ceil(len(entries) / columns)
+    cell_w, cell_h = thumb_size[0] + pad, thumb_size[1] + label_h + pad
+    sheet = pygame.Surface((columns * cell_w + pad, rows * cell_h + pad)); sheet.fill(background)
+    for n, entry in enumerate(entries):
+        x, y = pad + (n % columns) * cell_w, pad + (n // columns) * cell_h
+        sheet.blit(pygame.transform.smoothscale(pygame.image.load(entry["path"]), thumb_size), (x, y))
+        label = entry["label"]
+        while len(label) > 3 and font.size(label)[0] > thumb_size[0]: label = label[:-4] + "..." # Trim to the thumbnail width
+        sheet.blit(font.render(label, True, voxel.TEXT_COLOR), (x, y + thumb_size[1] + 2))
+    pygame.image.save(sheet, path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Render player previews offscreen on all cores.")
+    parser.add_argument("job_file", nargs="?", help="JSON list or JSONL of render jobs (default: one default job)")
+    parser.add_argument("--vary", action="append", default=[], metavar="NAME=a,b,c",
+                        help=f"Cross every job with these values ({', '.join(VARY_FIELDS)} or a config key; repeatable)")
+    parser.add_argument("--out", default="renders", help="Output folder")
+    parser.add_argument("--size", default="320x320", help="Image WxH")
+    parser.add_argument("--background", default="30,30,30", help="R,G,B behind the player (without --ground)")
+    parser.add_argument("--ground", action="store_true", help="Draw the terrain under the player")
+    parser.add_argument("--model", default=None, help="Player model to use instead of PLAYER_MODEL_PATH")
+    parser.add_argument("--jobs", type=int, default=0, help="Worker processes (default: all cores)")
+    parser.add_argument("--repeat", type=int, default=1, help="Render the job list this many times (benchmarking)")
+    parser.add_argument("--thumb", type=int, default=160, help="Contact sheet thumbnail width")
+    parser.add_argument("--columns", type=int, default=0, help="Contact sheet columns (default: square-ish)")
+    args = parser.parse_args()
+
+    try:
+        jobs = load_jobs(args.job_file) if args.job_file else [{}]
+        jobs = expand_jobs(jobs, [parse_vary(spec) for spec in args.vary])
+        for job in jobs: validate_job(job)
+    except (OSError, ValueError, KeyError, TypeError) as e: parser.error(str(e))
+    size = tuple(int(v) for v in args.size.lower().split("x"))
+    background = tuple(int(v) for v in args.background.split(","))
+    if args.model: cfg.config["PLAYER_MODEL_PATH"] = args.model # In memory only; workers inherit it
+    cfg.persist = False
+
+    os.makedirs(args.out, exist_ok=True)
+    items = [(n, job, os.path.join(args.out, f"{n:04d}.png")) for n, job in enumerate(jobs * args.repeat)]
+    processes = args.jobs or os.cpu_count() or 1
+    entries, start = [], time.perf_counter()
+    with multiprocessing.Pool(processes, initializer=init_worker, initargs=(size, background, args.ground)) as pool:
+        for entry in pool.imap_unordered(run_job, items, chunksize=max(1, len(items) // (processes * 8))):
+            entries.append(entry)
+            if len(entries) % 50 == 0: print(f"\r{len(entries)}/{len(items)} images", end="", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    entries.sort(key=lambda e: e["index"])
+    pygame.init() # Only now: forked workers would inherit SDL's signal handlers
+
+    sheet_entries = entries[:len(jobs)] # One of each job, whatever --repeat was
+    build_contact_sheet(sheet_entries, os.path.join(args.out, "contact_sheet.png"), args.thumb, args.columns, background)
+    render_ms = sorted(e["render_ms"] for e in entries)
+    summary = {"images": len(entries), "processes": processes, "wall_s": elapsed, "images_per_s": len(entries) / elapsed if elapsed > 0 else 0.0,
+               "render_ms": {"mean": sum(render_ms) / len(render_ms), "p50": render_ms[len(render_ms) // 2], "max": render_ms[-1]},
+               "save_ms_mean": sum(e["save_ms"] for e in entries) / len(entries), "size": size, "ground": args.ground}
+    with open(os.path.join(args.out, "manifest.json"), "w") as f: json.dump({"summary": summary, "images": entries}, f, indent=2)
+    print(f"\r{len(entries)} images in {elapsed:.2f} s on {processes} processes: {summary['images_per_s']:.1f} images/s"
+          f" (render {summary['render_ms']['mean']:.1f} ms, png {summary['save_ms_mean']:.1f} ms per image) -> {args.out}/", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# bench_collision.py
+# Headless benchmark of blob collisions through the spatial hash: tick cost with collisions on against off, and
+# the cost of sphere and ray queries, as the number of blobs per unit of ground area grows. An all-pairs
+# NumPy check of the same blobs is timed alongside for comparison (up to --brute-max blobs).
+# Usage: python bench_collision.py [--count 2000] [--densities 0.5,1,2,4,8] [--counts 1000,4000,16000] [--ticks 120]
+import argparse
+import math
+import time
+import numpy as np
+from blob_world import BlobWorld
+from bench_physics import scripted_inputs
+
+def make_world(count, density, collisions, seed=0):
+    """count blobs scattered over a square sized for density blobs per 1000 square units of ground."""
+    rng = np.random.default_rng(seed)
+    half = math.sqrt(count / density * 1000.0) / 2.0
+    positions = np.column_stack((rng.uniform(-half, half, (count, 2)), rng.uniform(6.0, 20.0, count)))
+    return BlobWorld(count, positions=positions, collisions=collisions), rng, half
+
+def time_ticks(world, rng, ticks):
+    inputs = [scripted_inputs(rng, world.count, t) for t in range(min(ticks, 60))]
+    contacts, moves = 0, world.spatial_hash.cell_moves if world.spatial_hash else 0
+    start = time.perf_counter()
+    for t in range(ticks):
+        world.tick(**inputs[t % len(inputs)]); contacts += world.contacts
+    elapsed = (time.perf_counter() - start) / ticks
+    moves = (world.spatial_hash.cell_moves - moves) / ticks if world.spatial_hash else 0
+    return elapsed, contacts / ticks, moves
+
+def time_queries(world, rng, half, queries):
+    """(us per sphere query, us per ray query, us per brute-force NumPy sphere query) at random points."""
+    h, radius = world.spatial_hash, world.radius[0]
+    centres = np.column_stack((rng.uniform(-half, half, (queries, 2)), np.full(queries, radius))).tolist()
+    angles = rng.uniform(0, 2 * math.pi, queries)
+    directions = np.column_stack((np.cos(angles), np.sin(angles), np.zeros(queries))).tolist()
+    start = time.perf_counter()
+    for c in centres: h.query_sphere(c, radius)
+    sphere_us = (time.perf_counter() - start) * 1e6 / queries
+    start = time.perf_counter()
+    for c, d in zip(centres, directions): h.query_ray(c, d, 10 * radius)
+    ray_us = (time.perf_counter() - start) * 1e6 / queries
+    pos = world.pos
+    start = time.perf_counter()
+    for c in centres: np.flatnonzero(np.sum((pos - c) ** 2, axis=1) < (world.radius + radius) ** 2)
+    brute_us = (time.perf_counter() - start) * 1e6 / queries
+    return sphere_us, ray_us, brute_us
+
+def time_all_pairs(world, repeats=3):
+    """ms for one all-pairs overlap check of the world's blobs with NumPy (O(N^2) time and memory)."""
+    pos, r = world.pos, world.radius
+    start = time.perf_counter()
+    for _ in range(repeats):
+        d2 = np.sum((pos[:,None,:] - pos[None,:,:]) ** 2, axis=2)
+        np.count_nonzero(np.triu(d2 < (r[:,None] + r[None,:]) ** 2, 1))
+    return (time.perf_counter() - start) * 1000.0 / repeats
+
+def report(count, density, args):
+    plain, rng, _ = make_world(count, density, collisions=False)
+    plain_s, _, _ = time_ticks(plain, rng, args.ticks)
+    world, rng, half = make_world(count, density, collisions=True)
+    tick_s, contacts, moves = time_ticks(world, rng, args.ticks)
+    start = time.perf_counter(); pairs = sum(1 for _ in world.spatial_hash.candidate_pairs()); pairs_ms = (time.perf_counter() - start) * 1000.0
+    sphere_us, ray_us, brute_us = time_queries(world, rng, half, args.queries)
+    all_pairs = f"{time_all_pairs(world):>9.2f}" if count <= args.brute_max else f"{'-':>9}"
+    print(f"{count:>7} {density:>7.2f} {plain_s*1000:>8.2f} {tick_s*1000:>8.2f} {pairs_ms:>8.2f} {pairs / count:>7.2f} {contacts:>8.1f} {moves:>7.1f}"
+          f" {sphere_us:>8.1f} {ray_us:>8.1f} {brute_us:>8.1f} {all_pairs}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark spatial-hash collisions against blob density.")
+    parser.add_argument("--count", type=int, default=2000, help="Blobs for the density sweep")
+    parser.add_argument("--densities", default="0.5,1,2,4,8", help="Blobs per 1000 square units of ground")
+    parser.add_argument("--counts", default="1000,4000,16000", help="Blob counts for the size sweep at --density")
+    parser.add_argument("--density", type=float, default=2.0)
+    parser.add_argument("--ticks", type=int, default=120)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--brute-max", type=int, default=4000, help="Largest count to run the all-pairs check for")
+    args = parser.parse_args()
+
+    header = (f"{'blobs':>7} {'density':>7} {'tick ms':>8} {'+coll ms':>8} {'pairs ms':>8} {'cand/b':>7} {'contacts':>8} {'moves':>7}"
+              f" {'sphere us':>8} {'ray us':>8} {'numpy us':>8} {'all-pairs ms':>9}")
+    print("tick ms: collisions off; +coll ms: on (hash sync, pairs, resolve); cand/b: candidate pairs per blob;")
+    print("moves: blobs changing cell per tick; numpy us: brute-force sphere query over every blob")
+    print(header)
+    for density in (float(d) for d in args.densities.split(",")): report(args.count, density, args)
+    print(header)
+    for count in (int(c) for c in args.counts.split(",")): report(count, args.density, args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# bench_lod.py
+# Offscreen benchmark of the player LOD pyramid: polygons drawn and frame time for every level at each zoom, and
+# the level the game would pick there.
+# Usage: python bench_lod.py [--frames N] [--zooms 0.1,0.25,0.5,1,2] [--radius 6 | --model MODEL.vox] [--backend polygon]
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy") # No window needed
+import argparse
+import time
+import pygame
+import voxel
+from voxel_math import normalize_vector, quat_from_axis_angle
+from voxel_shape import build_sphere_shape
+from voxel_model import VoxelModel, load_model
+
+def bench_level(model, current_zoom, frames, surf):
+    """(ms per frame, polygons per frame) drawing model with a new rotation every frame, like a rolling blob."""
+    origin = (surf.get_width()//2, surf.get_height()//2)
+    axis = normalize_vector((1.0, 2.0, 0.5))
+    voxel.frame_profiler.set_enabled(True)
+    start = time.perf_counter()
+    for n in range(frames):
+        voxel.frame_profiler.begin_frame()
+        surf.fill(voxel.BLACK)
+        voxel.draw_player(surf, model, (0.0, 0.0, 0.0), quat_from_axis_angle(axis, n * 0.05), 1.0, current_zoom, origin)
+        voxel.frame_profiler.end_frame()
+    ms = (time.perf_counter() - start) * 1000.0 / frames
+    _, counters = voxel.frame_profiler.summary()
+    voxel.frame_profiler.set_enabled(False)
+    return ms, counters.get("polygons_drawn", 0)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the player LOD levels.")
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--zooms", default="0.1,0.25,0.5,1,2")
+    parser.add_argument("--radius", type=int, default=voxel.BASE_RADIUS)
+    parser.add_argument("--model", default=None, help=".vox or .bvox model to use instead of a sphere of --radius")
+    parser.add_argument("--backend", default=None, help="polygon or zbuffer (defaults to the configured backend)")
+    parser.add_argument("--size", default="1000x860", help="Render target WxH (defaults to the game area)")
+    args = parser.parse_args()
+
+    pygame.init()
+    voxel.load_physics_params_from_config()
+    if args.backend: voxel.PLAYER_RENDER_BACKEND = args.backend
+    voxel.quality_governor.set_level(0) # Measure at full quality, whatever level the game last saved
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    surf = pygame.Surface((width, height), pygame.SRCALPHA)
+    lods = voxel.build_player_lods(load_model(args.model).centred() if args.model else VoxelModel.from_shape(build_sphere_shape(args.radius, voxel.GREEN_BASE)))
+
+    print(f"backend {voxel.PLAYER_RENDER_BACKEND}, PLAYER_SCALE {voxel.PLAYER_SCALE_cfg}, switch below {voxel.PLAYER_LOD_MIN_VOXEL_PX} px (+/-{voxel.PLAYER_LOD_HYSTERESIS:.0%})")
+    print(f"{'level':>5} {'voxel':>5} {'voxels':>7} {'faces':>6}")
+    for model in lods:
+        print(f"{model['lod_level']:>5} {model['voxel_size']:>5} {len(model['shape']):>7} {sum(bin(m).count('1') for m in model['face_masks']):>6}")
+    print()
+    print(f"{'zoom':>5} {'vox px':>6} {'pick':>4} " + " ".join(f"{'L' + str(m['lod_level']) + ' polys':>9} {'ms':>6}" for m in lods))
+    for current_zoom in (float(z) for z in args.zooms.split(",")):
+        voxel_px = voxel.player_voxel_px(current_zoom)
+        pick = voxel.select_player_lod(0, voxel_px, len(lods)) # Zooming out from full resolution
+        cells = []
+        for model in lods:
+            ms, polygons = bench_level(model, current_zoom, args.frames, surf)
+            cells.append(f"{polygons:>9.0f} {ms:>6.2f}")
+        print(f"{current_zoom:>5.2f} {voxel_px:>6.2f} {pick:>4} " + " ".join(cells))
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()
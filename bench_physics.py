@@ -0,0 +1,59 @@
+# bench_physics.py
+# Headless stress test of the batched blob simulation: how tick cost scales with the number of blobs.
+# Usage: python bench_physics.py [--counts 1000,10000,100000] [--ticks 240] [--profile]
+import argparse
+import cProfile
+import pstats
+import time
+import numpy as np
+from blob_physics import BlobPhysics, BlobInputs
+from blob_world import BlobWorld
+
+def scripted_inputs(rng, count, tick):
+    """Random walkers that sprint now and then and hop every couple of seconds."""
+    move = rng.integers(-1, 2, size=(count, 2)).astype(float)
+    sprint = rng.random(count) < 0.25
+    jump_pressed = (tick % 240 == 0) & (rng.random(count) < 0.5)
+    return {"move": move, "sprint": sprint, "jump_held": jump_pressed | (rng.random(count) < 0.5), "jump_pressed": jump_pressed}
+
+def bench_world(count, ticks, seed=0):
+    rng = np.random.default_rng(seed)
+    spread = max(10.0, count ** 0.5 * 4.0)
+    positions = np.column_stack((rng.uniform(-spread, spread, (count, 2)), rng.uniform(6.0, 20.0, count)))
+    world = BlobWorld(count, positions=positions)
+    inputs = [scripted_inputs(rng, count, t) for t in range(min(ticks, 60))] # Pre-generated so RNG cost is not timed
+    start = time.perf_counter()
+    for t in range(ticks): world.tick(**inputs[t % len(inputs)])
+    return (time.perf_counter() - start) / ticks, world
+
+def bench_scalar(count, ticks):
+    blobs = [BlobPhysics() for _ in range(count)]
+    held = BlobInputs(move_x=1.0, move_y=0.0, jump_held=True)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        for blob in blobs: blob.tick(held)
+    return (time.perf_counter() - start) / ticks
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched blob physics against entity count.")
+    parser.add_argument("--counts", default="1000,10000,100000")
+    parser.add_argument("--ticks", type=int, default=240)
+    parser.add_argument("--profile", action="store_true", help="cProfile the largest count and print the hottest calls")
+    args = parser.parse_args()
+    counts = [int(c) for c in args.counts.split(",")]
+
+    scalar_count = min(counts[0], 1000)
+    scalar_s = bench_scalar(scalar_count, max(1, args.ticks // 10))
+    print(f"scalar BlobPhysics x{scalar_count}: {scalar_s*1000:.2f} ms/tick, {scalar_s/scalar_count*1e9:.0f} ns/blob")
+    print(f"{'blobs':>8} {'ms/tick':>9} {'ns/blob':>8} {'ticks/s':>9} {'on ground':>10}")
+    for count in counts:
+        per_tick, world = bench_world(count, args.ticks)
+        print(f"{count:>8} {per_tick*1000:>9.3f} {per_tick/count*1e9:>8.1f} {1/per_tick:>9.0f} {world.is_on_ground.mean():>9.0%}")
+
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.enable(); bench_world(counts[-1], max(1, args.ticks // 4)); profiler.disable()
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+
+if __name__ == "__main__":
+    main()
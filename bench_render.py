@@ -0,0 +1,53 @@
+# bench_render.py
+# Offscreen benchmark of the player render backends ("polygon" vs "zbuffer") across zoom levels and blob sizes.
+# Usage: python bench_render.py [--frames N] [--zooms 0.5,1,2,4] [--radii 6,10,16]
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy") # No window needed
+import argparse
+import math
+import time
+import pygame
+import voxel
+from voxel_math import normalize_vector, quat_from_axis_angle
+from voxel_shape import build_sphere_shape, extract_shell
+
+def bench_backend(backend, model, current_zoom, frames, surf):
+    voxel.PLAYER_RENDER_BACKEND = backend
+    origin = (surf.get_width()//2, surf.get_height()//2)
+    axis = normalize_vector((1.0, 2.0, 0.5))
+    start = time.perf_counter()
+    for n in range(frames):
+        rotation = quat_from_axis_angle(axis, n * 0.05) # New rotation every frame, like a rolling blob
+        surf.fill(voxel.BLACK)
+        voxel.draw_player(surf, model, (0.0, 0.0, 0.0), rotation, 1.0, current_zoom, origin)
+    return (time.perf_counter() - start) * 1000.0 / frames
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the player render backends.")
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--zooms", default="0.5,1,2,4")
+    parser.add_argument("--radii", default="6,10,16")
+    parser.add_argument("--size", default="1000x860", help="Render target WxH (defaults to the game area)")
+    args = parser.parse_args()
+
+    pygame.init()
+    voxel.load_physics_params_from_config()
+    voxel.quality_governor.set_level(0) # Measure at full quality, whatever level the game last saved
+    if voxel.np is None: raise SystemExit("NumPy is required for the zbuffer backend.")
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    surf = pygame.Surface((width, height), pygame.SRCALPHA)
+    backends = ("polygon", "zbuffer")
+
+    print(f"{'radius':>6} {'voxels':>7} {'faces':>6} {'zoom':>5} " + " ".join(f"{b+' ms':>11}" for b in backends) + f" {'speedup':>8}")
+    for radius in (int(r) for r in args.radii.split(",")):
+        shape, face_masks = extract_shell(build_sphere_shape(radius, voxel.GREEN_BASE))
+        model = voxel.build_player_model(shape, face_masks)
+        exposed_faces = sum(bin(m).count("1") for m in face_masks)
+        for current_zoom in (float(z) for z in args.zooms.split(",")):
+            times = [bench_backend(b, model, current_zoom, args.frames, surf) for b in backends]
+            speedup = times[0] / times[1] if times[1] > 0 else math.inf
+            print(f"{radius:>6} {len(shape):>7} {exposed_faces:>6} {current_zoom:>5.2f} " + " ".join(f"{t:>11.2f}" for t in times) + f" {speedup:>7.2f}x")
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()
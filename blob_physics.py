@@ -0,0 +1,192 @@
+# blob_physics.py
+# Headless movement / jump / bounce / squish simulation for one blob. Has no pygame dependency, so it can be
+# stepped from tools and tests far faster than real time.
+import math
+from collections import namedtuple
+import game_config as cfg
+from voxel_math import normalize_vector, quat_from_axis_angle, quat_mult, quat_nlerp
+
+# Config keys the simulation reads; values are copied into BlobPhysics.params.
+PHYSICS_PARAM_KEYS = (
+    "PLAYER_SCALE",
+    "BASE_ACCEL_RATE", "FAST_ACCEL_RATE", "BASE_MAX_SPEED_UPS", "FAST_MAX_SPEED_UPS", "DAMPING_FACTOR", "MASS",
+    "STICTION_THRESHOLD", "EXTRA_FRICTION", "BASE_SPEED_MULTIPLIER",
+    "GRAVITY_ACCEL", "INITIAL_JUMP_VELOCITY_UPS", "JUMP_CHARGE_BOOST_ACCEL_RATE", "MAX_JUMP_CHARGE_DURATION",
+    "COEFFICIENT_OF_RESTITUTION", "BOUNCE_THRESHOLD", "BOUNCE_ON_LAND_VELOCITY_UPS",
+    "GROUND_CONTACT_THRESHOLD", "REST_VELOCITY_THRESHOLD",
+    "elasticity", "SQUISH_ON_JUMP_START", "SQUISH_ON_LANDING", "MAX_SQUISH_FROM_CHARGE", "SQUISH_DAMPING",
+    "IMPACT_VELOCITY_THRESHOLD", "MAX_IMPACT_VELOCITY", "MIN_SQUISH_ON_LANDING", "MAX_SQUISH_ON_LANDING",
+)
+MAX_FRAME_DT = 0.1 # Longer frames are clamped, as the game loop always has
+FRICTION_REFERENCE_HZ = 60 # EXTRA_FRICTION is the fraction of speed lost per 1/60 s, the frame it was tuned at
+
+# move_x/move_y: -1..1 per axis (A/D, W/S); jump_pressed is the frame's Space key-down edge, jump_held its held state.
+BlobInputs = namedtuple("BlobInputs", "move_x move_y sprint jump_held jump_pressed", defaults=(0.0, 0.0, False, False, False))
+NO_INPUT = BlobInputs()
+
+# Snapshot of the state that rendering needs
+BlobRenderState = namedtuple("BlobRenderState", "pos vel rotation squish")
+
+def impact_squish_target(p, impact_velocity):
+    """Squish target after an impact at impact_velocity (landing or hitting something), from the params in p."""
+    norm_impact = 0
+    if p["MAX_IMPACT_VELOCITY"] > p["IMPACT_VELOCITY_THRESHOLD"]:
+        norm_impact = (impact_velocity - p["IMPACT_VELOCITY_THRESHOLD"]) / (p["MAX_IMPACT_VELOCITY"] - p["IMPACT_VELOCITY_THRESHOLD"])
+    norm_impact = max(0, min(1, norm_impact))
+    return max(0.1, min(1.0, p["MIN_SQUISH_ON_LANDING"] - norm_impact * (p["MIN_SQUISH_ON_LANDING"] - p["MAX_SQUISH_ON_LANDING"])))
+
+class BlobPhysics:
+    def __init__(self, params=None, base_radius=6, ground_z=-1, tick_rate=None, ground=None, obstacles=None):
+        self.params = {key: cfg.get(key) for key in PHYSICS_PARAM_KEYS}
+        if params: self.params.update(params)
+        self.base_radius = base_radius
+        self.ground_z = ground_z # Flat ground plane, used where `ground` has nothing under the blob
+        self.ground = ground # Optional terrain with surface_z_below(x, y, z), e.g. a VoxelTerrain
+        self.obstacles = obstacles # Optional SpatialHash of static spheres the blob bounces off (the blob itself may be in it)
+        self.fixed_dt = 1.0 / (tick_rate or cfg.get("PHYSICS_TICK_RATE"))
+        self.reset()
+
+    def reset(self, pos=None):
+        radius = self.radius()
+        if pos is None and self.ground is not None: pos = (0.0, 0.0, self.ground_z_at(0.0, 0.0, math.inf) + radius) # Resting on the terrain
+        self.pos = list(pos) if pos is not None else [0.0, 0.0, float(radius if radius > 0 else 1.0)]
+        self.vel = [0.0, 0.0, 0.0]
+        self.rotation = (1.0, 0.0, 0.0, 0.0)
+        self.squish, self.target_squish, self.squish_velocity = 1.0, 1.0, 0.0
+        self.is_on_ground = False
+        self.is_charging_jump, self.jump_charge_start_time = False, None
+        self.time = 0.0 # Simulated seconds
+        self.ticks = 0
+        self.accumulator = 0.0
+        self.pending_jump = False # A jump press waiting for the next tick
+        self.just_landed, self.landing_impact_velocity = False, 0.0 # Outcome of the latest tick, for tools
+        self.collision_impact_velocity = 0.0 # Hardest approach speed into an obstacle in the latest tick
+        self.prev_state = self.current_state()
+
+    def ground_z_at(self, x, y, z):
+        """Height of the ground the blob centred at (x, y, z) stands on or falls towards."""
+        surface_z = self.ground.surface_z_below(x, y, z) if self.ground is not None else None
+        return self.ground_z if surface_z is None else surface_z
+
+    def radius(self):
+        return self.base_radius * self.params["PLAYER_SCALE"]
+
+    def current_state(self):
+        return BlobRenderState(tuple(self.pos), tuple(self.vel), self.rotation, self.squish)
+
+    def step(self, dt, inputs=NO_INPUT):
+        """Advances by a frame of dt seconds in whole fixed ticks; the remainder carries over. Returns the tick count."""
+        self.pending_jump = self.pending_jump or inputs.jump_pressed
+        self.accumulator += min(dt, MAX_FRAME_DT)
+        ticks = 0
+        while self.accumulator >= self.fixed_dt:
+            self.prev_state = self.current_state()
+            self.tick(inputs)
+            self.accumulator -= self.fixed_dt
+            ticks += 1
+        return ticks
+
+    def render_state(self):
+        """State interpolated between the last two ticks by the leftover accumulator time."""
+        alpha = self.accumulator / self.fixed_dt
+        prev = self.prev_state
+        pos = tuple(a + (b-a)*alpha for a,b in zip(prev.pos, self.pos))
+        vel = tuple(a + (b-a)*alpha for a,b in zip(prev.vel, self.vel))
+        return BlobRenderState(pos, vel, quat_nlerp(prev.rotation, self.rotation, alpha), prev.squish + (self.squish - prev.squish)*alpha)
+
+    def tick(self, inputs=NO_INPUT):
+        """One fixed-length simulation tick."""
+        p = self.params; dt = self.fixed_dt
+        pos, vel = self.pos, self.vel
+        current_radius = self.radius()
+        jump_initiated, self.just_landed = False, False
+        if self.pending_jump or inputs.jump_pressed:
+            self.pending_jump = False
+            if self.is_on_ground and not self.is_charging_jump:
+                vel[2] = p["INITIAL_JUMP_VELOCITY_UPS"]; self.is_on_ground = False; self.is_charging_jump = True
+                self.jump_charge_start_time = self.time; jump_initiated = True; self.target_squish = p["SQUISH_ON_JUMP_START"]
+        if self.is_charging_jump and not inputs.jump_held: self.is_charging_jump = False; self.jump_charge_start_time = None
+
+        accel_input = [0.0, 0.0]
+        current_accel_rate_val = p["FAST_ACCEL_RATE"] if inputs.sprint else p["BASE_ACCEL_RATE"]
+        current_max_speed_val = p["FAST_MAX_SPEED_UPS"] if inputs.sprint else p["BASE_MAX_SPEED_UPS"]
+        current_max_speed_val *= p["BASE_SPEED_MULTIPLIER"]
+        accel_input[0] += inputs.move_x; accel_input[1] += inputs.move_y
+        accel_mag = math.hypot(accel_input[0], accel_input[1])
+        if accel_mag > 0: accel_input = [(a / accel_mag) * current_accel_rate_val for a in accel_input]
+        else: accel_input = [0.0, 0.0]
+        vel[0] += accel_input[0] * dt; vel[1] += accel_input[1] * dt
+        speed_xy = math.hypot(vel[0], vel[1])
+        if speed_xy > 0:
+            vel[0] += -vel[0] / speed_xy * p["DAMPING_FACTOR"] * dt
+            vel[1] += -vel[1] / speed_xy * p["DAMPING_FACTOR"] * dt
+        if accel_mag == 0:
+            friction = (1.0 - p["EXTRA_FRICTION"]) ** (dt * FRICTION_REFERENCE_HZ) # Same slowdown per second at any tick rate
+            vel[0] *= friction; vel[1] *= friction
+            if speed_xy < p["STICTION_THRESHOLD"]: vel[0] = 0.0; vel[1] = 0.0
+        current_speed_xy_check = math.hypot(vel[0], vel[1])
+        if current_speed_xy_check > current_max_speed_val:
+            scale = current_max_speed_val / current_speed_xy_check
+            vel[0] *= scale; vel[1] *= scale
+        if not self.is_on_ground: vel[2] += p["GRAVITY_ACCEL"] * dt
+        if self.is_charging_jump and inputs.jump_held and self.jump_charge_start_time is not None:
+            charge_duration = self.time - self.jump_charge_start_time
+            if charge_duration < p["MAX_JUMP_CHARGE_DURATION"]: vel[2] += p["JUMP_CHARGE_BOOST_ACCEL_RATE"] * dt
+            else: self.is_charging_jump = False
+
+        prev_x, prev_y = pos[0], pos[1]
+        pos[0] += vel[0]*dt; pos[1] += vel[1]*dt; pos[2] += vel[2]*dt
+        self.collision_impact_velocity = self.resolve_obstacle_contacts(current_radius) if self.obstacles is not None else 0.0
+        player_bottom_z = pos[2] - current_radius
+        ground_z = self.ground_z_at(pos[0], pos[1], pos[2])
+        if player_bottom_z <= ground_z + p["GROUND_CONTACT_THRESHOLD"]:
+            if not self.is_on_ground:
+                self.just_landed = True; self.landing_impact_velocity = abs(vel[2])
+                if self.landing_impact_velocity > p["BOUNCE_THRESHOLD"]: vel[2] = self.landing_impact_velocity * p["COEFFICIENT_OF_RESTITUTION"]
+                else: vel[2] = 0; pos[2] = ground_z + current_radius
+            else: vel[2] = 0; pos[2] = ground_z + current_radius
+            self.is_on_ground = True
+        else: self.is_on_ground = False
+        if self.is_on_ground and abs(vel[2]) < p["REST_VELOCITY_THRESHOLD"]: vel[2] = 0.0
+
+        dx_world, dy_world = pos[0]-prev_x, pos[1]-prev_y
+        if self.is_on_ground and (abs(dx_world)>1e-5 or abs(dy_world)>1e-5) and current_radius > 1e-5:
+            angle_rolled = math.hypot(dx_world, dy_world) / current_radius
+            roll_axis = normalize_vector((-dy_world, dx_world, 0))
+            if roll_axis != (0,0,0):
+                rotation = quat_mult(quat_from_axis_angle(roll_axis, angle_rolled), self.rotation)
+                norm_sq = sum(c*c for c in rotation)
+                if norm_sq > 1e-9: rotation = tuple(c/math.sqrt(norm_sq) for c in rotation)
+                self.rotation = rotation
+
+        if jump_initiated: self.target_squish = p["SQUISH_ON_JUMP_START"]
+        elif self.just_landed: self.target_squish = impact_squish_target(p, self.landing_impact_velocity)
+        elif self.is_on_ground and not self.is_charging_jump: self.target_squish = 1.0
+        if self.collision_impact_velocity > p["IMPACT_VELOCITY_THRESHOLD"]: # Hitting an obstacle squishes like a landing
+            self.target_squish = min(self.target_squish, impact_squish_target(p, self.collision_impact_velocity))
+        squish_accel = p["elasticity"]*(self.target_squish-self.squish) - p["SQUISH_DAMPING"]*self.squish_velocity
+        self.squish_velocity += squish_accel*dt; self.squish += self.squish_velocity*dt
+        self.squish = max(0.1, min(2.0, self.squish))
+
+        self.time += dt; self.ticks += 1
+
+    def resolve_obstacle_contacts(self, radius):
+        """Pushes the blob out of every obstacle it overlaps and reflects the velocity towards it, with
+        COEFFICIENT_OF_RESTITUTION above BOUNCE_THRESHOLD and none below, as on landing. Returns the hardest
+        approach speed (0 without contact)."""
+        p, pos, vel = self.params, self.pos, self.vel
+        hardest = 0.0
+        for key in self.obstacles.query_sphere(pos, radius, exclude=self):
+            ox, oy, oz, obstacle_radius = self.obstacles.spheres[key]
+            dx, dy, dz = pos[0] - ox, pos[1] - oy, pos[2] - oz
+            dist = math.sqrt(dx*dx + dy*dy + dz*dz)
+            if dist < 1e-9: dx, dy, dz, dist = 0.0, 0.0, 1.0, 1.0 # Dead centre: leave upwards
+            nx, ny, nz = dx / dist, dy / dist, dz / dist
+            push = radius + obstacle_radius - dist
+            if push > 0: pos[0] += nx*push; pos[1] += ny*push; pos[2] += nz*push
+            approach = -(vel[0]*nx + vel[1]*ny + vel[2]*nz)
+            if approach > 0:
+                kick = approach * (1.0 + (p["COEFFICIENT_OF_RESTITUTION"] if approach > p["BOUNCE_THRESHOLD"] else 0.0))
+                vel[0] += nx*kick; vel[1] += ny*kick; vel[2] += nz*kick
+                hardest = max(hardest, approach)
+        return hardest
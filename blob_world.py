@@ -0,0 +1,206 @@
+# blob_world.py
+# Struct-of-arrays simulation of many blobs: every field of BlobPhysics becomes one contiguous NumPy array and
+# each physics rule is a vectorized operation over all blobs. tick() follows BlobPhysics.tick() blob for blob (up to
+# floating-point rounding, which can occasionally tip a threshold such as stiction the other way). With
+# collisions on, blobs also bounce off each other and off static obstacles, found through a SpatialHash.
+import numpy as np
+import game_config as cfg
+from blob_physics import PHYSICS_PARAM_KEYS, MAX_FRAME_DT, FRICTION_REFERENCE_HZ
+from spatial_hash import SpatialHash, cell_size_for
+
+def quat_mult_arrays(q1, q2):
+    """Row-wise quat_mult for (N,4) arrays of (w, x, y, z)."""
+    w1,x1,y1,z1 = q1[:,0],q1[:,1],q1[:,2],q1[:,3]
+    w2,x2,y2,z2 = q2[:,0],q2[:,1],q2[:,2],q2[:,3]
+    return np.stack((w1*w2-x1*x2-y1*y2-z1*z2, w1*x2+x1*w2+y1*z2-z1*y2, w1*y2-x1*z2+y1*w2+z1*x2, w1*z2+x1*y2-y1*x2+z1*w2), axis=1)
+
+def impact_squish_targets(p, impact):
+    """Vectorized blob_physics.impact_squish_target over an array of impact speeds."""
+    norm_impact = np.zeros(len(impact))
+    if p["MAX_IMPACT_VELOCITY"] > p["IMPACT_VELOCITY_THRESHOLD"]:
+        norm_impact = np.clip((impact - p["IMPACT_VELOCITY_THRESHOLD"]) / (p["MAX_IMPACT_VELOCITY"] - p["IMPACT_VELOCITY_THRESHOLD"]), 0, 1)
+    return np.clip(p["MIN_SQUISH_ON_LANDING"] - norm_impact * (p["MIN_SQUISH_ON_LANDING"] - p["MAX_SQUISH_ON_LANDING"]), 0.1, 1.0)
+
+class BlobWorld:
+    def __init__(self, count, params=None, base_radius=6, ground_z=-1, tick_rate=None, positions=None, collisions=False):
+        self.params = {key: cfg.get(key) for key in PHYSICS_PARAM_KEYS}
+        if params: self.params.update(params)
+        self.count = count
+        self.base_radius = base_radius
+        self.ground_z = ground_z
+        self.fixed_dt = 1.0 / (tick_rate or cfg.get("PHYSICS_TICK_RATE"))
+        self.collisions = collisions
+        self.obstacle_pos, self.obstacle_radius = np.zeros((0, 3)), np.zeros(0) # Static spheres; hash keys count.. onwards
+        self.reset(positions)
+
+    def reset(self, positions=None):
+        n = self.count
+        self.radius = np.full(n, self.base_radius * self.params["PLAYER_SCALE"], dtype=float)
+        if positions is not None: self.pos = np.array(positions, dtype=float).reshape(n, 3)
+        else: self.pos = np.zeros((n, 3)); self.pos[:,2] = np.where(self.radius > 0, self.radius, 1.0)
+        self.vel = np.zeros((n, 3))
+        self.rotation = np.zeros((n, 4)); self.rotation[:,0] = 1.0
+        self.squish, self.target_squish, self.squish_velocity = np.ones(n), np.ones(n), np.zeros(n)
+        self.is_on_ground = np.zeros(n, dtype=bool)
+        self.is_charging_jump = np.zeros(n, dtype=bool)
+        self.jump_charge_start_time = np.full(n, np.nan)
+        self.just_landed, self.landing_impact_velocity = np.zeros(n, dtype=bool), np.zeros(n)
+        self.collision_impact_velocity = np.zeros(n) # Hardest approach speed into another blob or obstacle this tick
+        self.contacts = 0 # Overlapping pairs resolved in the latest tick
+        self.time, self.ticks, self.accumulator = 0.0, 0, 0.0
+        self.spatial_hash = None
+        if self.collisions:
+            self.spatial_hash = SpatialHash(cell_size_for(self.base_radius, self.params["PLAYER_SCALE"]))
+            for key, (pos, radius) in enumerate(zip(self.pos.tolist(), self.radius.tolist())): self.spatial_hash.insert(key, pos, radius)
+            for key, (pos, radius) in enumerate(zip(self.obstacle_pos.tolist(), self.obstacle_radius.tolist()), n): self.spatial_hash.insert(key, pos, radius)
+            self._blob_spheres = [self.spatial_hash.spheres[key] for key in range(n)]
+            self._hash_cells = np.floor(self.pos / self.spatial_hash.cell_size).astype(np.int64)
+
+    def add_obstacle(self, pos, radius):
+        """Adds a static sphere that blobs bounce off (with collisions on). Returns its spatial hash key."""
+        key = self.count + len(self.obstacle_radius)
+        self.obstacle_pos = np.vstack((self.obstacle_pos, np.asarray(pos, dtype=float).reshape(1, 3)))
+        self.obstacle_radius = np.append(self.obstacle_radius, float(radius))
+        if self.spatial_hash is not None: self.spatial_hash.insert(key, tuple(float(c) for c in pos), float(radius))
+        return key
+
+    def sync_spatial_hash(self):
+        """Brings the hash up to date with pos. Only blobs that crossed into another cell go through update();
+        the rest just have their stored centre overwritten."""
+        h = self.spatial_hash
+        cells = np.floor(self.pos / h.cell_size).astype(np.int64)
+        moved = np.zeros(self.count, dtype=bool)
+        np.any(cells != self._hash_cells, axis=1, out=moved)
+        for sphere, p in zip(self._blob_spheres, self.pos.tolist()): sphere[0], sphere[1], sphere[2] = p
+        for key in np.flatnonzero(moved).tolist(): h.update(key, self._blob_spheres[key])
+        self._hash_cells = cells
+
+    def resolve_collisions(self):
+        """Separates overlapping blob/blob and blob/obstacle pairs and reflects their approach velocity along the
+        contact normal: COEFFICIENT_OF_RESTITUTION above BOUNCE_THRESHOLD, fully inelastic below, as on landing.
+        Blobs share a mass, so a blob pair splits the push and the impulse evenly; obstacles do not move.
+        Returns each blob's hardest approach speed."""
+        p, n = self.params, self.count
+        self.sync_spatial_hash()
+        impact = np.zeros(n)
+        pairs = np.fromiter((k for pair in self.spatial_hash.candidate_pairs() for k in pair), dtype=np.int64).reshape(-1, 2)
+        pairs.sort(axis=1) # Blob first: obstacle keys come after all blob keys
+        pairs = pairs[pairs[:,0] < n] # Obstacles never collide with each other
+        all_pos, all_radius = np.concatenate((self.pos, self.obstacle_pos)), np.concatenate((self.radius, self.obstacle_radius))
+        a, b = pairs[:,0], pairs[:,1]
+        d = all_pos[a] - all_pos[b]
+        dist = np.sqrt(np.einsum("ij,ij->i", d, d))
+        overlap = all_radius[a] + all_radius[b] - dist
+        hit = overlap > 0
+        self.contacts = int(hit.sum())
+        if not self.contacts: return impact
+        a, b, d, dist, overlap = a[hit], b[hit], d[hit], dist[hit], overlap[hit]
+        centred = dist < 1e-9 # Coincident centres: push apart vertically
+        normal = np.where(centred[:,None], np.array([0.0, 0.0, 1.0]), d / np.where(centred, 1.0, dist)[:,None])
+        b_blob = b < n
+        share_a = np.where(b_blob, 0.5, 1.0) # Of the push and the impulse; the rest goes to b
+        b_idx = np.where(b_blob, b, 0)
+        vel_b = np.where(b_blob[:,None], self.vel[b_idx], 0.0)
+        approach = -np.einsum("ij,ij->i", self.vel[a] - vel_b, normal)
+        restitution = np.where(approach > p["BOUNCE_THRESHOLD"], p["COEFFICIENT_OF_RESTITUTION"], 0.0)
+        kick = np.where(approach > 0, approach * (1.0 + restitution), 0.0)
+        push_a = normal * (overlap * share_a)[:,None]
+        kick_a = normal * (kick * share_a)[:,None]
+        np.add.at(self.pos, a, push_a); np.add.at(self.vel, a, kick_a)
+        np.add.at(self.pos, b[b_blob], -push_a[b_blob]); np.add.at(self.vel, b[b_blob], -kick_a[b_blob]) # Equal and opposite
+        approach = np.maximum(approach, 0.0)
+        np.maximum.at(impact, a, approach); np.maximum.at(impact, b[b_blob], approach[b_blob])
+        return impact
+
+    def step(self, dt, **inputs):
+        """Advances by dt seconds in whole fixed ticks (inputs as for tick()). Returns the tick count."""
+        self.accumulator += min(dt, MAX_FRAME_DT)
+        ticks = 0
+        while self.accumulator >= self.fixed_dt:
+            self.tick(**inputs)
+            inputs.pop("jump_pressed", None) # Edge-triggered: only the first tick of a frame sees the press
+            self.accumulator -= self.fixed_dt
+            ticks += 1
+        return ticks
+
+    def tick(self, move=None, sprint=None, jump_held=None, jump_pressed=None):
+        """One fixed tick for every blob. move is (N,2) in -1..1; sprint, jump_held, jump_pressed are (N,) bools."""
+        p = self.params; dt = self.fixed_dt; n = self.count
+        pos, vel, radius = self.pos, self.vel, self.radius
+        no_flags = np.zeros(n, dtype=bool)
+        sprint = no_flags if sprint is None else np.asarray(sprint, dtype=bool)
+        jump_held = no_flags if jump_held is None else np.asarray(jump_held, dtype=bool)
+
+        jump_initiated = no_flags
+        if jump_pressed is not None:
+            jump_initiated = np.asarray(jump_pressed, dtype=bool) & self.is_on_ground & ~self.is_charging_jump
+            vel[jump_initiated,2] = p["INITIAL_JUMP_VELOCITY_UPS"]
+            self.is_on_ground &= ~jump_initiated; self.is_charging_jump |= jump_initiated
+            self.jump_charge_start_time[jump_initiated] = self.time
+        released = self.is_charging_jump & ~jump_held
+        self.is_charging_jump &= ~released; self.jump_charge_start_time[released] = np.nan
+
+        # Horizontal: input acceleration, damping, friction/stiction, speed cap
+        accel_rate = np.where(sprint, p["FAST_ACCEL_RATE"], p["BASE_ACCEL_RATE"])
+        max_speed = np.where(sprint, p["FAST_MAX_SPEED_UPS"], p["BASE_MAX_SPEED_UPS"]) * p["BASE_SPEED_MULTIPLIER"]
+        if move is not None:
+            move = np.asarray(move, dtype=float)
+            accel_mag = np.hypot(move[:,0], move[:,1])
+            pushing = accel_mag > 0
+            vel[:,:2] += move * np.divide(accel_rate * dt, accel_mag, out=np.zeros(n), where=pushing)[:,None]
+        else: pushing = no_flags
+        # Whole-array arithmetic with per-blob factors instead of boolean-indexed updates keeps this pass cheap
+        speed_xy = np.hypot(vel[:,0], vel[:,1])
+        vel[:,:2] -= vel[:,:2] * np.divide(p["DAMPING_FACTOR"] * dt, speed_xy, out=np.zeros(n), where=speed_xy > 0)[:,None]
+        idle = ~pushing
+        friction = np.where(idle, np.where(speed_xy < p["STICTION_THRESHOLD"], 0.0, (1.0 - p["EXTRA_FRICTION"]) ** (dt * FRICTION_REFERENCE_HZ)), 1.0)
+        vel[:,:2] *= friction[:,None]
+        speed_xy = np.hypot(vel[:,0], vel[:,1])
+        vel[:,:2] *= np.divide(max_speed, speed_xy, out=np.ones(n), where=speed_xy > max_speed)[:,None]
+
+        # Vertical: gravity and jump-charge boost
+        vel[~self.is_on_ground,2] += p["GRAVITY_ACCEL"] * dt
+        charging = self.is_charging_jump & jump_held
+        boosting = charging & (self.time - self.jump_charge_start_time < p["MAX_JUMP_CHARGE_DURATION"])
+        vel[boosting,2] += p["JUMP_CHARGE_BOOST_ACCEL_RATE"] * dt
+        self.is_charging_jump &= ~(charging & ~boosting)
+
+        prev_xy = pos[:,:2].copy()
+        pos += vel * dt
+        if self.collisions: self.collision_impact_velocity = self.resolve_collisions()
+
+        # Ground contact, bounce with restitution, rest snapping
+        contact = pos[:,2] - radius <= self.ground_z + p["GROUND_CONTACT_THRESHOLD"]
+        self.just_landed = contact & ~self.is_on_ground
+        impact = np.abs(vel[:,2])
+        self.landing_impact_velocity = np.where(self.just_landed, impact, self.landing_impact_velocity)
+        bounce = self.just_landed & (impact > p["BOUNCE_THRESHOLD"])
+        settle = contact & ~bounce
+        vel[bounce,2] = impact[bounce] * p["COEFFICIENT_OF_RESTITUTION"]
+        vel[settle,2] = 0.0; pos[settle,2] = self.ground_z + radius[settle]
+        self.is_on_ground = contact
+        vel[contact & (np.abs(vel[:,2]) < p["REST_VELOCITY_THRESHOLD"]),2] = 0.0
+
+        # Rolling: rotate about the horizontal axis perpendicular to the ground displacement
+        d_xy = pos[:,:2] - prev_xy
+        rolling = contact & ((np.abs(d_xy[:,0]) > 1e-5) | (np.abs(d_xy[:,1]) > 1e-5)) & (radius > 1e-5)
+        if rolling.any():
+            d = d_xy[rolling]; dist = np.hypot(d[:,0], d[:,1])
+            half_angle = dist / radius[rolling] / 2.0; s = np.sin(half_angle) / dist
+            delta = np.stack((np.cos(half_angle), -d[:,1]*s, d[:,0]*s, np.zeros(len(d))), axis=1)
+            rotated = quat_mult_arrays(delta, self.rotation[rolling])
+            self.rotation[rolling] = rotated / np.linalg.norm(rotated, axis=1, keepdims=True)
+
+        # Squish spring towards a target set by jumping / landing impact / resting, and collision impacts
+        landing_target = impact_squish_targets(p, self.landing_impact_velocity)
+        resting = contact & ~self.is_charging_jump
+        self.target_squish = np.where(jump_initiated, p["SQUISH_ON_JUMP_START"],
+                             np.where(self.just_landed, landing_target, np.where(resting, 1.0, self.target_squish)))
+        if self.collisions:
+            hit_hard = self.collision_impact_velocity > p["IMPACT_VELOCITY_THRESHOLD"]
+            if hit_hard.any(): self.target_squish = np.where(hit_hard, np.minimum(self.target_squish, impact_squish_targets(p, self.collision_impact_velocity)), self.target_squish)
+        squish_accel = p["elasticity"]*(self.target_squish - self.squish) - p["SQUISH_DAMPING"]*self.squish_velocity
+        self.squish_velocity += squish_accel * dt
+        self.squish = np.clip(self.squish + self.squish_velocity * dt, 0.1, 2.0)
+
+        self.time += dt; self.ticks += 1
@@ -0,0 +1,62 @@
+# compositor.py
+# Helpers for redrawing only what changed: a pool of reusable named surfaces and a per-frame dirty-rectangle list
+# that is presented with pygame.display.update(rects) instead of a full flip.
+import pygame
+
+class SurfacePool:
+    """Named surfaces reused across frames; a new one is only allocated when the size or alpha flag changes."""
+    def __init__(self):
+        self.surfaces = {}
+        self.allocations, self.reuses = 0, 0
+
+    def get(self, name, size, flags=0):
+        surf = self.surfaces.get(name)
+        if surf is None or surf.get_size() != tuple(size) or (surf.get_flags() & pygame.SRCALPHA) != (flags & pygame.SRCALPHA):
+            surf = self.surfaces[name] = pygame.Surface(size, flags)
+            self.allocations += 1
+        else: self.reuses += 1
+        return surf
+
+class DirtyRects:
+    """Screen regions that changed this frame. Overlapping rects are merged; when they cover most of the screen the
+    whole screen is redrawn instead."""
+    def __init__(self, full_screen_ratio=0.6):
+        self.full_screen_ratio = full_screen_ratio
+        self.screen_rect, self.rects, self.full = pygame.Rect(0, 0, 0, 0), [], True
+        self.frames, self.full_frames, self.presented_pixels = 0, 0, 0
+
+    def begin(self, screen_rect):
+        self.full = self.full or screen_rect != self.screen_rect # A resized screen has nothing valid on it
+        self.screen_rect = pygame.Rect(screen_rect)
+        self.rects = []
+
+    def add(self, rect):
+        if rect is None: return
+        rect = pygame.Rect(rect).clip(self.screen_rect)
+        if rect.width > 0 and rect.height > 0: self.rects.append(rect)
+
+    def add_full(self):
+        self.full = True
+
+    def merged(self):
+        """The rects to redraw this frame, with overlapping ones combined."""
+        if self.full: return [self.screen_rect.copy()]
+        merged = []
+        for rect in self.rects:
+            rect = rect.copy()
+            i = 0
+            while i < len(merged): # Absorb everything this rect overlaps, re-checking after each growth
+                if rect.colliderect(merged[i]): rect.union_ip(merged.pop(i)); i = 0
+                else: i += 1
+            merged.append(rect)
+        if sum(r.width * r.height for r in merged) > self.full_screen_ratio * self.screen_rect.width * self.screen_rect.height:
+            return [self.screen_rect.copy()]
+        return merged
+
+    def present(self, rects):
+        """Pushes the redrawn rects to the display; a full-screen redraw is flipped."""
+        self.frames += 1
+        if rects == [self.screen_rect]: pygame.display.flip(); self.full_frames += 1
+        elif rects: pygame.display.update(rects)
+        self.presented_pixels = sum(r.width * r.height for r in rects)
+        self.full = False
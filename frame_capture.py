@@ -0,0 +1,99 @@
+# frame_capture.py
+# Background capture of the presented screen to disk. capture() copies the screen's pixel buffer into a free slot
+# of a preallocated ring (one memcpy, no allocation) and returns; encoder threads drain the ring to PNG or raw
+# files. When every slot is still waiting to be encoded the frame is dropped and counted, so a slow disk never
+# stalls the game. PNGs are written here with zlib rather than pygame.image.save, which holds the GIL for the
+# whole encode and would slow the game loop down; zlib releases it while compressing.
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+import zlib
+
+CAPTURE_FORMATS = ("png", "raw")
+
+def _png_chunk(tag, data):
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+class FrameCapture:
+    def __init__(self, out_dir, surface, ring_frames=12, encoders=2, fmt="png", png_level=3):
+        if fmt not in CAPTURE_FORMATS: raise ValueError(f"Capture format must be one of {CAPTURE_FORMATS}, not {fmt!r}")
+        if surface.get_bytesize() not in (3, 4): raise ValueError(f"Cannot capture a {surface.get_bitsize()}-bit surface")
+        self.out_dir, self.fmt, self.png_level = out_dir, fmt, png_level
+        self.size, self.pitch, self.bytesize = surface.get_size(), surface.get_pitch(), surface.get_bytesize()
+        masks = surface.get_masks()[:3]
+        # Byte offset of R, G and B within a pixel, from the channel masks
+        self.rgb_offsets = tuple((m.bit_length() - 1) // 8 if sys.byteorder == "little" else self.bytesize - 1 - (m.bit_length() - 1) // 8 for m in masks)
+        os.makedirs(out_dir, exist_ok=True)
+        if fmt == "raw": # Enough to decode the frame files later
+            with open(os.path.join(out_dir, "frames.json"), "w") as f:
+                json.dump({"size": self.size, "pitch": self.pitch, "bytesize": self.bytesize, "rgb_offsets": self.rgb_offsets}, f)
+        self.slots = [bytearray(self.pitch * self.size[1]) for _ in range(ring_frames)]
+        self.free, self.filled = queue.Queue(), queue.Queue()
+        for n in range(ring_frames): self.free.put(n)
+        self.frames, self.captured, self.saved, self.dropped, self.errors = 0, 0, 0, 0, 0 # frames = capture() calls
+        self.encode_seconds = 0.0
+        self._stats_lock = threading.Lock() # Encoder threads update saved/errors/encode_seconds
+        self.encoders = [threading.Thread(target=self._encode_loop, name=f"capture-encoder-{n}", daemon=True) for n in range(encoders)]
+        for thread in self.encoders: thread.start()
+
+    def capture(self, surface):
+        """Queues a copy of surface for encoding. Returns False if the frame was dropped."""
+        self.frames += 1
+        if surface.get_size() != self.size or surface.get_pitch() != self.pitch: self.dropped += 1; return False
+        try: slot = self.free.get_nowait()
+        except queue.Empty: self.dropped += 1; return False
+        view = surface.get_buffer() # Locks the surface until released below
+        memoryview(self.slots[slot])[:] = memoryview(view)
+        del view
+        self.filled.put((self.frames, slot)); self.captured += 1
+        return True
+
+    def _rgb_rows(self, data):
+        """Tightly packed RGB bytes of a captured frame."""
+        w, h = self.size
+        row_bytes = w * self.bytesize
+        if self.pitch != row_bytes: data = b"".join(data[y*self.pitch:y*self.pitch + row_bytes] for y in range(h))
+        rgb = bytearray(w * h * 3)
+        for n, offset in enumerate(self.rgb_offsets): rgb[n::3] = data[offset::self.bytesize]
+        return rgb
+
+    def encode_png(self, data):
+        w, h = self.size
+        rgb, stride = self._rgb_rows(data), w * 3
+        raw = b"".join(b"\x00" + rgb[y*stride:(y+1)*stride] for y in range(h)) # Filter type 0 per row
+        return (b"\x89PNG\r\n\x1a\n" + _png_chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0))
+                + _png_chunk(b"IDAT", zlib.compress(raw, self.png_level)) + _png_chunk(b"IEND", b""))
+
+    def _encode_loop(self):
+        while True:
+            item = self.filled.get()
+            if item is None: return
+            frame_no, slot = item
+            start = time.perf_counter()
+            try:
+                data = self.encode_png(self.slots[slot]) if self.fmt == "png" else self.slots[slot]
+                with open(os.path.join(self.out_dir, f"frame_{frame_no:06d}.{self.fmt}"), "wb") as f: f.write(data)
+                saved = True
+            except Exception as e:
+                saved = False; print(f"Frame capture: frame {frame_no} not saved: {e}")
+            self.free.put(slot)
+            with self._stats_lock:
+                if saved: self.saved += 1
+                else: self.errors += 1
+                self.encode_seconds += time.perf_counter() - start
+
+    def pending(self):
+        return self.filled.qsize()
+
+    def stop(self):
+        """Encodes whatever is still queued, then ends the encoder threads."""
+        for _ in self.encoders: self.filled.put(None)
+        for thread in self.encoders: thread.join()
+
+    def stats(self):
+        return {"frames": self.frames, "captured": self.captured, "saved": self.saved, "dropped": self.dropped, "errors": self.errors,
+                "pending": self.pending(), "ring": len(self.slots), "encode_ms": self.encode_seconds * 1000.0 / max(1, self.saved)}
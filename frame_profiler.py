@@ -0,0 +1,94 @@
+# frame_profiler.py
+# Per-frame phase timings and counters in a fixed-size ring buffer, with percentile summaries and export to
+# Chrome trace JSON (chrome://tracing, Perfetto) or CSV. When disabled every call returns after one attribute check;
+# enabling takes effect from the next begin_frame().
+import csv
+import json
+import time
+
+class FrameProfiler:
+    def __init__(self, phases, counters=(), capacity=600):
+        self.phases, self.counter_names, self.capacity = tuple(phases), tuple(counters), capacity
+        self.enabled = False
+        self.recording = False # Between begin_frame() and end_frame() of an enabled frame
+        # Ring buffers, one slot per frame: frame start times, then per phase (start, duration) and per counter value
+        self.frame_starts = [0.0] * capacity
+        self.phase_starts = {phase: [0.0] * capacity for phase in self.phases}
+        self.phase_durations = {phase: [0.0] * capacity for phase in self.phases}
+        self.counter_values = {name: [0] * capacity for name in self.counter_names}
+        self.frames = 0 # Frames recorded in total; the newest is at (frames - 1) % capacity
+        self._slot, self._last_mark = 0, 0.0
+        self._counts = dict.fromkeys(self.counter_names, 0)
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        if enabled: self.frames = 0 # Start from an empty history so old frames don't skew percentiles
+
+    def begin_frame(self):
+        self.recording = self.enabled
+        if not self.recording: return
+        self._slot = self.frames % self.capacity
+        self._last_mark = self.frame_starts[self._slot] = time.perf_counter()
+        for phase in self.phases: self.phase_durations[phase][self._slot] = 0.0
+        for name in self.counter_names: self._counts[name] = 0
+
+    def mark(self, phase):
+        """Ends `phase`: it ran from the previous mark (or the frame start) until now."""
+        if not self.recording: return
+        now = time.perf_counter()
+        self.phase_starts[phase][self._slot] = self._last_mark
+        self.phase_durations[phase][self._slot] += now - self._last_mark
+        self._last_mark = now
+
+    def count(self, name, n=1):
+        if self.recording: self._counts[name] += n
+
+    def end_frame(self):
+        if not self.recording: return
+        self.recording = False
+        for name in self.counter_names: self.counter_values[name][self._slot] = self._counts[name]
+        self.frames += 1
+
+    def _recent_slots(self):
+        """Ring slots of the recorded frames, oldest first."""
+        n = min(self.frames, self.capacity)
+        return [(self.frames - n + i) % self.capacity for i in range(n)]
+
+    def summary(self):
+        """{phase: (p50_ms, p99_ms)} and {counter: mean per frame} over the recorded history."""
+        slots = self._recent_slots()
+        if not slots: return {}, {}
+        phases = {}
+        for phase in self.phases:
+            values = sorted(self.phase_durations[phase][s] for s in slots)
+            phases[phase] = (values[len(values)//2] * 1000.0, values[min(len(values)-1, int(len(values)*0.99))] * 1000.0)
+        counters = {name: sum(self.counter_values[name][s] for s in slots) / len(slots) for name in self.counter_names}
+        return phases, counters
+
+    def export_chrome_trace(self, path):
+        """One complete ("X") event per phase per frame plus counter ("C") tracks, timestamps in microseconds."""
+        slots = self._recent_slots()
+        if not slots: return 0
+        t0 = self.frame_starts[slots[0]]
+        events = [{"name": "process_name", "ph": "M", "pid": 1, "args": {"name": "voxel game loop"}}]
+        for frame, s in enumerate(slots):
+            frame_ts = (self.frame_starts[s] - t0) * 1e6
+            for phase in self.phases:
+                dur = self.phase_durations[phase][s]
+                if dur > 0: events.append({"name": phase, "cat": "frame", "ph": "X", "pid": 1, "tid": 1, "ts": (self.phase_starts[phase][s] - t0) * 1e6, "dur": dur * 1e6, "args": {"frame": frame}})
+            if self.counter_names: events.append({"name": "counters", "ph": "C", "pid": 1, "ts": frame_ts, "args": {name: self.counter_values[name][s] for name in self.counter_names}})
+        with open(path, "w") as f: json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return len(slots)
+
+    def export_csv(self, path):
+        """One row per frame: start time, phase durations in ms, counters."""
+        slots = self._recent_slots()
+        if not slots: return 0
+        t0 = self.frame_starts[slots[0]]
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "start_ms"] + [f"{phase}_ms" for phase in self.phases] + list(self.counter_names))
+            for frame, s in enumerate(slots):
+                writer.writerow([frame, f"{(self.frame_starts[s] - t0) * 1000.0:.3f}"] + [f"{self.phase_durations[phase][s] * 1000.0:.3f}" for phase in self.phases]
+                                + [self.counter_values[name][s] for name in self.counter_names])
+        return len(slots)
@@ -1,6 +1,11 @@
 # game_config.py
 import os
 import json
+import time
+import copy
+import atexit
+import tempfile
+import threading
 
 CONFIG_FILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "game_settings.json")
 
@@ -15,7 +20,6 @@ DEFAULT_CONFIG = {
     "UI_PHYSICS_PANEL_MAX_WIDTH": 800,      # Maximum draggable width
     "UI_PHYSICS_PANEL_MIN_CONTENT_HEIGHT": 100, # Minimum draggable height for parameter area
     "UI_PHYSICS_PANEL_MAX_CONTENT_HEIGHT": 1000, # Maximum draggable height for parameter area
-    "UI_GROUND_CACHE_MARGIN": 100,
     "PHYSICS_PANEL_POS": [50, 50],
     "UI_PHYSICS_PANEL_TITLE_BAR_HEIGHT": 30,
     "UI_PHYSICS_PANEL_TITLE_COLOR": [60, 60, 80],
@@ -28,13 +32,32 @@ DEFAULT_CONFIG = {
     "UI_SCROLLBAR_COLOR": [70, 70, 90],
     "UI_SCROLLBAR_HANDLE_COLOR": [110, 110, 140],
     "UI_SCROLLBAR_HANDLE_HOVER_COLOR": [140, 140, 170],
+    "CONFIG_HOT_RELOAD_INTERVAL_S": 0.5,    # How often the game checks this file for outside edits; 0 disables
 
 
     # Visuals
     "VOXEL_SIZE": 10,
     "GROUND_RANGE": 60,
+    "TERRAIN_HILL_HEIGHT": 4,                # Voxels the rolling hills rise above the flat ground; 0 is flat
+    "GROUND_TILE_SIZE": 256,                 # Ground is cached as square tiles of this many pixels
+    "GROUND_TILE_CACHE_MB": 48,              # Memory budget for ground tiles over all zoom levels
+    "GROUND_ZOOM_SETTLE_S": 0.15,            # While zooming, cached tiles are scaled until the wheel is idle this long
     "CULLING_THRESHOLD": 0.05,
     "PLAYER_SCALE": 1.0,
+    "PLAYER_RENDER_BACKEND": "polygon",       # "polygon" (pygame.draw) or "zbuffer" (NumPy depth buffer; needs NumPy)
+    "PLAYER_SPRITE_CACHE_ENABLED": True,
+    "PLAYER_SPRITE_CACHE_MB": 32,            # Memory budget for pre-rendered player sprites
+    "PLAYER_SPRITE_CACHE_ROTATION_STEPS": 64, # Quaternion components are quantized to 1/N
+    "PLAYER_SPRITE_CACHE_SQUISH_STEPS": 100,  # Squish is quantized to 1/N
+    "PLAYER_LOD_ENABLED": True,
+    "PLAYER_LOD_MAX_LEVELS": 3,              # Coarser levels below full resolution, each half the voxels per axis
+    "PLAYER_LOD_MIN_VOXEL_PX": 2.0,          # Switch to a coarser level when a voxel's projected half-width drops below this
+    "PLAYER_LOD_HYSTERESIS": 0.2,            # Fractional band around the switch size that must be crossed to change level
+    "PLAYER_MODEL_PATH": "",                 # .vox or .bvox player model; empty for the built-in sphere
+    "PLAYER_MODEL_CACHE": True,              # Keep a model's LOD data in <model>.derived, rebuilt when the model changes
+    "QUALITY_GOVERNOR_ENABLED": True,        # Lower/raise render quality to hold QUALITY_TARGET_FPS (G toggles)
+    "QUALITY_TARGET_FPS": 60,                # Frame rate cap, and the rate the governor defends
+    "QUALITY_LEVEL": 0,                      # Governor level, 0 = full quality; saved by the game as it adapts
 
     # Physics - Movement (ensure all your physics params are here)
     "BASE_ACCEL_RATE": 12.0,
@@ -56,6 +79,17 @@ DEFAULT_CONFIG = {
     "BOUNCE_THRESHOLD": 3.0,
     "BOUNCE_ON_LAND_VELOCITY_UPS": 0.5,
 
+    # Diagnostics
+    "PROFILER_HISTORY_FRAMES": 600,          # Frames kept by the F3 frame profiler (percentiles and F4 export)
+    "CAPTURE_DIR": "captures",               # F5 frame capture writes a capture_<time> folder of frames here
+    "CAPTURE_FORMAT": "png",                 # "png", or "raw" screen buffers (with frames.json to decode them)
+    "CAPTURE_RING_FRAMES": 12,               # Frames that can wait for an encoder; beyond that frames are dropped
+    "CAPTURE_ENCODERS": 2,                   # Encoder threads
+
+    # Physics - Simulation
+    "PHYSICS_TICK_RATE": 120, # Fixed simulation ticks per second; rendering interpolates between ticks
+    "PHYSICS_THREADED": True, # Tick on a worker thread, independent of the frame rate (recording and replays always tick in the frame loop)
+
     # Physics - Ground Interaction
     "GROUND_CONTACT_THRESHOLD": 0.1,
     "REST_VELOCITY_THRESHOLD": 0.5,
@@ -88,16 +122,136 @@ def load_config():
         except Exception as e:
             print(f"Warning: Error loading config: {e}. Using defaults.")
     config = current_defaults
+    _remember_file_signature()
     if not os.path.exists(CONFIG_FILE_PATH) or "json.JSONDecodeError" in locals() or "Exception" in locals():
         save_config() # Save if file didn't exist or was corrupt, to ensure it's valid for next time
     return config
 
-def save_config():
+# Write-behind persistence: set_param/update_multiple only mark keys dirty and a background thread writes the file
+# once changes have been quiet for SAVE_DEBOUNCE_S (at most SAVE_MAX_DELAY_S after the first), so a burst of
+# changes costs one write. flush() writes immediately and runs at exit.
+SAVE_DEBOUNCE_S = 0.5
+SAVE_MAX_DELAY_S = 2.0
+persist = True # False keeps every change in memory only (input replays run on a recording's settings)
+dirty_keys = set()
+save_stats = {"requests": 0, "writes": 0, "skipped": 0, "errors": 0} # skipped = requests absorbed by another write or no-ops
+_pending_requests = 0
+_first_dirty_time = _last_dirty_time = None
+_state_lock = threading.Condition()
+_write_lock = threading.Lock() # Serializes file writes between the writer thread and flush() callers
+_writer_thread = None
+
+def _write_atomic(text):
+    """Writes text to a temp file next to the config and renames it over, so readers never see a partial file."""
+    tmp_path = None
     try:
-        with open(CONFIG_FILE_PATH, 'w') as f:
-            json.dump(config, f, indent=4, sort_keys=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(CONFIG_FILE_PATH), prefix=".game_settings.", suffix=".tmp")
+        with os.fdopen(fd, 'w') as f:
+            f.write(text); f.flush(); os.fsync(f.fileno())
+        os.replace(tmp_path, CONFIG_FILE_PATH)
+        return True
     except Exception as e:
         print(f"Error saving config: {e}")
+        if tmp_path is not None:
+            try: os.remove(tmp_path)
+            except OSError: pass
+        return False
+
+def _mark_dirty(keys):
+    global _pending_requests, _first_dirty_time, _last_dirty_time, _writer_thread
+    with _state_lock:
+        save_stats["requests"] += 1
+        if not keys or not persist: save_stats["skipped"] += 1; return # Nothing changed, or nothing may be written
+        dirty_keys.update(keys); _pending_requests += 1
+        _last_dirty_time = time.monotonic()
+        if _first_dirty_time is None: _first_dirty_time = _last_dirty_time
+        if _writer_thread is None:
+            _writer_thread = threading.Thread(target=_writer_loop, name="config-writer", daemon=True)
+            _writer_thread.start()
+        _state_lock.notify()
+
+def _writer_loop():
+    while True:
+        with _state_lock:
+            while True:
+                if not dirty_keys: _state_lock.wait(); continue
+                wait_s = min(_last_dirty_time + SAVE_DEBOUNCE_S, _first_dirty_time + SAVE_MAX_DELAY_S) - time.monotonic()
+                if wait_s <= 0: break
+                _state_lock.wait(wait_s)
+        try: flush()
+        except Exception as e: # Never let one bad save end the thread: later saves would silently be lost
+            print(f"Error saving config: {e}")
+            with _state_lock: save_stats["errors"] += 1
+            time.sleep(SAVE_DEBOUNCE_S) # Back off rather than spin if the pending change keeps failing
+
+def flush():
+    """Writes pending changes now, on the calling thread. Returns True if the file was written."""
+    global _pending_requests, _first_dirty_time, _last_dirty_time
+    with _write_lock:
+        with _state_lock:
+            if not dirty_keys: return False
+            absorbed, written_keys = _pending_requests - 1, set(dirty_keys)
+            dirty_keys.clear(); _pending_requests = 0; _first_dirty_time = None
+            try: text = json.dumps(config, indent=4, sort_keys=True) # Under the lock: a consistent snapshot
+            except (TypeError, ValueError) as e: # An unserializable value; the next change retries
+                print(f"Error saving config: {e}")
+                save_stats["errors"] += 1; save_stats["skipped"] += max(0, absorbed)
+                return False
+        ok = _write_atomic(text)
+        if ok: _remember_file_signature() # Our own write is not an outside edit
+        with _state_lock:
+            save_stats["writes" if ok else "errors"] += 1; save_stats["skipped"] += max(0, absorbed)
+            if not ok: # e.g. disk full or read-only: keep the keys pending so the writer and the exit flush retry
+                dirty_keys.update(written_keys); _pending_requests += 1
+                if _first_dirty_time is None: _first_dirty_time = time.monotonic()
+                _last_dirty_time = time.monotonic()
+                _state_lock.notify()
+        return ok
+
+atexit.register(flush)
+
+def save_config():
+    """Writes the whole config now."""
+    _mark_dirty(config.keys())
+    flush()
+
+# Hot reload: poll_file_changes() stats the file and only re-parses it when its mtime or size moved since we last
+# loaded or wrote it, then merges in the keys whose values differ.
+_file_signature = None
+reload_stats = {"polls": 0, "reloads": 0, "keys_applied": 0, "errors": 0}
+
+def _file_stat_signature():
+    try:
+        st = os.stat(CONFIG_FILE_PATH)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+def _remember_file_signature():
+    global _file_signature
+    _file_signature = _file_stat_signature()
+
+def poll_file_changes():
+    """Picks up outside edits to the settings file. Returns {key: new value} for the keys that changed, already
+    applied to config. Keys with unsaved local changes keep their local value (it is about to be written)."""
+    global _file_signature
+    reload_stats["polls"] += 1
+    signature = _file_stat_signature()
+    if signature is None or signature == _file_signature: return {}
+    _file_signature = signature # Even on a parse error: a half-saved file gets another mtime once the editor finishes
+    try:
+        with open(CONFIG_FILE_PATH, 'r') as f:
+            loaded_from_file = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Not reloading {CONFIG_FILE_PATH}: {e}")
+        reload_stats["errors"] += 1
+        return {}
+    reloaded = DEFAULT_CONFIG.copy(); reloaded.update(loaded_from_file) # Keys deleted from the file fall back to defaults
+    with _state_lock:
+        changed = {key: value for key, value in reloaded.items() if key not in dirty_keys and config.get(key) != value}
+        config.update(changed)
+    if changed: reload_stats["reloads"] += 1; reload_stats["keys_applied"] += len(changed)
+    return changed
 
 def get(key, default_override=None):
     if default_override is not None:
@@ -105,11 +259,15 @@ def get(key, default_override=None):
     return config.get(key, DEFAULT_CONFIG.get(key)) # Fallback to DEFAULT_CONFIG if key somehow missing
 
 def set_param(key, value):
-    config[key] = value
-    save_config()
+    with _state_lock: # The writer serializes config under this lock
+        changed = key not in config or config[key] != value
+        config[key] = copy.deepcopy(value) # Callers keep mutating lists such as the panel position; keep our own copy
+    _mark_dirty([key] if changed else [])
 
 def update_multiple(updates_dict):
-    config.update(updates_dict)
-    save_config()
+    with _state_lock:
+        changed = [key for key, value in updates_dict.items() if key not in config or config[key] != value]
+        config.update(copy.deepcopy(updates_dict))
+    _mark_dirty(changed)
 
 load_config()
\ No newline at end of file
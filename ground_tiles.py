@@ -0,0 +1,87 @@
+# ground_tiles.py
+# Tiled ground cache. The projected ground is cut into square tiles of screen pixels measured from where the world
+# origin projects, so a tile's image depends only on the zoom (and the ground itself), not on the camera. Tiles are
+# rendered on demand and kept in a byte-budgeted LRU across pans and zoom steps; panning renders only the tiles
+# newly exposed. While a zoom gesture is in progress, the nearest zoom whose tiles are all cached can be scaled in
+# place of a crisp render.
+import math
+import pygame
+from sprite_cache import SpriteCache
+
+class GroundTileCache:
+    def __init__(self, render_tile, tile_size=256, max_bytes=48 * 1024 * 1024):
+        self.render_tile = render_tile # render_tile(surface, zoom, tile_rect): draws the ground covering tile_rect (origin-relative pixels)
+        self.tile_size = tile_size
+        self.tiles = SpriteCache(max_bytes)
+        self.version = 0 # Part of every key; bumped when the ground's look changes, so stale tiles just age out
+        self.zooms = {}  # zoom key -> tiles rendered at it (most recent last); candidates for scaled drawing
+        self.tiles_rendered, self.scaled_draws = 0, 0
+
+    @staticmethod
+    def zoom_key(zoom):
+        return round(zoom, 4)
+
+    def invalidate(self):
+        self.version += 1; self.zooms.clear(); self.tiles.clear()
+
+    def set_tile_size(self, tile_size):
+        self.tile_size = tile_size; self.invalidate()
+
+    def tile_range(self, origin, area, scale=1.0):
+        """Tile coords covering screen rect `area` at a zoom `scale` times the one the tiles were rendered at."""
+        t = self.tile_size * scale
+        x0, y0 = (area.left - origin[0]) / t, (area.top - origin[1]) / t
+        x1, y1 = (area.right - origin[0]) / t, (area.bottom - origin[1]) / t
+        return [(tx, ty) for ty in range(math.floor(y0), math.ceil(y1)) for tx in range(math.floor(x0), math.ceil(x1))]
+
+    def get_tile(self, zoom, tx, ty):
+        key = (self.version, self.zoom_key(zoom), tx, ty)
+        tile = self.tiles.get(key)
+        if tile is None:
+            t = self.tile_size
+            tile = pygame.Surface((t, t))
+            self.render_tile(tile, zoom, pygame.Rect(tx * t, ty * t, t, t))
+            self.tiles.put(key, tile); self.tiles_rendered += 1
+            self.zooms[self.zoom_key(zoom)] = self.zooms.pop(self.zoom_key(zoom), 0) + 1
+        return tile
+
+    def prefetch(self, zoom, origin, area):
+        """Renders any missing tiles covering `area`. Returns how many were rendered."""
+        rendered = self.tiles_rendered
+        for tx, ty in self.tile_range(origin, area): self.get_tile(zoom, tx, ty)
+        return self.tiles_rendered - rendered
+
+    def is_cached(self, zoom, origin, area):
+        zk = self.zoom_key(zoom)
+        return all((self.version, zk, tx, ty) in self.tiles.entries for tx, ty in self.tile_range(origin, area))
+
+    def nearest_cached_zoom(self, zoom, origin, area, max_ratio=2.0):
+        """The cached zoom closest to `zoom` (within max_ratio) whose tiles cover `area` once scaled, or None."""
+        zk = self.zoom_key(zoom)
+        for cached_zoom in sorted(self.zooms, key=lambda z: abs(math.log(z / zoom))):
+            if cached_zoom == zk or max(cached_zoom / zoom, zoom / cached_zoom) > max_ratio: continue
+            scale = zoom / cached_zoom
+            if all((self.version, cached_zoom, tx, ty) in self.tiles.entries for tx, ty in self.tile_range(origin, area, scale)): return cached_zoom
+        return None
+
+    def draw(self, target, origin, zoom, area, scaled_from=None, smooth=True):
+        """Draws the ground over screen rect `area` of target, with the world origin projected at `origin`. With
+        scaled_from, that zoom's cached tiles are stretched to `zoom` instead of rendering any tiles (filtered
+        unless smooth is False)."""
+        t = self.tile_size
+        if scaled_from is None:
+            for tx, ty in self.tile_range(origin, area):
+                target.blit(self.get_tile(zoom, tx, ty), (origin[0] + tx * t, origin[1] + ty * t))
+            return
+        scale = zoom / scaled_from
+        tiles = self.tile_range(origin, area, scale)
+        tx0, ty0 = min(tx for tx, _ in tiles), min(ty for _, ty in tiles)
+        tw, th = max(tx for tx, _ in tiles) - tx0 + 1, max(ty for _, ty in tiles) - ty0 + 1
+        mosaic = pygame.Surface((tw * t, th * t))
+        for tx, ty in tiles: mosaic.blit(self.tiles.get((self.version, scaled_from, tx, ty)), ((tx - tx0) * t, (ty - ty0) * t))
+        scaled = (pygame.transform.smoothscale if smooth else pygame.transform.scale)(mosaic, (max(1, round(tw * t * scale)), max(1, round(th * t * scale))))
+        target.blit(scaled, (origin[0] + round(tx0 * t * scale), origin[1] + round(ty0 * t * scale)))
+        self.scaled_draws += 1
+
+    def stats(self):
+        return {**self.tiles.stats(), "rendered": self.tiles_rendered, "scaled_draws": self.scaled_draws, "zoom_levels": len(self.zooms)}
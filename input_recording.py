@@ -0,0 +1,68 @@
+# input_recording.py
+# Per-frame input capture for reproducible sessions. A recording is JSONL (gzip-compressed when the path ends in
+# .gz): a header line with the settings the session started with, then one line per frame with its dt, the
+# monotonic time the frame started, the input events the game handles, the polled keys held and the mouse state.
+# Replaying feeds exactly that back to the game loop in place of pygame's event queue, keyboard and clock.
+import atexit
+import gzip
+import json
+import pygame
+
+RECORDING_VERSION = 1
+# Keys the game reads through pygame.key.get_pressed(); only these are stored per frame
+POLLED_KEYS = (pygame.K_w, pygame.K_a, pygame.K_s, pygame.K_d, pygame.K_LSHIFT, pygame.K_RSHIFT, pygame.K_SPACE)
+RECORDED_EVENT_TYPES = (pygame.QUIT, pygame.VIDEORESIZE, pygame.KEYDOWN, pygame.KEYUP, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION, pygame.MOUSEWHEEL)
+EVENT_FIELDS = ("key", "mod", "unicode", "scancode", "button", "pos", "rel", "buttons", "x", "y", "w", "h", "flipped")
+TUPLE_FIELDS = ("pos", "rel", "buttons")
+
+def _open(path, mode):
+    return gzip.open(path, mode + "t", encoding="utf-8") if path.endswith(".gz") else open(path, mode, encoding="utf-8")
+
+def encode_event(event):
+    return [event.type, {name: getattr(event, name) for name in EVENT_FIELDS if hasattr(event, name)}]
+
+def decode_event(item):
+    event_type, fields = item
+    return pygame.event.Event(event_type, {name: tuple(value) if name in TUPLE_FIELDS else value for name, value in fields.items()})
+
+class RecordedKeys:
+    """Stands in for the pygame.key.get_pressed() sequence."""
+    __slots__ = ("pressed",)
+    def __init__(self, pressed):
+        self.pressed = frozenset(pressed)
+    def __getitem__(self, key):
+        return key in self.pressed
+
+class InputRecorder:
+    def __init__(self, path, config):
+        self.path, self.frames = path, 0
+        self.file = _open(path, "w")
+        self.file.write(json.dumps({"version": RECORDING_VERSION, "pygame": pygame.version.ver, "config": config}) + "\n")
+        atexit.register(self.close) # A session that crashes is the one most worth replaying
+
+    def record(self, dt, now, events, keys, mouse_pos, mouse_buttons):
+        frame = {"dt": dt, "t": now, "k": [key for key in POLLED_KEYS if keys[key]], "m": list(mouse_pos), "mb": list(mouse_buttons)}
+        recorded = [encode_event(e) for e in events if e.type in RECORDED_EVENT_TYPES]
+        if recorded: frame["ev"] = recorded
+        self.file.write(json.dumps(frame, separators=(",", ":")) + "\n")
+        self.frames += 1
+
+    def close(self):
+        if not self.file.closed: self.file.close()
+
+class InputReplay:
+    """A loaded recording. frame(n) returns that frame's input as the game loop consumes it."""
+    def __init__(self, path):
+        with _open(path, "r") as f:
+            header = json.loads(f.readline())
+            if header.get("version") != RECORDING_VERSION: raise ValueError(f"{path}: unsupported recording version {header.get('version')}")
+            self.frames = [json.loads(line) for line in f if line.strip()]
+        self.path, self.config = path, header["config"]
+
+    def __len__(self):
+        return len(self.frames)
+
+    def frame(self, n):
+        frame = self.frames[n]
+        return {"dt": frame["dt"], "now": frame["t"], "events": [decode_event(e) for e in frame.get("ev", ())],
+                "keys": RecordedKeys(frame["k"]), "mouse_pos": tuple(frame["m"]), "mouse_buttons": tuple(frame["mb"])}
@@ -0,0 +1,37 @@
+# physics_params.py
+# The tunable physics parameters: slider ranges and display formats shared by the T panel and the sweep tool.
+# No pygame here, so headless tools can import it.
+
+physics_params_config = [
+    {"var_name": "BASE_ACCEL_RATE", "label": "Base Accel Rate", "min_val": 1.0, "max_val": 100.0, "format_str": "{:.1f}"},
+    {"var_name": "FAST_ACCEL_RATE", "label": "Fast Accel Rate", "min_val": 1.0, "max_val": 100.0, "format_str": "{:.1f}"},
+    {"var_name": "BASE_MAX_SPEED_UPS", "label": "Base Max Speed", "min_val": 1.0, "max_val": 100.0, "format_str": "{:.1f}"},
+    {"var_name": "FAST_MAX_SPEED_UPS", "label": "Fast Max Speed", "min_val": 1.0, "max_val": 100.0, "format_str": "{:.1f}"},
+    {"var_name": "DAMPING_FACTOR", "label": "Damping Factor", "min_val": 0.0, "max_val": 20.0, "format_str": "{:.2f}"},
+    {"var_name": "MASS", "label": "Mass", "min_val": 0.1, "max_val": 20.0, "format_str": "{:.1f}"},
+    {"var_name": "STICTION_THRESHOLD", "label": "Stiction Threshold", "min_val": 0.0, "max_val": 5.0, "format_str": "{:.2f}"},
+    {"var_name": "EXTRA_FRICTION", "label": "Extra Friction", "min_val": 0.0, "max_val": 0.5, "format_str": "{:.3f}"},
+    {"var_name": "BASE_SPEED_MULTIPLIER", "label": "Base Speed Multi", "min_val": 0.1, "max_val": 5.0, "format_str": "{:.2f}"},
+    {"var_name": "GRAVITY_ACCEL", "label": "Gravity Accel", "min_val": -100.0, "max_val": -1.0, "format_str": "{:.1f}"},
+    {"var_name": "INITIAL_JUMP_VELOCITY_UPS", "label": "Initial Jump Vel.", "min_val": 1.0, "max_val": 50.0, "format_str": "{:.1f}"},
+    {"var_name": "JUMP_CHARGE_BOOST_ACCEL_RATE", "label": "Jump Charge Boost", "min_val": 0.0, "max_val": 50.0, "format_str": "{:.1f}"},
+    {"var_name": "MAX_JUMP_CHARGE_DURATION", "label": "Max Jump Charge (s)", "min_val": 0.1, "max_val": 3.0, "format_str": "{:.2f}"},
+    {"var_name": "COEFFICIENT_OF_RESTITUTION", "label": "Restitution Coeff.", "min_val": 0.0, "max_val": 1.0, "format_str": "{:.2f}"},
+    {"var_name": "BOUNCE_THRESHOLD", "label": "Bounce Threshold", "min_val": 0.0, "max_val": 20.0, "format_str": "{:.1f}"},
+    {"var_name": "BOUNCE_ON_LAND_VELOCITY_UPS", "label": "Min Bounce Vel.", "min_val": 0.0, "max_val": 10.0, "format_str": "{:.2f}"},
+    {"var_name": "GROUND_CONTACT_THRESHOLD", "label": "Ground Contact Thr.", "min_val": 0.01, "max_val": 1.0, "format_str": "{:.2f}"},
+    {"var_name": "REST_VELOCITY_THRESHOLD", "label": "Rest Velocity Thr.", "min_val": 0.01, "max_val": 2.0, "format_str": "{:.2f}"},
+    {"var_name": "elasticity", "label": "Squish Elasticity", "min_val": 1.0, "max_val": 50.0, "format_str": "{:.1f}"},
+    {"var_name": "SQUISH_ON_JUMP_START", "label": "Squish on Jump", "min_val": 0.1, "max_val": 1.0, "format_str": "{:.2f}"},
+    {"var_name": "SQUISH_ON_LANDING", "label": "Base Squish Land", "min_val": 0.1, "max_val": 1.0, "format_str": "{:.2f}"},
+    {"var_name": "MAX_SQUISH_FROM_CHARGE", "label": "Max Squish (Charge)", "min_val": 0.1, "max_val": 0.9, "format_str": "{:.2f}"},
+    {"var_name": "SQUISH_DAMPING", "label": "Squish Damping", "min_val": 0.0, "max_val": 30.0, "format_str": "{:.1f}"},
+    {"var_name": "IMPACT_VELOCITY_THRESHOLD", "label": "Impact Vel. Thr.", "min_val": 0.0, "max_val": 20.0, "format_str": "{:.1f}"},
+    {"var_name": "MAX_IMPACT_VELOCITY", "label": "Max Impact Vel.", "min_val": 1.0, "max_val": 100.0, "format_str": "{:.1f}"},
+    {"var_name": "MIN_SQUISH_ON_LANDING", "label": "Min Squish (Land)", "min_val": 0.1, "max_val": 1.0, "format_str": "{:.2f}"},
+    {"var_name": "MAX_SQUISH_ON_LANDING", "label": "Max Squish (Land)", "min_val": 0.1, "max_val": 1.0, "format_str": "{:.2f}"},
+    {"var_name": "PLAYER_SCALE_cfg", "label": "Player Scale", "min_val": 0.1, "max_val": 5.0, "format_str": "{:.2f}"},
+    {"var_name": "CULLING_THRESHOLD_cfg", "label": "Culling Threshold", "min_val": -1.0, "max_val": 1.0, "format_str": "{:.3f}"},
+]
+
+PARAM_CONFIG_KEYS = {"PLAYER_SCALE_cfg": "PLAYER_SCALE", "CULLING_THRESHOLD_cfg": "CULLING_THRESHOLD"} # Panel globals whose config key differs
@@ -0,0 +1,62 @@
+# quality_governor.py
+# Adaptive quality: watches how long recent frames took to produce (excluding the frame-cap wait) and steps along a
+# ladder of quality settings to hold a target frame rate. Over budget steps down at once; headroom steps back up
+# only after a longer quiet spell, and a step up that immediately proves too costly makes the next one wait longer.
+# No pygame dependency; the game applies the settings of the current level.
+import collections
+
+# Quality ladder, best first. culling_offset is added to CULLING_THRESHOLD (more grazing faces culled), lod_bias
+# to the zoom-selected player LOD level; sprite_rotation_divisor coarsens the sprite cache's rotation steps (more
+# hits, fewer re-renders) and smooth_ground_zoom=False stretches cached ground with a plain scale while zooming.
+QUALITY_LEVELS = (
+    {"culling_offset": 0.0, "lod_bias": 0, "sprite_rotation_divisor": 1, "smooth_ground_zoom": True},
+    {"culling_offset": 0.1, "lod_bias": 0, "sprite_rotation_divisor": 1, "smooth_ground_zoom": True},
+    {"culling_offset": 0.1, "lod_bias": 1, "sprite_rotation_divisor": 1, "smooth_ground_zoom": True},
+    {"culling_offset": 0.2, "lod_bias": 1, "sprite_rotation_divisor": 2, "smooth_ground_zoom": False},
+    {"culling_offset": 0.3, "lod_bias": 1, "sprite_rotation_divisor": 4, "smooth_ground_zoom": False},
+)
+
+class QualityGovernor:
+    def __init__(self, target_fps=60, level=0, window=30, over_budget=0.95, headroom=0.6, upgrade_wait=120, levels=QUALITY_LEVELS):
+        self.levels = levels
+        self.window, self.over_budget, self.headroom = window, over_budget, headroom
+        self.base_upgrade_wait = self.upgrade_wait = upgrade_wait # Frames of headroom needed before stepping up
+        self.frame_times = collections.deque(maxlen=window) # Seconds of work per frame since the last change
+        self.level = max(0, min(int(level), len(levels) - 1))
+        self.set_target_fps(target_fps)
+        self.frames_since_change, self.last_change = 0, None # last_change: "down" / "up" / None
+        self.downgrades, self.upgrades = 0, 0
+
+    def set_target_fps(self, target_fps):
+        self.budget_s = 1.0 / max(1, target_fps)
+
+    def set_level(self, level):
+        level = max(0, min(int(level), len(self.levels) - 1))
+        if level != self.level: self.level = level; self.frame_times.clear(); self.frames_since_change = 0
+        return level
+
+    @property
+    def settings(self):
+        return self.levels[self.level]
+
+    def recent_ms(self):
+        """90th percentile of the frame times in the window, in ms (0 while empty)."""
+        if not self.frame_times: return 0.0
+        ordered = sorted(self.frame_times)
+        return ordered[min(len(ordered) - 1, int(0.9 * len(ordered)))] * 1000.0
+
+    def record(self, work_s):
+        """Feeds one frame's work time. Returns the new level when this frame changed it, else None."""
+        self.frame_times.append(work_s); self.frames_since_change += 1
+        if len(self.frame_times) < self.window: return None
+        p90_s = self.recent_ms() / 1000.0
+        if p90_s > self.budget_s * self.over_budget and self.level < len(self.levels) - 1:
+            if self.last_change == "up" and self.frames_since_change < 2 * self.window: # The last step up didn't fit
+                self.upgrade_wait = min(self.upgrade_wait * 2, 16 * self.base_upgrade_wait)
+            self.downgrades += 1; self.last_change = "down"
+            return self.set_level(self.level + 1)
+        if p90_s < self.budget_s * self.headroom and self.level > 0 and self.frames_since_change >= self.upgrade_wait:
+            if self.last_change == "up": self.upgrade_wait = self.base_upgrade_wait # Held the previous step up
+            self.upgrades += 1; self.last_change = "up"
+            return self.set_level(self.level - 1)
+        return None
@@ -0,0 +1,66 @@
+# replay_diff.py
+# Compares two replays of the same recording (python voxel.py --replay REC --report R --trajectory T), typically
+# from two builds: the player trajectories must match frame by frame, and the frame times must not regress.
+# Usage: python replay_diff.py BASE_TRAJECTORY NEW_TRAJECTORY [--reports BASE.json NEW.json] [--tolerance 1e-9] [--max-slowdown 1.10]
+# Exits with 1 when either check fails.
+import argparse
+import json
+import math
+import sys
+
+TRAJECTORY_FIELDS = ("pos", "vel", "squish", "rot")
+
+def load_trajectory(path):
+    with open(path) as f: return [json.loads(line) for line in f if line.strip()]
+
+def flat(value):
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+def diff_trajectories(base, new, tolerance):
+    """(first differing frame or None, {field: largest absolute difference}) over the frames both runs have."""
+    first, worst = None, dict.fromkeys(TRAJECTORY_FIELDS, 0.0)
+    for a, b in zip(base, new):
+        for field in TRAJECTORY_FIELDS:
+            d = max((abs(x - y) for x, y in zip(flat(a[field]), flat(b[field]))), default=0.0)
+            worst[field] = max(worst[field], d)
+            if first is None and not d <= tolerance: first = a["f"] # "not <=" so NaN counts as a difference
+    if first is None and len(base) != len(new): first = min(len(base), len(new))
+    return first, worst
+
+def compare_reports(base, new, max_slowdown):
+    """Lines comparing frame and phase times; the bool is False when mean or p99 frame time grew past max_slowdown."""
+    lines, ok = [], True
+    for stat in ("mean", "p50", "p90", "p99", "max"):
+        b, n = base["frame_ms"][stat], new["frame_ms"][stat]
+        ratio = n / b if b > 0 else math.inf
+        flag = ""
+        if stat in ("mean", "p99") and ratio > max_slowdown: flag, ok = "  REGRESSION", False
+        lines.append(f"  frame {stat:>4}: {b:8.2f} -> {n:8.2f} ms ({ratio:5.2f}x){flag}")
+    for phase, times in base.get("phases_ms", {}).items():
+        if phase in new.get("phases_ms", {}):
+            lines.append(f"  {phase:>9} p50: {times['p50']:8.3f} -> {new['phases_ms'][phase]['p50']:8.3f} ms")
+    return lines, ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two replays for behaviour and performance regressions.")
+    parser.add_argument("base_trajectory"); parser.add_argument("new_trajectory")
+    parser.add_argument("--reports", nargs=2, metavar=("BASE", "NEW"), help="Frame-time reports of the two replays")
+    parser.add_argument("--tolerance", type=float, default=1e-9, help="Largest allowed absolute difference per value")
+    parser.add_argument("--max-slowdown", type=float, default=1.10, help="Largest allowed ratio of new to base mean/p99 frame time")
+    args = parser.parse_args()
+
+    base, new = load_trajectory(args.base_trajectory), load_trajectory(args.new_trajectory)
+    first, worst = diff_trajectories(base, new, args.tolerance)
+    ok = first is None
+    print(f"Trajectory: {len(base)} vs {len(new)} frames, " + ("identical within tolerance" if ok else f"diverges at frame {first}"))
+    print("  max |diff|: " + ", ".join(f"{field} {worst[field]:.3g}" for field in TRAJECTORY_FIELDS))
+    if args.reports:
+        with open(args.reports[0]) as f: base_report = json.load(f)
+        with open(args.reports[1]) as f: new_report = json.load(f)
+        lines, perf_ok = compare_reports(base_report, new_report, args.max_slowdown)
+        print(f"Frame times ({base_report['frames']} vs {new_report['frames']} frames):"); print("\n".join(lines))
+        ok = ok and perf_ok
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
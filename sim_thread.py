@@ -0,0 +1,80 @@
+# sim_thread.py
+# Runs a BlobPhysics on its own thread at its fixed tick rate, so how long a frame takes to render no longer
+# changes how often or how precisely the blob is simulated. The render thread forwards input with send_input()
+# and reads the state through render_state(), which interpolates between the last two published snapshots.
+# Snapshots are immutable tuples and the (previous, latest) pair is swapped in with a single assignment, so the
+# reader never sees a half-updated pair and neither side takes a lock.
+import collections
+import threading
+import time
+from collections import namedtuple
+from blob_physics import BlobRenderState, NO_INPUT
+from voxel_math import quat_nlerp
+
+# State after a tick; t is the perf_counter time it represents (the end of the tick's slot in the schedule)
+SimSnapshot = namedtuple("SimSnapshot", "tick t pos vel rotation squish")
+MAX_CATCH_UP_S = 0.25 # Further behind schedule than this (a stall), the missed ticks are dropped, not fast-forwarded
+
+class SimulationThread:
+    def __init__(self, physics, rate_window=240):
+        self.physics = physics
+        self.inputs = collections.deque() # BlobInputs from the render thread; deque append/popleft are thread-safe
+        self.held = NO_INPUT # Latest forwarded input, applied to every tick until the next one arrives
+        self.paused = False
+        self.ticks, self.dropped_ticks, self.tick_seconds = 0, 0, 0.0
+        self.tick_times = collections.deque(maxlen=rate_window) # Wall times of recent ticks, for the measured rate
+        now = time.perf_counter()
+        self.snapshots = (self._snapshot(now), self._snapshot(now)) # (previous, latest)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="simulation", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set(); self._thread.join()
+
+    def send_input(self, inputs):
+        self.inputs.append(inputs)
+
+    def _snapshot(self, t):
+        p = self.physics
+        return SimSnapshot(p.ticks, t, tuple(p.pos), tuple(p.vel), p.rotation, p.squish)
+
+    def _run(self):
+        physics = self.physics
+        next_t = time.perf_counter()
+        while not self._stop.is_set():
+            dt = physics.fixed_dt # Re-read every tick: PHYSICS_TICK_RATE can be hot-reloaded
+            now = time.perf_counter()
+            if now < next_t: self._stop.wait(next_t - now); continue
+            if now - next_t > MAX_CATCH_UP_S:
+                self.dropped_ticks += int((now - next_t) / dt); next_t = now
+            jump_pressed = False
+            while self.inputs:
+                inputs = self.inputs.popleft()
+                jump_pressed = jump_pressed or inputs.jump_pressed
+                self.held = inputs._replace(jump_pressed=False) # The press is an edge: it goes in once, via pending_jump
+            if self.paused: next_t = now + dt; continue # Nothing moves; presses made while paused are dropped, as before
+            tick_start = time.perf_counter()
+            physics.pending_jump = physics.pending_jump or jump_pressed
+            physics.tick(self.held)
+            physics.prev_state = physics.current_state() # Keeps BlobPhysics.render_state() usable for tools
+            tick_end = time.perf_counter()
+            self.ticks += 1; self.tick_seconds += tick_end - tick_start; self.tick_times.append(tick_end)
+            self.snapshots = (self.snapshots[1], self._snapshot(next_t + dt))
+            next_t += dt
+
+    def render_state(self, now):
+        """Player state at perf_counter time `now`, interpolated between the last two snapshots."""
+        prev, latest = self.snapshots
+        span = latest.t - prev.t
+        alpha = min(1.0, max(0.0, (now - prev.t) / span)) if span > 0 else 1.0
+        return BlobRenderState(tuple(a + (b-a)*alpha for a, b in zip(prev.pos, latest.pos)), tuple(a + (b-a)*alpha for a, b in zip(prev.vel, latest.vel)),
+                               quat_nlerp(prev.rotation, latest.rotation, alpha), prev.squish + (latest.squish - prev.squish)*alpha)
+
+    def measured_rate(self):
+        """Ticks per second over the recent window (0 until there are two)."""
+        times = self.tick_times
+        return (len(times) - 1) / (times[-1] - times[0]) if len(times) > 1 and times[-1] > times[0] else 0.0
@@ -0,0 +1,155 @@
+# spatial_hash.py
+# Uniform-grid spatial hash of spheres (blobs, obstacles) for collision queries that stay near O(N) instead of
+# checking all pairs. Each entity lives in the one cell holding its centre, in a dict keyed by integer cell
+# coordinate, so moving an entity only touches the hash when it crosses into another cell. Queries scan the cells
+# within reach of the query: with cells at least one entity diameter wide (cell_size_for) that is the 3x3x3 block
+# around a cell. No pygame or NumPy dependency.
+import math
+
+def cell_size_for(base_radius, player_scale=1.0):
+    """Cell edge for blobs of the given base radius and scale: one diameter, so overlapping blobs share or neighbour a cell."""
+    return max(1e-6, 2.0 * base_radius * player_scale)
+
+def _half_neighbourhood(reach):
+    """Offsets to the cells within reach that come after (0, 0, 0) in lexicographic order: visiting these from
+    every cell meets each pair of neighbouring cells exactly once."""
+    span = range(-reach, reach + 1)
+    return tuple((dx, dy, dz) for dx in span for dy in span for dz in span if (dx, dy, dz) > (0, 0, 0))
+
+def ray_sphere(origin, direction, centre, radius):
+    """Distance along a unit direction to where the ray enters the sphere (0 when it starts inside), or None."""
+    ox, oy, oz = origin[0] - centre[0], origin[1] - centre[1], origin[2] - centre[2]
+    b = ox*direction[0] + oy*direction[1] + oz*direction[2]
+    c = ox*ox + oy*oy + oz*oz - radius*radius
+    if c <= 0: return 0.0
+    disc = b*b - c
+    if b > 0 or disc < 0: return None # Pointing away, or passing by
+    return -b - math.sqrt(disc)
+
+class SpatialHash:
+    def __init__(self, cell_size):
+        self.cell_size = float(cell_size)
+        self.cells = {} # (cx, cy, cz) -> set of keys
+        self.spheres = {} # key -> [x, y, z, radius]
+        self.entity_cells = {} # key -> (cx, cy, cz)
+        self.max_radius = 0.0 # Largest radius ever inserted; sets how far queries reach
+        self._reach, self._half = 1, _half_neighbourhood(1)
+        self.cell_moves = 0 # Updates that crossed into another cell
+
+    def __len__(self):
+        return len(self.spheres)
+
+    def __contains__(self, key):
+        return key in self.spheres
+
+    def cell_of(self, x, y, z):
+        s = self.cell_size
+        return (math.floor(x / s), math.floor(y / s), math.floor(z / s))
+
+    def _grow(self, radius):
+        if radius <= self.max_radius: return
+        self.max_radius = radius
+        reach = max(1, math.ceil(2.0 * radius / self.cell_size)) # Two spheres this big can be this many cells apart
+        if reach != self._reach: self._reach, self._half = reach, _half_neighbourhood(reach)
+
+    def insert(self, key, pos, radius):
+        if key in self.spheres: raise KeyError(f"{key!r} is already in the spatial hash")
+        cell = self.cell_of(*pos)
+        self.spheres[key] = [pos[0], pos[1], pos[2], radius]
+        self.entity_cells[key] = cell
+        self.cells.setdefault(cell, set()).add(key)
+        self._grow(radius)
+
+    def update(self, key, pos, radius=None):
+        """Moves (and optionally resizes) an entity; the cell dict is only touched when it changes cell."""
+        sphere = self.spheres[key]
+        sphere[0], sphere[1], sphere[2] = pos[0], pos[1], pos[2]
+        if radius is not None: sphere[3] = radius; self._grow(radius)
+        cell = self.cell_of(pos[0], pos[1], pos[2])
+        old = self.entity_cells[key]
+        if cell != old:
+            members = self.cells[old]; members.discard(key)
+            if not members: del self.cells[old]
+            self.cells.setdefault(cell, set()).add(key); self.entity_cells[key] = cell
+            self.cell_moves += 1
+
+    def remove(self, key):
+        cell = self.entity_cells.pop(key); del self.spheres[key]
+        members = self.cells[cell]; members.discard(key)
+        if not members: del self.cells[cell]
+
+    def _cells_near(self, x, y, z, distance):
+        """Occupied cells whose entities can be within distance of (x, y, z)."""
+        reach = math.ceil(distance / self.cell_size)
+        cx, cy, cz = self.cell_of(x, y, z)
+        if (2*reach + 1) ** 3 > len(self.cells): # Cheaper to look at every occupied cell
+            return [members for (ox, oy, oz), members in self.cells.items() if abs(ox-cx) <= reach and abs(oy-cy) <= reach and abs(oz-cz) <= reach]
+        cells, span = self.cells, range(-reach, reach + 1)
+        return [cells[c] for c in ((cx+dx, cy+dy, cz+dz) for dx in span for dy in span for dz in span) if c in cells]
+
+    def query_sphere(self, centre, radius, exclude=None):
+        """Keys of the entities overlapping the sphere (touching does not count)."""
+        x, y, z = centre
+        found = []
+        for members in self._cells_near(x, y, z, radius + self.max_radius):
+            for key in members:
+                if key == exclude: continue
+                sx, sy, sz, sr = self.spheres[key]
+                if (sx-x)**2 + (sy-y)**2 + (sz-z)**2 < (sr + radius)**2: found.append(key)
+        return found
+
+    def query_ray(self, origin, direction, max_distance, exclude=None):
+        """(key, distance) of the first entity a ray hits within max_distance, or None. Walks the cells the ray
+        crosses in order (3D DDA), testing the entities that can reach into each, and stops at the first cell
+        whose exit lies past the nearest hit so far."""
+        length = math.sqrt(sum(c*c for c in direction))
+        if length == 0: raise ValueError("Ray direction must be non-zero")
+        d = tuple(c / length for c in direction)
+        s = self.cell_size
+        cell = list(self.cell_of(*origin))
+        step, t_next, t_delta = [0, 0, 0], [math.inf] * 3, [math.inf] * 3
+        for axis in range(3):
+            if d[axis] > 0: step[axis], t_next[axis] = 1, ((cell[axis] + 1) * s - origin[axis]) / d[axis]
+            elif d[axis] < 0: step[axis], t_next[axis] = -1, (cell[axis] * s - origin[axis]) / d[axis]
+            if d[axis] != 0: t_delta[axis] = s / abs(d[axis])
+        reach = max(1, math.ceil(self.max_radius / s))
+        span = range(-reach, reach + 1)
+        cells, spheres = self.cells, self.spheres
+        tested, best, t_enter = set(), None, 0.0
+        visit_limit = 3 * (math.ceil(max_distance / s) + 2) # Cells a ray of that length can cross, plus slack
+        for _ in range(visit_limit):
+            if t_enter > max_distance or not cells: break
+            cx, cy, cz = cell
+            for c in ((cx+dx, cy+dy, cz+dz) for dx in span for dy in span for dz in span):
+                for key in cells.get(c, ()):
+                    if key in tested or key == exclude: continue
+                    tested.add(key)
+                    sx, sy, sz, sr = spheres[key]
+                    t = ray_sphere(origin, d, (sx, sy, sz), sr)
+                    if t is not None and t <= max_distance and (best is None or t < best[1]): best = (key, t)
+            t_exit = min(t_next)
+            if best is not None and best[1] <= t_exit: break # Anything left is further along
+            axis = t_next.index(t_exit)
+            cell[axis] += step[axis]; t_next[axis] += t_delta[axis]; t_enter = t_exit
+        return best
+
+    def candidate_pairs(self):
+        """Each pair of entities in the same or neighbouring cells, once, as (key_a, key_b)."""
+        cells = self.cells
+        for (cx, cy, cz), members in cells.items():
+            members = list(members)
+            for n, a in enumerate(members):
+                for b in members[n+1:]: yield a, b
+            for dx, dy, dz in self._half:
+                other = cells.get((cx+dx, cy+dy, cz+dz))
+                if other:
+                    for a in members:
+                        for b in other: yield a, b
+
+    def overlapping_pairs(self):
+        """[(key_a, key_b)] of the entities whose spheres overlap."""
+        spheres, pairs = self.spheres, []
+        for a, b in self.candidate_pairs():
+            ax, ay, az, ar = spheres[a]; bx, by, bz, br = spheres[b]
+            if (ax-bx)**2 + (ay-by)**2 + (az-bz)**2 < (ar + br)**2: pairs.append((a, b))
+        return pairs
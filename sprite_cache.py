@@ -0,0 +1,48 @@
+# sprite_cache.py
+# Byte-budgeted LRU cache for pre-rendered sprites (pygame Surfaces or anything with get_size()).
+from collections import OrderedDict
+
+class SpriteCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict() # key -> (value, nbytes), least recently used first
+        self.used_bytes = 0
+        self.hits, self.misses, self.evictions = 0, 0, 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value, nbytes=None):
+        if nbytes is None: w, h = value.get_size(); nbytes = w * h * 4
+        if key in self.entries: self.used_bytes -= self.entries.pop(key)[1]
+        if nbytes > self.max_bytes: return value # Never cache something larger than the whole budget
+        self.entries[key] = (value, nbytes); self.used_bytes += nbytes
+        self._evict_to_budget()
+        return value
+
+    def resize(self, max_bytes):
+        """Changes the budget, evicting least recently used entries if it shrank."""
+        self.max_bytes = max_bytes
+        self._evict_to_budget()
+
+    def _evict_to_budget(self):
+        while self.used_bytes > self.max_bytes:
+            _, (_, evicted_bytes) = self.entries.popitem(last=False)
+            self.used_bytes -= evicted_bytes; self.evictions += 1
+
+    def clear(self):
+        self.entries.clear(); self.used_bytes = 0
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": len(self.entries),
+                "used_bytes": self.used_bytes, "max_bytes": self.max_bytes, "hit_rate": self.hit_rate()}
@@ -0,0 +1,137 @@
+# sweep_physics.py
+# Headless physics-parameter sweep: runs scripted jump / roll / landing scenarios for every candidate parameter set
+# across a process pool and streams the metrics to CSV or JSONL.
+# Usage: python sweep_physics.py --param COEFFICIENT_OF_RESTITUTION=0.2:0.8:7 --param SQUISH_DAMPING=5,10,20
+#        [--samples N] [--out sweep.csv] [--objective landing.time_to_rest] [--maximize] [--write-best]
+import argparse
+import csv
+import itertools
+import json
+import math
+import multiprocessing
+import random
+import sys
+import time
+import game_config as cfg
+from blob_physics import BlobPhysics, BlobInputs, NO_INPUT, PHYSICS_PARAM_KEYS
+from physics_params import physics_params_config, PARAM_CONFIG_KEYS
+
+# Sweepable parameters by config key, with their panel slider ranges
+PARAM_RANGES = {PARAM_CONFIG_KEYS.get(p["var_name"], p["var_name"]): (p["min_val"], p["max_val"]) for p in physics_params_config}
+PARAM_RANGES = {key: r for key, r in PARAM_RANGES.items() if key in PHYSICS_PARAM_KEYS}
+
+BASE_RADIUS, GROUND_Z = 6, -1 # As in the game
+MAX_SCENARIO_TIME = 10.0      # Simulated seconds before a scenario gives up on coming to rest
+REST_SPEED, REST_SQUISH = 0.05, 0.01
+
+# name: (drop height above the ground, input script of (simulated time, tick index) -> BlobInputs, seconds the script runs)
+SCENARIOS = {
+    "jump": (0.0, lambda t, n: BlobInputs(jump_pressed=n == 0, jump_held=t < 0.5), 0.5),         # Half-charged hop in place
+    "roll": (0.0, lambda t, n: BlobInputs(move_x=1.0 if t < 1.5 else 0.0), 1.5),                  # Push right, then let go
+    "landing": (20.0, lambda t, n: NO_INPUT, 0.0),                                                # Drop from a height
+}
+METRICS = ("time_to_rest", "bounces", "peak_squish", "max_speed", "max_height")
+
+def run_scenario(params, name):
+    """Simulates one scenario with params overriding the current config. Returns {metric: value}."""
+    height, script, script_time = SCENARIOS[name]
+    blob = BlobPhysics(params=params, base_radius=BASE_RADIUS, ground_z=GROUND_Z)
+    if height > 0: blob.reset(pos=(0.0, 0.0, GROUND_Z + blob.radius() + height))
+    else:
+        for _ in range(int(1.0 / blob.fixed_dt)): # Settle onto the ground first
+            if blob.is_on_ground: break
+            blob.tick()
+    bounces, peak_squish, max_speed, max_height, time_to_rest = 0, 0.0, 0.0, 0.0, None
+    start_time = blob.time
+    for n in range(int(MAX_SCENARIO_TIME / blob.fixed_dt)):
+        t = blob.time - start_time
+        blob.tick(script(t, n))
+        if blob.just_landed and blob.vel[2] > 0: bounces += 1
+        peak_squish = max(peak_squish, abs(1.0 - blob.squish))
+        max_speed = max(max_speed, math.hypot(blob.vel[0], blob.vel[1]))
+        max_height = max(max_height, blob.pos[2] - blob.radius() - GROUND_Z)
+        at_rest = blob.is_on_ground and math.hypot(*blob.vel) < REST_SPEED and abs(1.0 - blob.squish) < REST_SQUISH and abs(blob.squish_velocity) < REST_SQUISH
+        if at_rest and t >= script_time: time_to_rest = blob.time - start_time; break
+    return {"time_to_rest": time_to_rest, "bounces": bounces, "peak_squish": peak_squish, "max_speed": max_speed, "max_height": max_height}
+
+def evaluate_candidate(job):
+    """Pool worker: (candidate id, params) -> result row."""
+    candidate_id, params = job
+    row = {"id": candidate_id, **params}
+    for name in SCENARIOS:
+        for metric, value in run_scenario(params, name).items(): row[f"{name}.{metric}"] = value
+    return row
+
+def parse_param_spec(spec):
+    """NAME=lo:hi:steps (inclusive grid), NAME=a,b,c or NAME=v. Returns (key, values, (lo, hi) or None)."""
+    key, sep, values = spec.partition("=")
+    key = PARAM_CONFIG_KEYS.get(key.strip(), key.strip())
+    if not sep or key not in PARAM_RANGES: raise ValueError(f"unknown parameter in '{spec}' (sweepable: {', '.join(sorted(PARAM_RANGES))})")
+    min_val, max_val = PARAM_RANGES[key]
+    if values.count(":") == 2:
+        lo, hi, steps = values.split(":"); lo, hi, steps = float(lo), float(hi), int(steps)
+        grid = [lo + (hi - lo) * i / (steps - 1) for i in range(steps)] if steps > 1 else [lo]
+        bounds = (lo, hi)
+    else: grid, bounds = [float(v) for v in values.split(",")], None
+    for v in ([*bounds] if bounds else grid):
+        if not min_val <= v <= max_val: raise ValueError(f"{key}={v} is outside its range [{min_val}, {max_val}]")
+    return key, grid, bounds
+
+def generate_candidates(specs, samples, seed):
+    """Full grid over specs, or `samples` random draws (uniform over ranges, uniform choice over lists)."""
+    keys = [key for key, _, _ in specs]
+    if not samples:
+        for values in itertools.product(*(grid for _, grid, _ in specs)): yield dict(zip(keys, values))
+        return
+    rng = random.Random(seed)
+    for _ in range(samples):
+        yield {key: rng.uniform(*bounds) if bounds else rng.choice(grid) for key, grid, bounds in specs}
+
+def score_of(row, objective, maximize):
+    value = row.get(objective)
+    if value is None: return -math.inf # Never came to rest / missing: worst either way
+    return value if maximize else -value
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep physics parameters over scripted scenarios on all cores.")
+    parser.add_argument("--param", action="append", default=[], metavar="SPEC", help="NAME=lo:hi:steps or NAME=a,b,c (repeatable)")
+    parser.add_argument("--samples", type=int, default=0, help="Random candidates instead of the full grid")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--jobs", type=int, default=0, help="Worker processes (default: all cores)")
+    parser.add_argument("--out", default="physics_sweep.csv", help=".csv or .jsonl")
+    parser.add_argument("--objective", default="landing.time_to_rest", help="Result column used to pick the best candidate")
+    parser.add_argument("--maximize", action="store_true", help="Best candidate maximizes the objective (default minimizes)")
+    parser.add_argument("--write-best", action="store_true", help="Save the best candidate to game_settings.json")
+    args = parser.parse_args()
+    if not args.param: parser.error("give at least one --param")
+    try: specs = [parse_param_spec(spec) for spec in args.param]
+    except ValueError as e: parser.error(str(e))
+    objective_columns = [f"{name}.{metric}" for name in SCENARIOS for metric in METRICS]
+    if args.objective not in objective_columns: parser.error(f"--objective must be one of: {', '.join(objective_columns)}")
+
+    jobs = enumerate(generate_candidates(specs, args.samples, args.seed))
+    fieldnames = ["id"] + [key for key, _, _ in specs] + objective_columns
+    as_jsonl = args.out.endswith(".jsonl")
+    best, done, start = None, 0, time.perf_counter()
+    with open(args.out, "w", newline="") as f, multiprocessing.Pool(args.jobs or None) as pool:
+        writer = None if as_jsonl else csv.DictWriter(f, fieldnames=fieldnames)
+        if writer: writer.writeheader()
+        for row in pool.imap_unordered(evaluate_candidate, jobs, chunksize=4):
+            if writer: writer.writerow(row)
+            else: f.write(json.dumps(row) + "\n")
+            f.flush() # Stream, so partial results survive an interrupted sweep
+            done += 1
+            if best is None or score_of(row, args.objective, args.maximize) > score_of(best, args.objective, args.maximize): best = row
+            if done % 50 == 0: print(f"\r{done} candidates, {done / (time.perf_counter() - start):.1f}/s", end="", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    print(f"\r{done} candidates in {elapsed:.1f}s ({done / elapsed:.1f}/s) -> {args.out}", file=sys.stderr)
+    if best is None: return
+
+    best_params = {key: best[key] for key, _, _ in specs}
+    print(f"Best by {args.objective} ({'max' if args.maximize else 'min'}): {best[args.objective]} with {json.dumps(best_params)}")
+    if args.write_best:
+        cfg.update_multiple(best_params)
+        print(f"Saved to {cfg.CONFIG_FILE_PATH}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+# text_cache.py
+# Shared caches for UI text: fonts by (name, size) and rendered text surfaces by (font, text, color), so static
+# labels are rendered once instead of every frame.
+import pygame
+from sprite_cache import SpriteCache
+
+TEXT_CACHE_MAX_BYTES = 4 * 1024 * 1024
+
+fonts = {}
+text_cache = SpriteCache(TEXT_CACHE_MAX_BYTES) # LRU, so ever-changing strings (FPS, search text) age out
+
+def get_font(size, name=None):
+    font = fonts.get((name, size))
+    if font is None: font = fonts[(name, size)] = pygame.font.Font(name, size)
+    return font
+
+def render_text(font, text, color, antialias=True):
+    """font.render through the cache. The returned surface is shared: blit it, don't draw on it."""
+    key = (font, text, tuple(color), antialias)
+    surf = text_cache.get(key)
+    if surf is None: surf = text_cache.put(key, font.render(text, antialias, color))
+    return surf
@@ -0,0 +1,40 @@
+# ui_widgets.py
+# Minimal retained widget tree for the panels: one layout pass builds the tree, and a uniform-grid index over
+# the widget rects answers "which widget is under this point" by testing only the widgets in one grid cell.
+import pygame
+
+class Widget:
+    __slots__ = ("name", "rect", "children", "data")
+    def __init__(self, name, rect, children=None, data=None):
+        self.name, self.rect, self.children, self.data = name, pygame.Rect(rect), children or [], data
+
+    def add(self, name, rect, data=None):
+        child = Widget(name, rect, data=data)
+        self.children.append(child)
+        return child
+
+    def walk(self):
+        """Pre-order: parents before children, earlier siblings before later ones (i.e. back to front)."""
+        yield self
+        for child in self.children: yield from child.walk()
+
+    def find(self, name):
+        return next((w for w in self.walk() if w.name == name), None)
+
+class WidgetIndex:
+    """Uniform grid of cell_size pixels; each cell lists the widgets overlapping it in back-to-front order."""
+    def __init__(self, root, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}
+        for widget in root.walk():
+            r = widget.rect
+            if r.width <= 0 or r.height <= 0: continue
+            for cx in range(r.left // cell_size, (r.right - 1) // cell_size + 1):
+                for cy in range(r.top // cell_size, (r.bottom - 1) // cell_size + 1):
+                    self.cells.setdefault((cx, cy), []).append(widget)
+
+    def hit(self, x, y):
+        """Frontmost (deepest, last drawn) widget containing (x, y), or None."""
+        for widget in reversed(self.cells.get((x // self.cell_size, y // self.cell_size), ())):
+            if widget.rect.collidepoint(x, y): return widget
+        return None
@@ -1,9 +1,33 @@
 import pygame
 import math
 import game_config as cfg
+from voxel_math import normalize_vector, quat_conjugate, quat_rotate_point, quat_to_matrix
+from blob_physics import BlobPhysics, BlobInputs, PHYSICS_PARAM_KEYS
+from physics_params import physics_params_config, PARAM_CONFIG_KEYS
+from voxel_shape import FACE_NORMALS, build_sphere_shape, build_draw_orders, view_octant
+from voxel_model import VoxelModel, load_model, load_derived_lods, derived_cache_path
+from sprite_cache import SpriteCache
+from frame_profiler import FrameProfiler
+from text_cache import get_font, render_text, text_cache
+from ui_widgets import Widget, WidgetIndex
+from compositor import SurfacePool, DirtyRects
+from ground_tiles import GroundTileCache
+from voxel_terrain import build_heightfield_terrain
+from quality_governor import QualityGovernor
+from input_recording import InputRecorder, InputReplay
+from sim_thread import SimulationThread
+from frame_capture import FrameCapture
 import time
+import os
 import sys
 import json
+import argparse
+try:
+    import numpy as np
+    import zbuffer_raster
+except ImportError:
+    np = None # Optional: vectorized player rendering falls back to the pure-Python path
+    zbuffer_raster = None
 
 pygame.font.init() # Initialize font module
 
@@ -24,21 +48,44 @@ ISO_TILE_WIDTH_HALF_BASE = VOXEL_SIZE * 0.866
 ISO_TILE_HEIGHT_HALF_BASE = VOXEL_SIZE * 0.5
 ISO_Z_FACTOR_BASE = VOXEL_SIZE
 GROUND_RANGE = cfg.get("GROUND_RANGE")
-GROUND_CACHE_MARGIN = cfg.get("UI_GROUND_CACHE_MARGIN")
+TERRAIN_HILL_HEIGHT = cfg.get("TERRAIN_HILL_HEIGHT")
+GROUND_ZOOM_SETTLE_S = cfg.get("GROUND_ZOOM_SETTLE_S")
+PLAYER_RENDER_BACKEND = cfg.get("PLAYER_RENDER_BACKEND")
+PLAYER_SPRITE_CACHE_ENABLED = cfg.get("PLAYER_SPRITE_CACHE_ENABLED")
+PLAYER_SPRITE_CACHE_ROTATION_STEPS = cfg.get("PLAYER_SPRITE_CACHE_ROTATION_STEPS")
+PLAYER_SPRITE_CACHE_SQUISH_STEPS = cfg.get("PLAYER_SPRITE_CACHE_SQUISH_STEPS")
+PLAYER_LOD_ENABLED = cfg.get("PLAYER_LOD_ENABLED")
+PLAYER_LOD_MAX_LEVELS = cfg.get("PLAYER_LOD_MAX_LEVELS")
+PLAYER_LOD_MIN_VOXEL_PX = cfg.get("PLAYER_LOD_MIN_VOXEL_PX")
+PLAYER_LOD_HYSTERESIS = cfg.get("PLAYER_LOD_HYSTERESIS")
+QUALITY_GOVERNOR_ENABLED = cfg.get("QUALITY_GOVERNOR_ENABLED")
+QUALITY_TARGET_FPS = cfg.get("QUALITY_TARGET_FPS")
 
 # --- Global Game State Variables ---
 zoom = 1.0
 light_direction = [-0.577, -0.577, 0.577] # Default light
-player_rotation = (1.0, 0.0, 0.0, 0.0)   # Quaternion (w, x, y, z)
 light_mode = False
 
-# Physics state variables
-is_charging_jump = False
-jump_charge_start_time = None
-squish = 1.0
-is_on_ground = False
-target_squish = 1.0
-squish_velocity = 0.0
+# Player simulation (position, velocity, rotation quaternion, squish spring); created in main()
+player_physics = None
+# Player voxel model (solid, packed; see voxel_model) and its LOD models, finest first; loaded in main()
+player_voxel_model, player_lods = None, []
+
+# Frame profiler (F3: HUD, F4: export). main() marks the phases in loop order.
+PROFILER_PHASES = ("config", "events", "physics", "ground", "player", "toolbar", "panel", "overlays", "hud", "compose", "present", "capture", "wait")
+PROFILER_COUNTERS = ("faces_considered", "faces_culled", "polygons_drawn", "config_writes", "dirty_rects", "presented_kpixels")
+frame_profiler = FrameProfiler(PROFILER_PHASES, PROFILER_COUNTERS, cfg.get("PROFILER_HISTORY_FRAMES"))
+
+# Presentation: layer surfaces are reused across frames and only the screen regions that changed are redrawn and
+# pushed with pygame.display.update(rects). See the frame section of main().
+surface_pool = SurfacePool()
+dirty_rects = DirtyRects()
+
+# Adaptive quality (G toggles): main() feeds it each frame's work time and draws with quality_settings(). Its level
+# is saved as QUALITY_LEVEL so the next run starts where this one settled.
+quality_governor = QualityGovernor(QUALITY_TARGET_FPS, cfg.get("QUALITY_LEVEL") if QUALITY_GOVERNOR_ENABLED else 0)
+def quality_settings():
+    return quality_governor.settings
 
 # --- Physics Parameters (will be loaded from cfg) ---
 # Declare all to be loaded to avoid NameErrors if accessed before main() fully runs load_physics_params
@@ -97,33 +144,303 @@ def load_physics_params_from_config():
     BASE_SPEED_MULTIPLIER = cfg.get("BASE_SPEED_MULTIPLIER")
 
 # --- Helper Functions ---
-def normalize_vector(v): mag = math.sqrt(sum(c*c for c in v)); return tuple(c/mag for c in v) if mag else (0,0,0)
 VOXEL_CORNER_OFFSETS = { "iso_top": [(0,0,1),(0,1,1),(1,1,1),(1,0,1)], "iso_bottom": [(1,0,0),(1,1,0),(0,1,0),(0,0,0)], "iso_left_side": [(0,0,0),(0,1,0),(0,1,1),(0,0,1)], "iso_right_side": [(1,0,1),(1,1,1),(1,1,0),(1,0,0)], "iso_front_side": [(0,1,1),(0,1,0),(1,1,0),(1,1,1)], "iso_back_side": [(0,0,1),(1,0,1),(1,0,0),(0,0,0)]}
 VIEW_DIRECTION_FOR_CULLING = normalize_vector((1,1,0.8))
-FACE_NORMALS = {"iso_top":(0,0,1),"iso_bottom":(0,0,-1),"iso_left_side":(-1,0,0),"iso_right_side":(1,0,0),"iso_front_side":(0,1,0),"iso_back_side":(0,-1,0)}
+ISO_VIEW_DIRECTION = normalize_vector((1,1,2*ISO_TILE_HEIGHT_HALF_BASE/ISO_Z_FACTOR_BASE)) # Direction project_iso collapses; points towards the viewer
 def project_iso(ix,iy,iz,current_zoom): iso_w,iso_h,iso_z = ISO_TILE_WIDTH_HALF_BASE*current_zoom, ISO_TILE_HEIGHT_HALF_BASE*current_zoom, ISO_Z_FACTOR_BASE*current_zoom; return (ix-iy)*iso_w, (ix+iy)*iso_h - iz*iso_z
+def project_iso_array(pts,current_zoom): # Batched project_iso over an (...,3) array -> (...,2)
+    iso_w,iso_h,iso_z = ISO_TILE_WIDTH_HALF_BASE*current_zoom, ISO_TILE_HEIGHT_HALF_BASE*current_zoom, ISO_Z_FACTOR_BASE*current_zoom
+    x,y,z = pts[...,0],pts[...,1],pts[...,2]
+    return np.stack(((x-y)*iso_w, (x+y)*iso_h - z*iso_z), axis=-1)
 def get_voxel_face_points_from_indices(ix,iy,iz,face_key): offsets=VOXEL_CORNER_OFFSETS[face_key]; return [(ix+off[0],iy+off[1],iz+off[2]) for off in offsets]
 def compute_face_color_with_normal(base_color,face_normal_world,light_dir_normalized): dot=sum(fn*ld for fn,ld in zip(face_normal_world,light_dir_normalized)); amb=0.45;diff=max(0,dot);bright=amb+(1-amb)*diff; return tuple(min(255,int(c*bright)) for c in base_color)
-cached_ground_surface, cached_ground_zoom, cached_camera_offset = None, -1, (None,None)
-def render_ground_surface(current_zoom, ground_level_z_val): # Removed draw_origin args
-    surface_width = SCREEN_WIDTH + GROUND_CACHE_MARGIN
-    surface_height = GAME_SCREEN_HEIGHT + GROUND_CACHE_MARGIN
-    surf = pygame.Surface((surface_width, surface_height)); surf.fill(BLACK)
-    center_x_on_cache = surface_width // 2
-    center_y_on_cache = surface_height // 2
-    R = int(GROUND_RANGE * 1.5)
-    corners = [(-R,-R,ground_level_z_val),(R,-R,ground_level_z_val),(R,R,ground_level_z_val),(-R,R,ground_level_z_val)]
-    proj_corners = [project_iso(cx,cy,cz, current_zoom) for (cx,cy,cz) in corners]
-    shifted = [(int(pt[0] + center_x_on_cache), int(pt[1] + center_y_on_cache)) for pt in proj_corners]
-    color = compute_face_color_with_normal(BROWN, FACE_NORMALS["iso_top"], light_direction)
-    pygame.draw.polygon(surf, color, shifted)
-    return surf
-
-# --- Quaternion Functions ---
-def quat_from_axis_angle(axis, angle): ax,ay,az=axis; half_angle=angle/2.0; s=math.sin(half_angle); return (math.cos(half_angle),ax*s,ay*s,az*s)
-def quat_mult(q1,q2): w1,x1,y1,z1=q1; w2,x2,y2,z2=q2; return (w1*w2-x1*x2-y1*y2-z1*z2, w1*x2+x1*w2+y1*z2-z1*y2, w1*y2-x1*z2+y1*w2+z1*x2, w1*z2+x1*y2-y1*x2+z1*w2)
-def quat_conjugate(q): w,x,y,z=q; return (w,-x,-y,-z)
-def quat_rotate_point(q,point): p=(0.0,point[0],point[1],point[2]); qc=quat_conjugate(q); p_rot=quat_mult(quat_mult(q,p),qc); return (p_rot[1],p_rot[2],p_rot[3])
+# --- Ground ---
+# Voxel terrain in a VoxelTerrain, drawn through GroundTileCache tiles. A tile draws the chunks whose projected
+# bounds overlap it, so chunks outside the view are culled before they are ever meshed or projected.
+GROUND_LEVEL_Z = -1 # Terrain surface before hills; off the terrain the blob still rests on this plane
+TERRAIN_SOIL_COLOR = (100,50,15)
+terrain = None
+def build_terrain():
+    global terrain
+    terrain = build_heightfield_terrain(int(GROUND_RANGE * 1.5), GROUND_LEVEL_Z, TERRAIN_HILL_HEIGHT, (TERRAIN_SOIL_COLOR, BROWN))
+    if player_physics is not None: player_physics.ground = terrain
+
+terrain_view_key, terrain_view = None, []
+terrain_chunk_polygons = {} # chunk coord -> (mesh, projection key, polygons)
+def get_terrain_view(current_zoom):
+    """Every chunk with its projected bounding rect at this zoom, far to near: [(chunk, rect)]."""
+    global terrain_view_key, terrain_view
+    key = (terrain.version, ground_tiles.version, GroundTileCache.zoom_key(current_zoom))
+    if key != terrain_view_key:
+        terrain_view = []
+        for coord in sorted(terrain.chunks, key=lambda c: c[0] + c[1] + c[2]): # Back to front; see VoxelTerrain.chunk_mesh()
+            (x0, y0, z0), (x1, y1, z1) = terrain.chunk_bounds(coord)
+            points = [project_iso(x, y, z, current_zoom) for x in (x0, x1) for y in (y0, y1) for z in (z0, z1)]
+            left, top = math.floor(min(p[0] for p in points)), math.floor(min(p[1] for p in points))
+            terrain_view.append((terrain.chunks[coord], pygame.Rect(left, top, math.ceil(max(p[0] for p in points)) - left + 1, math.ceil(max(p[1] for p in points)) - top + 1)))
+        terrain_view_key = key
+    return terrain_view
+
+def get_chunk_polygons(chunk, current_zoom):
+    """The chunk's meshed faces projected at this zoom, in mesh (back to front) order: [(points relative to the origin's projection, colour, bounding rect)]."""
+    mesh = terrain.chunk_mesh(chunk)
+    key = (ground_tiles.version, GroundTileCache.zoom_key(current_zoom))
+    cached = terrain_chunk_polygons.get(chunk.coord)
+    if cached is not None and cached[0] is mesh and cached[1] == key: return cached[2]
+    polygons = []
+    for corners, material, face_key in mesh:
+        points = [tuple(math.floor(c + 0.5) for c in project_iso(cx, cy, cz, current_zoom)) for cx, cy, cz in corners] # Same rounding in every tile, so edges meet across tile seams
+        xs, ys = [x for x, _ in points], [y for _, y in points]
+        color = compute_face_color_with_normal(terrain.palette[material], FACE_NORMALS[face_key], light_direction)
+        polygons.append((points, color, pygame.Rect(min(xs), min(ys), max(xs) - min(xs) + 1, max(ys) - min(ys) + 1)))
+    terrain_chunk_polygons[chunk.coord] = (mesh, key, polygons)
+    return polygons
+
+def render_ground_tile(surf, current_zoom, tile_rect):
+    surf.fill(BLACK)
+    for chunk, bounds in get_terrain_view(current_zoom):
+        if not bounds.colliderect(tile_rect): continue
+        for points, color, rect in get_chunk_polygons(chunk, current_zoom):
+            if rect.colliderect(tile_rect): pygame.draw.polygon(surf, color, [(x - tile_rect.x, y - tile_rect.y) for x, y in points])
+
+ground_tiles = GroundTileCache(render_ground_tile, cfg.get("GROUND_TILE_SIZE"), int(cfg.get("GROUND_TILE_CACHE_MB") * 1024 * 1024))
+
+# --- Player Rendering ---
+def player_culling_threshold(): # CULLING_THRESHOLD as tightened by the quality governor
+    return CULLING_THRESHOLD_cfg + quality_settings()["culling_offset"]
+
+# Per-frame transform shared by every voxel of the player: all voxels use the same rotation, scale and squish,
+# so face normals, culling, lighting and the projected corner template only need computing once per change.
+# voxel_size is the cube edge in shape units (2**level for a LOD level); voxel centres are always in level-0 units.
+player_frame_transform_key, player_frame_transform = None, None
+def get_player_frame_transform(rotation, squish_val, current_zoom, voxel_size=1):
+    global player_frame_transform_key, player_frame_transform
+    culling_threshold = player_culling_threshold()
+    key = (tuple(rotation), squish_val, current_zoom, voxel_size, PLAYER_SCALE_cfg, culling_threshold, tuple(light_direction))
+    if key == player_frame_transform_key: return player_frame_transform
+    scale = (PLAYER_SCALE_cfg, PLAYER_SCALE_cfg, PLAYER_SCALE_cfg*squish_val)
+    faces = []
+    for face_index, (face_key, unrot_normal) in enumerate(FACE_NORMALS.items()):
+        world_face_normal = normalize_vector(quat_rotate_point(rotation, unrot_normal))
+        dot_view_normal = sum(n*v for n,v in zip(world_face_normal, VIEW_DIRECTION_FOR_CULLING))
+        if dot_view_normal <= culling_threshold: continue
+        corners_3d, corners_2d = [], []
+        for off_x,off_y,off_z in VOXEL_CORNER_OFFSETS[face_key]:
+            rot_lc = quat_rotate_point(rotation, ((off_x-0.5)*voxel_size*scale[0], (off_y-0.5)*voxel_size*scale[1], (off_z-0.5)*voxel_size*scale[2]))
+            corners_3d.append(rot_lc)
+            corners_2d.append(project_iso(rot_lc[0], rot_lc[1], rot_lc[2], current_zoom))
+        brightness = 0.45 + 0.55*max(0, sum(n*l for n,l in zip(world_face_normal, light_direction))) # As in compute_face_color_with_normal
+        faces.append({"key": face_key, "index": face_index, "bit": 1 << face_index, "normal": world_face_normal, "brightness": brightness, "corners_3d": corners_3d, "corners_2d": corners_2d, "lit_colors": {}})
+    player_frame_transform_key = key
+    local_view = quat_rotate_point(quat_conjugate(rotation), ISO_VIEW_DIRECTION) # Squish scales z by a positive factor, so it cannot flip the octant
+    player_frame_transform = {"rotation_matrix": quat_to_matrix(rotation), "scale": scale, "faces": faces, "view_octant": view_octant(local_view)}
+    return player_frame_transform
+
+def get_face_lit_color(face, base_color): # Lit colour per (face, base colour), computed at most once per frame transform
+    col = face["lit_colors"].get(base_color)
+    if col is None: col = face["lit_colors"][base_color] = compute_face_color_with_normal(base_color, face["normal"], light_direction)
+    return col
+
+def draw_player_voxels_python(surf, voxels_shape, pos_world, rotation, squish_val, current_zoom, draw_origin, face_masks=None, draw_orders=None, voxel_size=1):
+    """Reference per-voxel renderer; used when NumPy is not available.
+    face_masks (from extract_shell) skips internal faces; draw_orders (from build_draw_orders) replaces the per-frame depth sort."""
+    transform = get_player_frame_transform(rotation, squish_val, current_zoom, voxel_size)
+    faces = transform["faces"]
+    if not faces: return
+    (m00,m01,m02),(m10,m11,m12),(m20,m21,m22) = transform["rotation_matrix"]
+    sx_scale, sy_scale, sz_scale = transform["scale"]
+    px, py, pz = pos_world
+    view_x, view_y, view_z = VIEW_DIRECTION_FOR_CULLING
+    player_render_voxels = []
+    if face_masks is None: face_masks = [-1]*len(voxels_shape)
+    order = draw_orders[transform["view_octant"]] if draw_orders is not None else range(len(voxels_shape))
+    for n in order:
+        rel_ix, rel_iy, rel_iz_shape, base_color = voxels_shape[n]
+        s_rel_x, s_rel_y, s_rel_z = rel_ix*sx_scale, rel_iy*sy_scale, rel_iz_shape*sz_scale
+        vx = px + m00*s_rel_x + m01*s_rel_y + m02*s_rel_z
+        vy = py + m10*s_rel_x + m11*s_rel_y + m12*s_rel_z
+        vz = pz + m20*s_rel_x + m21*s_rel_y + m22*s_rel_z
+        depth = vx*view_x + vy*view_y + vz*view_z
+        player_render_voxels.append((depth, (vx,vy,vz), base_color, face_masks[n]))
+    if draw_orders is None: player_render_voxels.sort(key=lambda item: item[0]) # Painter's order: farthest from the viewer first
+    draw_origin_x, draw_origin_y = draw_origin
+    polygons_drawn = 0
+    for _, (vx,vy,vz), base_color, face_mask in player_render_voxels:
+        cx, cy = project_iso(vx, vy, vz, current_zoom)
+        cx += draw_origin_x; cy += draw_origin_y
+        for face in faces:
+            if not face_mask & face["bit"]: continue # Face borders another voxel of the shape
+            poly_2d = [(int(cx+ox), int(cy+oy)) for ox,oy in face["corners_2d"]]
+            pygame.draw.polygon(surf, get_face_lit_color(face, base_color), poly_2d)
+            polygons_drawn += 1
+    if frame_profiler.recording: count_player_faces(len(player_render_voxels), polygons_drawn)
+
+def count_player_faces(voxel_count, polygons_drawn):
+    """Profiler counters: every face of every voxel is considered; back-facing and covered ones are culled."""
+    considered = voxel_count * len(FACE_NORMALS)
+    frame_profiler.count("faces_considered", considered); frame_profiler.count("faces_culled", considered - polygons_drawn)
+    frame_profiler.count("polygons_drawn", polygons_drawn)
+
+def build_player_shape_arrays(voxels_shape, face_masks):
+    """Packs (i,j,k,color) voxel tuples into (N,3) coordinate and color arrays plus an (N,6) exposed-face table for the NumPy renderer."""
+    coords = np.array([v[:3] for v in voxels_shape], dtype=float).reshape(-1,3)
+    colors = np.array([v[3] for v in voxels_shape], dtype=float).reshape(-1,3)
+    exposed = (np.array(face_masks, dtype=np.int64).reshape(-1,1) >> np.arange(len(FACE_NORMALS))) & 1 == 1
+    return coords, colors, exposed
+
+def draw_player_voxels_numpy(surf, shape_coords, shape_colors, shape_exposed, pos_world, rotation, squish_val, current_zoom, draw_origin, draw_orders=None, voxel_size=1):
+    """Vectorized equivalent of draw_player_voxels_python: all voxel centres are transformed and projected in bulk."""
+    transform = get_player_frame_transform(rotation, squish_val, current_zoom, voxel_size)
+    faces = transform["faces"]
+    if len(shape_coords) == 0 or not faces: return
+    if draw_orders is not None: order = draw_orders[transform["view_octant"]]
+    else: order = np.argsort(shape_coords @ np.array(quat_to_matrix(rotation)).T @ np.array(VIEW_DIRECTION_FOR_CULLING), kind="stable") # Painter's order: farthest first
+    centers = (shape_coords[order] * np.array(transform["scale"])) @ np.array(transform["rotation_matrix"]).T + np.asarray(pos_world, dtype=float)
+    colors, exposed = shape_colors[order], shape_exposed[order][:, [face["index"] for face in faces]] # (N,F)
+
+    corners_2d = np.array([face["corners_2d"] for face in faces]) # (F,4,2) projected corner template
+    poly_2d = project_iso_array(centers, current_zoom)[:,None,None,:] + corners_2d[None,:,:,:] + np.array(draw_origin, dtype=float)
+    poly_2d = poly_2d.astype(int) # Truncate like int() in the Python path
+
+    brightness = np.array([face["brightness"] for face in faces])
+    face_cols = np.minimum(255, (colors[:,None,:] * brightness[None,:,None]).astype(int)) # (N,F,3)
+
+    draw_polygon = pygame.draw.polygon
+    for poly, col in zip(poly_2d[exposed].tolist(), face_cols[exposed].tolist()): # Row-major: per voxel, faces in FACE_NORMALS order
+        draw_polygon(surf, col, poly)
+    if frame_profiler.recording: count_player_faces(len(centers), int(exposed.sum()))
+
+player_zbuffer = None
+def draw_player_voxels_zbuffer(surf, shape_coords, shape_colors, shape_exposed, pos_world, rotation, squish_val, current_zoom, draw_origin, voxel_size=1):
+    """Depth-buffered alternative to the polygon renderers: face templates are stamped per voxel and written to surf in one pass."""
+    global player_zbuffer
+    transform = get_player_frame_transform(rotation, squish_val, current_zoom, voxel_size)
+    faces = transform["faces"]
+    if len(shape_coords) == 0 or not faces: return
+    if player_zbuffer is None: player_zbuffer = zbuffer_raster.ZBuffer(*surf.get_size())
+    player_zbuffer.fit(*surf.get_size()) # Sprite surfaces change size with squish and zoom; the buffer only grows
+    view_dir = np.array(ISO_VIEW_DIRECTION)
+    centers = (shape_coords * np.array(transform["scale"])) @ np.array(transform["rotation_matrix"]).T + np.asarray(pos_world, dtype=float)
+    centers_2d = project_iso_array(centers, current_zoom) + np.array(draw_origin, dtype=float)
+    batches = []
+    for face in faces:
+        template = face.get("zbuffer_template") # Rasterized once per frame transform
+        if template is None:
+            template = face["zbuffer_template"] = zbuffer_raster.rasterize_face_template(face["corners_2d"], [sum(c*v for c,v in zip(corner, ISO_VIEW_DIRECTION)) for corner in face["corners_3d"]])
+        instance_idx = np.nonzero(shape_exposed[:, face["index"]])[0]
+        batches.append((instance_idx, template, np.minimum(255, (shape_colors[instance_idx] * face["brightness"]).astype(int))))
+    player_zbuffer.draw_instances(centers_2d, centers @ view_dir, batches)
+    player_zbuffer.present(surf)
+    if frame_profiler.recording: count_player_faces(len(shape_coords), sum(len(instance_idx) for instance_idx, _, _ in batches))
+
+def build_player_model(voxels_shape, face_masks, voxel_size=1, lod_level=0, draw_orders=None):
+    """Everything the player renderers need for one voxel shape (one level of a LOD pyramid)."""
+    if draw_orders is None: draw_orders = build_draw_orders(voxels_shape)
+    model = {"shape": voxels_shape, "face_masks": face_masks, "draw_orders": draw_orders, "voxel_size": voxel_size, "lod_level": lod_level,
+             "radius": max([math.sqrt(v[0]**2+v[1]**2+v[2]**2) for v in voxels_shape], default=0) + 0.87*voxel_size} # Bounding sphere incl. voxel half-diagonal
+    if np is not None:
+        model["coords"], model["colors"], model["exposed"] = build_player_shape_arrays(voxels_shape, face_masks)
+        model["draw_orders_np"] = {octant: np.array(order, dtype=np.intp) for octant, order in model["draw_orders"].items()}
+    return model
+
+def load_player_voxel_model():
+    """The PLAYER_MODEL_PATH model (.vox or .bvox) centred on the origin, or the built-in sphere when unset or unreadable."""
+    path = cfg.get("PLAYER_MODEL_PATH")
+    if path:
+        try: return load_model(path).centred()
+        except (OSError, ValueError) as e: print(f"Player model: cannot load {path} ({e}); using the built-in sphere")
+    return VoxelModel.from_shape(build_sphere_shape(BASE_RADIUS, GREEN_BASE))
+
+def player_model_radius(voxel_model):
+    """Physics radius of a player model: half its height in voxels, so it rests on the ground as the built-in
+    sphere does with BASE_RADIUS."""
+    bounds = voxel_model.bounds()
+    if bounds is None: return BASE_RADIUS
+    low, high = bounds[2]
+    return (high - low + 1) / 2
+
+def build_player_lods(voxel_model):
+    """Player models for each level of the model's LOD pyramid, finest first. For a model loaded from a file the
+    pyramid comes from its on-disk derived-data cache when PLAYER_MODEL_CACHE is on."""
+    cache_path = derived_cache_path(voxel_model.source) if voxel_model.source and cfg.get("PLAYER_MODEL_CACHE") else None
+    levels, _ = load_derived_lods(voxel_model, PLAYER_LOD_MAX_LEVELS, cache_path)
+    return [build_player_model(shell, masks, voxel_size, level, orders) for level, (shell, masks, voxel_size, orders) in enumerate(levels)]
+
+def draw_player(surf, model, pos_world, rotation, squish_val, current_zoom, draw_origin):
+    if np is not None and PLAYER_RENDER_BACKEND == "zbuffer": draw_player_voxels_zbuffer(surf, model["coords"], model["colors"], model["exposed"], pos_world, rotation, squish_val, current_zoom, draw_origin, model["voxel_size"])
+    elif np is not None: draw_player_voxels_numpy(surf, model["coords"], model["colors"], model["exposed"], pos_world, rotation, squish_val, current_zoom, draw_origin, model["draw_orders_np"], model["voxel_size"])
+    else: draw_player_voxels_python(surf, model["shape"], pos_world, rotation, squish_val, current_zoom, draw_origin, model["face_masks"], model["draw_orders"], model["voxel_size"])
+
+# --- Player Level of Detail ---
+# The player is drawn from a coarser level of its LOD pyramid once its voxels get too small on screen to be worth
+# a polygon each. Level n voxels are 2**n level-0 voxels wide. The band of PLAYER_LOD_HYSTERESIS around the
+# switch size keeps a zoom hovering near it from popping between levels.
+def player_voxel_px(current_zoom):
+    """Projected half-width in pixels of one level-0 player voxel."""
+    return ISO_TILE_WIDTH_HALF_BASE * current_zoom * PLAYER_SCALE_cfg
+
+def select_player_lod(current_level, voxel_px, level_count):
+    """LOD level to draw with, given the level drawn last frame. A level is left for a coarser one once its voxels
+    shrink below PLAYER_LOD_MIN_VOXEL_PX*(1-h), and for a finer one only once that level's voxels reach
+    PLAYER_LOD_MIN_VOXEL_PX*(1+h)."""
+    if not PLAYER_LOD_ENABLED or level_count <= 1: return 0
+    coarser_below, finer_above = PLAYER_LOD_MIN_VOXEL_PX * (1 - PLAYER_LOD_HYSTERESIS), PLAYER_LOD_MIN_VOXEL_PX * (1 + PLAYER_LOD_HYSTERESIS)
+    level = max(0, min(current_level, level_count - 1))
+    while level < level_count - 1 and voxel_px * 2**level < coarser_below: level += 1
+    while level > 0 and voxel_px * 2**(level - 1) >= finer_above: level -= 1
+    return level
+
+# --- Player Sprite Cache ---
+# Pre-rendered player sprites keyed by quantized rotation/squish plus zoom, light and scale. A sprite is rendered
+# from the quantized (not the exact) state, so each key always maps to the same image; the step counts trade
+# hit rate against visual error.
+player_sprite_cache = SpriteCache(int(cfg.get("PLAYER_SPRITE_CACHE_MB") * 1024 * 1024))
+def get_player_sprite_key(rotation, squish_val, current_zoom, lod_level=0):
+    w,x,y,z = rotation
+    if w < 0: w,x,y,z = -w,-x,-y,-z # q and -q are the same rotation
+    rotation_steps = max(1, PLAYER_SPRITE_CACHE_ROTATION_STEPS // quality_settings()["sprite_rotation_divisor"])
+    q_rot = tuple(round(c * rotation_steps) for c in (w,x,y,z))
+    q_squish = round(squish_val * PLAYER_SPRITE_CACHE_SQUISH_STEPS)
+    q_light = tuple(round(c * 1000) for c in light_direction)
+    return (q_rot, rotation_steps, q_squish, round(current_zoom, 4), q_light, PLAYER_SCALE_cfg, player_culling_threshold(), PLAYER_RENDER_BACKEND, lod_level)
+
+def player_half_extents(model, squish_val, current_zoom):
+    """Half width/height in pixels of a box around the projected player that holds it at any rotation."""
+    r = model["radius"] * PLAYER_SCALE_cfg * max(1.0, squish_val)
+    iso_w, iso_h, iso_z = ISO_TILE_WIDTH_HALF_BASE*current_zoom, ISO_TILE_HEIGHT_HALF_BASE*current_zoom, ISO_Z_FACTOR_BASE*current_zoom
+    return int(math.ceil(r * math.sqrt(2) * iso_w)) + 2, int(math.ceil(r * math.sqrt(2*iso_h*iso_h + iso_z*iso_z))) + 2
+
+def render_player_sprite(model, rotation, squish_val, current_zoom):
+    """Renders the player centred on the origin into its own surface. Returns (surface, anchor) where anchor is the centre's pixel."""
+    half_w, half_h = player_half_extents(model, squish_val, current_zoom)
+    sprite = pygame.Surface((2*half_w, 2*half_h), pygame.SRCALPHA); sprite.fill((0,0,0,0))
+    draw_player(sprite, model, (0.0,0.0,0.0), rotation, squish_val, current_zoom, (half_w, half_h))
+    return sprite, (half_w, half_h)
+
+def get_player_sprite(model, rotation, squish_val, current_zoom):
+    """(sprite, anchor) for this state from the sprite cache, rendered on a miss."""
+    key = get_player_sprite_key(rotation, squish_val, current_zoom, model["lod_level"])
+    cached = player_sprite_cache.get(key)
+    if cached is None:
+        sprite_rotation = normalize_vector(key[0]) if any(key[0]) else (1.0,0.0,0.0,0.0)
+        cached = render_player_sprite(model, sprite_rotation, key[2] / PLAYER_SPRITE_CACHE_SQUISH_STEPS, current_zoom)
+        sprite_w, sprite_h = cached[0].get_size()
+        player_sprite_cache.put(key, cached, sprite_w * sprite_h * 4)
+    return cached
+
+def player_screen_rect(model, pos_world, squish_val, current_zoom, draw_origin, sprite=None):
+    """Pixels the player can cover when drawn at draw_origin: the sprite's rect, or the rotation-independent bounds."""
+    sx, sy = project_iso(pos_world[0], pos_world[1], pos_world[2], current_zoom)
+    cx, cy = int(sx + draw_origin[0]), int(sy + draw_origin[1])
+    if sprite is not None:
+        surface, (anchor_x, anchor_y) = sprite
+        return pygame.Rect(cx - anchor_x, cy - anchor_y, *surface.get_size())
+    half_w, half_h = player_half_extents(model, squish_val, current_zoom)
+    return pygame.Rect(cx - half_w, cy - half_h, 2*half_w, 2*half_h)
+
+def draw_player_cached(surf, model, pos_world, rotation, squish_val, current_zoom, draw_origin):
+    sprite = get_player_sprite(model, rotation, squish_val, current_zoom)
+    surf.blit(sprite[0], player_screen_rect(model, pos_world, squish_val, current_zoom, draw_origin, sprite))
 
 # --- Physics Panel State & Config ---
 show_physics_panel = False
@@ -158,47 +475,18 @@ physics_panel_search = ""; physics_panel_show_only_changed = False
 physics_panel_collapsed = False; physics_panel_active_search_box = False
 param_flash_times = {}; FLASH_DURATION = 0.3
 
-# physics_params_config list (as defined before)
-physics_params_config = [
-    {"var_name": "BASE_ACCEL_RATE", "label": "Base Accel Rate", "min_val": 1.0, "max_val": 100.0, "format_str": "{:.1f}"},
-    {"var_name": "FAST_ACCEL_RATE", "label": "Fast Accel Rate", "min_val": 1.0, "max_val": 100.0, "format_str": "{:.1f}"},
-    {"var_name": "BASE_MAX_SPEED_UPS", "label": "Base Max Speed", "min_val": 1.0, "max_val": 100.0, "format_str": "{:.1f}"},
-    {"var_name": "FAST_MAX_SPEED_UPS", "label": "Fast Max Speed", "min_val": 1.0, "max_val": 100.0, "format_str": "{:.1f}"},
-    {"var_name": "DAMPING_FACTOR", "label": "Damping Factor", "min_val": 0.0, "max_val": 20.0, "format_str": "{:.2f}"},
-    {"var_name": "MASS", "label": "Mass", "min_val": 0.1, "max_val": 20.0, "format_str": "{:.1f}"},
-    {"var_name": "STICTION_THRESHOLD", "label": "Stiction Threshold", "min_val": 0.0, "max_val": 5.0, "format_str": "{:.2f}"},
-    {"var_name": "EXTRA_FRICTION", "label": "Extra Friction", "min_val": 0.0, "max_val": 0.5, "format_str": "{:.3f}"},
-    {"var_name": "BASE_SPEED_MULTIPLIER", "label": "Base Speed Multi", "min_val": 0.1, "max_val": 5.0, "format_str": "{:.2f}"},
-    {"var_name": "GRAVITY_ACCEL", "label": "Gravity Accel", "min_val": -100.0, "max_val": -1.0, "format_str": "{:.1f}"},
-    {"var_name": "INITIAL_JUMP_VELOCITY_UPS", "label": "Initial Jump Vel.", "min_val": 1.0, "max_val": 50.0, "format_str": "{:.1f}"},
-    {"var_name": "JUMP_CHARGE_BOOST_ACCEL_RATE", "label": "Jump Charge Boost", "min_val": 0.0, "max_val": 50.0, "format_str": "{:.1f}"},
-    {"var_name": "MAX_JUMP_CHARGE_DURATION", "label": "Max Jump Charge (s)", "min_val": 0.1, "max_val": 3.0, "format_str": "{:.2f}"},
-    {"var_name": "COEFFICIENT_OF_RESTITUTION", "label": "Restitution Coeff.", "min_val": 0.0, "max_val": 1.0, "format_str": "{:.2f}"},
-    {"var_name": "BOUNCE_THRESHOLD", "label": "Bounce Threshold", "min_val": 0.0, "max_val": 20.0, "format_str": "{:.1f}"},
-    {"var_name": "BOUNCE_ON_LAND_VELOCITY_UPS", "label": "Min Bounce Vel.", "min_val": 0.0, "max_val": 10.0, "format_str": "{:.2f}"},
-    {"var_name": "GROUND_CONTACT_THRESHOLD", "label": "Ground Contact Thr.", "min_val": 0.01, "max_val": 1.0, "format_str": "{:.2f}"},
-    {"var_name": "REST_VELOCITY_THRESHOLD", "label": "Rest Velocity Thr.", "min_val": 0.01, "max_val": 2.0, "format_str": "{:.2f}"},
-    {"var_name": "elasticity", "label": "Squish Elasticity", "min_val": 1.0, "max_val": 50.0, "format_str": "{:.1f}"},
-    {"var_name": "SQUISH_ON_JUMP_START", "label": "Squish on Jump", "min_val": 0.1, "max_val": 1.0, "format_str": "{:.2f}"},
-    {"var_name": "SQUISH_ON_LANDING", "label": "Base Squish Land", "min_val": 0.1, "max_val": 1.0, "format_str": "{:.2f}"},
-    {"var_name": "MAX_SQUISH_FROM_CHARGE", "label": "Max Squish (Charge)", "min_val": 0.1, "max_val": 0.9, "format_str": "{:.2f}"},
-    {"var_name": "SQUISH_DAMPING", "label": "Squish Damping", "min_val": 0.0, "max_val": 30.0, "format_str": "{:.1f}"},
-    {"var_name": "IMPACT_VELOCITY_THRESHOLD", "label": "Impact Vel. Thr.", "min_val": 0.0, "max_val": 20.0, "format_str": "{:.1f}"},
-    {"var_name": "MAX_IMPACT_VELOCITY", "label": "Max Impact Vel.", "min_val": 1.0, "max_val": 100.0, "format_str": "{:.1f}"},
-    {"var_name": "MIN_SQUISH_ON_LANDING", "label": "Min Squish (Land)", "min_val": 0.1, "max_val": 1.0, "format_str": "{:.2f}"},
-    {"var_name": "MAX_SQUISH_ON_LANDING", "label": "Max Squish (Land)", "min_val": 0.1, "max_val": 1.0, "format_str": "{:.2f}"},
-    {"var_name": "PLAYER_SCALE_cfg", "label": "Player Scale", "min_val": 0.1, "max_val": 5.0, "format_str": "{:.2f}"},
-    {"var_name": "CULLING_THRESHOLD_cfg", "label": "Culling Threshold", "min_val": -1.0, "max_val": 1.0, "format_str": "{:.3f}"},
-]
-
 def save_param_to_config_and_globals(param_name, value):
     if param_name in globals(): globals()[param_name] = value
-    cfg.set_param(param_name, value)
+    config_key = PARAM_CONFIG_KEYS.get(param_name, param_name)
+    cfg.set_param(config_key, value)
+    if player_physics is not None and config_key in player_physics.params: player_physics.params[config_key] = value
     param_flash_times[param_name] = time.time() + FLASH_DURATION
+def save_panel_layout():
+    cfg.update_multiple({"PHYSICS_PANEL_POS": physics_panel_pos, "UI_PHYSICS_PANEL_WIDTH": PHYSICS_PANEL_WIDTH, "UI_PHYSICS_PANEL_CONTENT_HEIGHT": physics_panel_content_height})
 def reset_all_physics_params_to_defaults():
     for param_cfg_item in physics_params_config:
         var_name = param_cfg_item["var_name"]
-        default_val = cfg.DEFAULT_CONFIG.get(var_name)
+        default_val = cfg.DEFAULT_CONFIG.get(PARAM_CONFIG_KEYS.get(var_name, var_name))
         if default_val is not None:
             save_param_to_config_and_globals(var_name, default_val)
     print("All physics parameters reset to defaults.")
@@ -218,153 +506,316 @@ def copy_current_config_to_clipboard():
         else: print("Clipboard not init. Config JSON:\n", config_json_string)
     except Exception as e: print(f"Clipboard error: {e}. Config JSON:\n", json.dumps(current_config_dict, indent=4, sort_keys=True))
 
-def draw_physics_panel_ui(screen_surf, font_small, font_medium):
-    global physics_panel_scroll, physics_panel_scroll_max, physics_panel_search, \
-           physics_panel_show_only_changed, physics_panel_collapsed, \
-           active_text_input_param_key, text_input_string, dragging_slider_param_key, \
-           physics_panel_active_search_box, \
-           PHYSICS_PANEL_WIDTH, physics_panel_content_height # These can now change
+# Retained panel: the panel image is rebuilt only when something it shows changes (see physics_panel_state_key),
+# otherwise drawing the open panel is a single blit.
+PANEL_PADDING = 10
+PANEL_SEARCH_BOX_H, PANEL_BUTTONS_H, PANEL_SPACING_AFTER_SEARCH = 26, 22, 4
+physics_panel_surface, physics_panel_surface_key = None, None
+physics_panel_stats = {"frames": 0, "rebuilds": 0}
+filtered_params_key, filtered_params = None, []
+
+def get_filtered_physics_params(param_values):
+    """Panel entries matching the search box and the "Changed" toggle; re-filtered only when those or a value change."""
+    global filtered_params_key, filtered_params
+    key = (physics_panel_search, physics_panel_show_only_changed, param_values)
+    if key != filtered_params_key:
+        filtered_params = [p for p in physics_params_config if not (physics_panel_search and physics_panel_search.lower() not in p["label"].lower()) and not (physics_panel_show_only_changed and math.isclose(globals().get(p["var_name"],0), cfg.DEFAULT_CONFIG.get(PARAM_CONFIG_KEYS.get(p["var_name"], p["var_name"]),0)))]
+        filtered_params_key = key
+    return filtered_params
+
+physics_panel_layout_key, physics_panel_layout = None, None
+def get_physics_panel_layout():
+    """The panel's widget tree and hit-test index, in panel-relative coordinates. Shared by drawing and event
+    handling; rebuilt only when the size, scroll, style or set of visible parameters changes."""
+    global physics_panel_scroll, physics_panel_scroll_max, physics_panel_layout_key, physics_panel_layout
+    param_values = tuple(globals().get(p["var_name"]) for p in physics_params_config)
+    filtered = get_filtered_physics_params(param_values)
+    if not physics_panel_collapsed: # Placeholder: each item (label + slider + ruler) is assumed to take about 60 pixels
+        physics_panel_scroll_max = max(0, len(filtered) * 60 - physics_panel_content_height)
+        physics_panel_scroll = max(0, min(physics_panel_scroll, physics_panel_scroll_max))
+    key = (PHYSICS_PANEL_WIDTH, physics_panel_content_height, physics_panel_collapsed, physics_panel_scroll, physics_panel_scroll_max, tuple(p["var_name"] for p in filtered),
+           PHYSICS_PANEL_TITLE_BAR_HEIGHT, PHYSICS_PANEL_CLOSE_BTN_SIZE, UI_SCROLLBAR_WIDTH, UI_PANEL_RESIZE_HANDLE_SIZE)
+    if key != physics_panel_layout_key:
+        rects = get_physics_panel_rects(filtered)
+        root = Widget("panel", rects["panel"])
+        for name in ("title", "close", "search", "changed", "collapse", "copy", "reset"): root.add(name, rects[name])
+        if "params" in rects:
+            param_list = root.add("params", rects["params"])
+            for p, row_rect in zip(filtered, rects["param_rows"]):
+                clipped = row_rect.clip(rects["params"]) # Rows scrolled out of the list area are not hit-testable
+                if clipped.height > 0: param_list.add("param", clipped, data=p["var_name"])
+            if "scrollbar" in rects: root.add("scrollbar", rects["scrollbar"]).children.append(Widget("scroll_handle", rects["scroll_handle"]))
+        root.add("resize", rects["resize"])
+        physics_panel_layout = {"rects": rects, "root": root, "index": WidgetIndex(root), "filtered": filtered, "param_values": param_values}
+        physics_panel_layout_key = key
+    physics_panel_layout["param_values"] = param_values
+    return physics_panel_layout
+
+def physics_panel_widget_at(layout, abs_x, abs_y):
+    return layout["index"].hit(abs_x - physics_panel_pos[0], abs_y - physics_panel_pos[1])
+
+def get_physics_panel_rects(filtered):
+    """Panel-relative rects of the panel's controls for the current size, scroll and filter."""
+    padding = PANEL_PADDING
+    header_h = PHYSICS_PANEL_TITLE_BAR_HEIGHT
+    controls_section_h = PANEL_SEARCH_BOX_H + PANEL_SPACING_AFTER_SEARCH + PANEL_BUTTONS_H + padding
+    content_h = 0 if physics_panel_collapsed else physics_panel_content_height
+    rects = {"panel": pygame.Rect(0, 0, PHYSICS_PANEL_WIDTH, header_h + controls_section_h + content_h)}
+    rects["title"] = pygame.Rect(0, 0, PHYSICS_PANEL_WIDTH, header_h)
+    rects["close"] = pygame.Rect(PHYSICS_PANEL_WIDTH - PHYSICS_PANEL_CLOSE_BTN_SIZE - 5, (header_h - PHYSICS_PANEL_CLOSE_BTN_SIZE) // 2, PHYSICS_PANEL_CLOSE_BTN_SIZE, PHYSICS_PANEL_CLOSE_BTN_SIZE)
+    y = header_h + padding // 2
+    rects["search"] = pygame.Rect(padding, y, PHYSICS_PANEL_WIDTH - 2 * padding - 95, PANEL_SEARCH_BOX_H)
+    changed_btn_width = 85
+    rects["changed"] = pygame.Rect(PHYSICS_PANEL_WIDTH - padding - changed_btn_width, y, changed_btn_width, PANEL_SEARCH_BOX_H)
+    y += PANEL_SEARCH_BOX_H + PANEL_SPACING_AFTER_SEARCH
+    btn_spacing = 4; num_buttons = 3
+    btn_w = (PHYSICS_PANEL_WIDTH - 2 * padding - (num_buttons - 1) * btn_spacing) // num_buttons
+    rects["collapse"] = pygame.Rect(padding, y, btn_w, PANEL_BUTTONS_H)
+    rects["copy"] = pygame.Rect(rects["collapse"].right + btn_spacing, y, btn_w, PANEL_BUTTONS_H)
+    rects["reset"] = pygame.Rect(rects["copy"].right + btn_spacing, y, btn_w, PANEL_BUTTONS_H)
+    y += PANEL_BUTTONS_H + padding
+    if not physics_panel_collapsed:
+        rects["params"] = pygame.Rect(0, y, PHYSICS_PANEL_WIDTH, content_h)
+        list_w = PHYSICS_PANEL_WIDTH - (UI_SCROLLBAR_WIDTH + padding//2 if physics_panel_scroll_max > 0 else 0)
+        item_h, item_spacing = 55, 5 # Placeholder item height
+        rects["param_rows"] = [pygame.Rect(padding//2, y - physics_panel_scroll + i * (item_h + item_spacing), list_w - padding, item_h) for i in range(len(filtered))]
+        total_item_h = len(filtered) * 60
+        if physics_panel_scroll_max > 0:
+            scrollbar_x = PHYSICS_PANEL_WIDTH - UI_SCROLLBAR_WIDTH - padding // 2
+            rects["scrollbar"] = pygame.Rect(scrollbar_x, y, UI_SCROLLBAR_WIDTH, content_h)
+            handle_h = min(max(20, content_h * (content_h / total_item_h)), content_h)
+            handle_y = physics_panel_scroll / physics_panel_scroll_max * (content_h - handle_h)
+            rects["scroll_handle"] = pygame.Rect(scrollbar_x, y + handle_y, UI_SCROLLBAR_WIDTH, handle_h)
+    rects["resize"] = pygame.Rect(PHYSICS_PANEL_WIDTH - UI_PANEL_RESIZE_HANDLE_SIZE, rects["panel"].height - UI_PANEL_RESIZE_HANDLE_SIZE, UI_PANEL_RESIZE_HANDLE_SIZE, UI_PANEL_RESIZE_HANDLE_SIZE)
+    return rects
+
+PANEL_HOVER_TARGETS = ("close", "changed", "collapse", "copy", "reset", "scroll_handle", "resize")
+def physics_panel_state_key(param_values, hover):
+    """Everything the panel image depends on; the panel is re-rendered when this changes."""
+    cursor_on = physics_panel_active_search_box and int(time.time()*2) % 2 == 0 # Blinking search cursor
+    style = (PHYSICS_PANEL_TITLE_BAR_HEIGHT, PHYSICS_PANEL_TITLE_COLOR, PHYSICS_PANEL_BORDER_COLOR, PHYSICS_PANEL_CLOSE_BTN_SIZE, PHYSICS_PANEL_CLOSE_BTN_COLOR, PHYSICS_PANEL_CLOSE_BTN_HOVER_COLOR,
+             UI_PANEL_RESIZE_HANDLE_SIZE, UI_SCROLLBAR_WIDTH, UI_SCROLLBAR_COLOR, UI_SCROLLBAR_HANDLE_COLOR, UI_SCROLLBAR_HANDLE_HOVER_COLOR)
+    return (PHYSICS_PANEL_WIDTH, physics_panel_content_height, physics_panel_collapsed, physics_panel_scroll, physics_panel_search, physics_panel_active_search_box, cursor_on,
+            physics_panel_show_only_changed, hover, dragging_scrollbar, dragging_panel_resize, param_values, style)
 
-    panel_x, panel_y = physics_panel_pos
-    padding = 10
-    current_time_for_flash = time.time()
+def update_physics_panel_ui(font_small, font_medium, mouse_pos):
+    """Re-renders the retained panel surface if its state changed. Returns True when it was redrawn."""
+    global physics_panel_surface, physics_panel_surface_key
+    layout = get_physics_panel_layout()
+    rects, filtered = layout["rects"], layout["filtered"]
+    hover_widget = physics_panel_widget_at(layout, *mouse_pos)
+    hover = hover_widget.name if hover_widget is not None and hover_widget.name in PANEL_HOVER_TARGETS else None
+    key = physics_panel_state_key(layout["param_values"], hover)
+    physics_panel_stats["frames"] += 1
+    if key != physics_panel_surface_key:
+        if physics_panel_surface is None or physics_panel_surface.get_size() != rects["panel"].size:
+            physics_panel_surface = pygame.Surface(rects["panel"].size, pygame.SRCALPHA)
+        render_physics_panel(physics_panel_surface, font_small, font_medium, rects, hover, filtered)
+        physics_panel_surface_key = key; physics_panel_stats["rebuilds"] += 1
+        return True
+    return False
 
+def render_physics_panel(panel_surface, font_small, font_medium, rects, hover, filtered):
+    padding = PANEL_PADDING
     header_h = PHYSICS_PANEL_TITLE_BAR_HEIGHT
-    search_box_h = 26; buttons_h = 22; spacing_after_search = 4; spacing_after_buttons = padding
-    controls_section_h = search_box_h + spacing_after_search + buttons_h + spacing_after_buttons
-    
-    actual_content_area_h = 0 if physics_panel_collapsed else physics_panel_content_height
-    total_panel_h = header_h + controls_section_h + actual_content_area_h
-    
-    panel_surface = pygame.Surface((PHYSICS_PANEL_WIDTH, total_panel_h), pygame.SRCALPHA)
     panel_surface.fill((0,0,0,0))
 
-    title_bar_rect = pygame.Rect(0, 0, PHYSICS_PANEL_WIDTH, header_h)
-    pygame.draw.rect(panel_surface, PHYSICS_PANEL_TITLE_COLOR, title_bar_rect)
-    title_text_surf = font_medium.render("Physics Controls (T)", True, PHYSICS_PANEL_TEXT_COLOR)
+    pygame.draw.rect(panel_surface, PHYSICS_PANEL_TITLE_COLOR, rects["title"])
+    title_text_surf = render_text(font_medium, "Physics Controls (T)", PHYSICS_PANEL_TEXT_COLOR)
     panel_surface.blit(title_text_surf, (padding, (header_h - title_text_surf.get_height()) // 2))
 
-    close_btn_rect_rel = pygame.Rect(PHYSICS_PANEL_WIDTH - PHYSICS_PANEL_CLOSE_BTN_SIZE - 5,
-                                  (header_h - PHYSICS_PANEL_CLOSE_BTN_SIZE) // 2,
-                                  PHYSICS_PANEL_CLOSE_BTN_SIZE, PHYSICS_PANEL_CLOSE_BTN_SIZE)
-    mx_abs, my_abs = pygame.mouse.get_pos()
-    close_btn_abs_coords = close_btn_rect_rel.move(panel_x, panel_y)
-    hover_close = close_btn_abs_coords.collidepoint(mx_abs,my_abs)
-    pygame.draw.rect(panel_surface, PHYSICS_PANEL_CLOSE_BTN_HOVER_COLOR if hover_close else PHYSICS_PANEL_CLOSE_BTN_COLOR, close_btn_rect_rel, border_radius=3)
-    x_font = pygame.font.Font(None, PHYSICS_PANEL_CLOSE_BTN_SIZE + 4)
-    x_surf = x_font.render("×", True, WHITE)
+    close_btn_rect_rel = rects["close"]
+    pygame.draw.rect(panel_surface, PHYSICS_PANEL_CLOSE_BTN_HOVER_COLOR if hover == "close" else PHYSICS_PANEL_CLOSE_BTN_COLOR, close_btn_rect_rel, border_radius=3)
+    x_surf = render_text(get_font(PHYSICS_PANEL_CLOSE_BTN_SIZE + 4), "×", WHITE)
     panel_surface.blit(x_surf, (close_btn_rect_rel.x + (close_btn_rect_rel.width - x_surf.get_width()) // 2,
                                close_btn_rect_rel.y + (close_btn_rect_rel.height - x_surf.get_height()) // 2 - 2))
 
-    current_y_on_panel = header_h + padding // 2
-    search_box_rect_rel = pygame.Rect(padding, current_y_on_panel, PHYSICS_PANEL_WIDTH - 2 * padding - 95, search_box_h)
+    search_box_rect_rel = rects["search"]
     pygame.draw.rect(panel_surface, (30,30,40) if physics_panel_active_search_box else (20,20,30), search_box_rect_rel, border_radius=3)
     search_border_c = (200,200,255) if physics_panel_active_search_box else (100,100,120)
     pygame.draw.rect(panel_surface, search_border_c, search_box_rect_rel, 1, border_radius=3)
-    search_text = physics_panel_search + ("|" if physics_panel_active_search_box and int(current_time_for_flash*2)%2==0 else "")
+    search_text = physics_panel_search + ("|" if physics_panel_active_search_box and int(time.time()*2)%2==0 else "")
     if not physics_panel_search and not physics_panel_active_search_box: search_text = "Search..."
-    search_surf = font_small.render(search_text, True, PHYSICS_PANEL_TEXT_COLOR if physics_panel_search or physics_panel_active_search_box else (120,120,120))
+    search_surf = render_text(font_small, search_text, PHYSICS_PANEL_TEXT_COLOR if physics_panel_search or physics_panel_active_search_box else (120,120,120))
     panel_surface.blit(search_surf, (search_box_rect_rel.x + 5, search_box_rect_rel.y + (search_box_rect_rel.height - search_surf.get_height()) // 2))
 
-    changed_btn_width = 85
-    changed_btn_rect_rel = pygame.Rect(PHYSICS_PANEL_WIDTH - padding - changed_btn_width, current_y_on_panel, changed_btn_width, search_box_h)
-    changed_btn_abs_coords = changed_btn_rect_rel.move(panel_x, panel_y)
-    hover_changed = changed_btn_abs_coords.collidepoint(mx_abs,my_abs)
-    changed_bg_col = (90,130,190) if hover_changed else ((70,100,150) if physics_panel_show_only_changed else (50,70,100))
+    changed_btn_rect_rel = rects["changed"]
+    changed_bg_col = (90,130,190) if hover == "changed" else ((70,100,150) if physics_panel_show_only_changed else (50,70,100))
     pygame.draw.rect(panel_surface, changed_bg_col, changed_btn_rect_rel, border_radius=3)
-    changed_text_surf = font_small.render("Changed", True, WHITE if physics_panel_show_only_changed else (180,180,180))
+    changed_text_surf = render_text(font_small, "Changed", WHITE if physics_panel_show_only_changed else (180,180,180))
     panel_surface.blit(changed_text_surf, (changed_btn_rect_rel.centerx - changed_text_surf.get_width()//2,
                                          changed_btn_rect_rel.centery - changed_text_surf.get_height()//2))
-    current_y_on_panel += search_box_h + spacing_after_search
 
-    btn_spacing = 4; num_buttons = 3
-    btn_w = (PHYSICS_PANEL_WIDTH - 2 * padding - (num_buttons - 1) * btn_spacing) // num_buttons
-    collapse_btn_rect_rel = pygame.Rect(padding, current_y_on_panel, btn_w, buttons_h)
-    copy_btn_rect_rel = pygame.Rect(collapse_btn_rect_rel.right + btn_spacing, current_y_on_panel, btn_w, buttons_h)
-    reset_btn_rect_rel = pygame.Rect(copy_btn_rect_rel.right + btn_spacing, current_y_on_panel, btn_w, buttons_h)
-    hover_collapse = collapse_btn_rect_rel.move(panel_x,panel_y).collidepoint(mx_abs,my_abs)
-    hover_copy = copy_btn_rect_rel.move(panel_x,panel_y).collidepoint(mx_abs,my_abs)
-    hover_reset = reset_btn_rect_rel.move(panel_x,panel_y).collidepoint(mx_abs,my_abs)
-    pygame.draw.rect(panel_surface, (90,130,190) if hover_collapse else (70,100,150), collapse_btn_rect_rel, border_radius=3)
-    pygame.draw.rect(panel_surface, (90,130,190) if hover_copy else (70,100,150), copy_btn_rect_rel, border_radius=3)
-    pygame.draw.rect(panel_surface, (190,110,110) if hover_reset else (150,80,80), reset_btn_rect_rel, border_radius=3)
+    collapse_btn_rect_rel, copy_btn_rect_rel, reset_btn_rect_rel = rects["collapse"], rects["copy"], rects["reset"]
+    pygame.draw.rect(panel_surface, (90,130,190) if hover == "collapse" else (70,100,150), collapse_btn_rect_rel, border_radius=3)
+    pygame.draw.rect(panel_surface, (90,130,190) if hover == "copy" else (70,100,150), copy_btn_rect_rel, border_radius=3)
+    pygame.draw.rect(panel_surface, (190,110,110) if hover == "reset" else (150,80,80), reset_btn_rect_rel, border_radius=3)
     collapse_text_str = "Expand" if physics_panel_collapsed else "Collapse"
-    collapse_surf = font_small.render(collapse_text_str, True, WHITE); copy_surf = font_small.render("Copy Config", True, WHITE); reset_surf = font_small.render("Reset All", True, WHITE)
+    collapse_surf = render_text(font_small, collapse_text_str, WHITE); copy_surf = render_text(font_small, "Copy Config", WHITE); reset_surf = render_text(font_small, "Reset All", WHITE)
     panel_surface.blit(collapse_surf, (collapse_btn_rect_rel.centerx - collapse_surf.get_width()//2, collapse_btn_rect_rel.centery - collapse_surf.get_height()//2))
     panel_surface.blit(copy_surf, (copy_btn_rect_rel.centerx - copy_surf.get_width()//2, copy_btn_rect_rel.centery - copy_surf.get_height()//2))
     panel_surface.blit(reset_surf, (reset_btn_rect_rel.centerx - reset_surf.get_width()//2, reset_btn_rect_rel.centery - reset_surf.get_height()//2))
-    current_y_on_panel += buttons_h + spacing_after_buttons
 
-    if not physics_panel_collapsed:
-        param_list_area_y_on_panel = current_y_on_panel
-        param_list_area_h = actual_content_area_h
+    if "params" in rects:
         param_list_render_width = PHYSICS_PANEL_WIDTH - (UI_SCROLLBAR_WIDTH + padding//2 if physics_panel_scroll_max > 0 else 0)
-        
-        # Placeholder: Simulate total height of items for scrollbar calculation
-        # In Phase 2, this will be the actual sum of item heights.
-        simulated_total_item_height = 0
-        # For now, let's assume each item (label + slider + ruler) takes about 60 pixels.
-        # Filter params first for accurate count.
-        filtered_params_for_height_calc = [p for p in physics_params_config if not (physics_panel_search and physics_panel_search.lower() not in p["label"].lower()) and not (physics_panel_show_only_changed and math.isclose(globals().get(p["var_name"],0), cfg.DEFAULT_CONFIG.get(p["var_name"],0)))]
-        simulated_total_item_height = len(filtered_params_for_height_calc) * 60 # Rough estimate
-        
-        physics_panel_scroll_max = max(0, simulated_total_item_height - param_list_area_h)
-        physics_panel_scroll = max(0, min(physics_panel_scroll, physics_panel_scroll_max))
+        param_list_clip = pygame.Rect(0, rects["params"].y, param_list_render_width, rects["params"].height)
+        panel_surface.fill(PHYSICS_PANEL_COLOR, param_list_clip) # Drawn in place, clipped to the list area, instead of via a separate surface
+        panel_surface.set_clip(param_list_clip)
+        for i, ph_rect in enumerate(rects["param_rows"]):
+            if ph_rect.bottom > param_list_clip.top and ph_rect.top < param_list_clip.bottom:
+                pygame.draw.rect(panel_surface, (50 + i*2 % 205, 50 + i*3 % 205, 70 + i*4 % 185), ph_rect, border_radius=2)
+                panel_surface.blit(render_text(font_small, f"Param: {filtered[i]['label']}", WHITE), (ph_rect.x + 5, ph_rect.y + 5))
+        panel_surface.set_clip(None)
 
-        param_list_subsurface = pygame.Surface((param_list_render_width, param_list_area_h), pygame.SRCALPHA)
-        param_list_subsurface.fill(PHYSICS_PANEL_COLOR)
-
-        placeholder_y_offset = -physics_panel_scroll
-        for i in range(len(filtered_params_for_height_calc)): # Use count of filtered items
-            item_h = 55; item_spacing = 5 # Placeholder item height
-            ph_rect = pygame.Rect(padding//2, placeholder_y_offset, param_list_render_width - padding, item_h)
-            if ph_rect.bottom > 0 and ph_rect.top < param_list_area_h:
-                pygame.draw.rect(param_list_subsurface, (50 + i*2 % 205, 50 + i*3 % 205, 70 + i*4 % 185), ph_rect, border_radius=2)
-                text_surf = font_small.render(f"Param: {filtered_params_for_height_calc[i]['label']}", True, WHITE)
-                param_list_subsurface.blit(text_surf, (ph_rect.x + 5, ph_rect.y + 5))
-            placeholder_y_offset += item_h + item_spacing
-        
-        panel_surface.blit(param_list_subsurface, (0, param_list_area_y_on_panel))
+        if "scrollbar" in rects:
+            pygame.draw.rect(panel_surface, UI_SCROLLBAR_COLOR, rects["scrollbar"], border_radius=UI_SCROLLBAR_WIDTH//2)
+            handle_col = UI_SCROLLBAR_HANDLE_HOVER_COLOR if hover == "scroll_handle" or dragging_scrollbar else UI_SCROLLBAR_HANDLE_COLOR
+            pygame.draw.rect(panel_surface, handle_col, rects["scroll_handle"], border_radius=UI_SCROLLBAR_WIDTH//2)
 
-        if physics_panel_scroll_max > 0:
-            scrollbar_track_h = param_list_area_h
-            scrollbar_x = PHYSICS_PANEL_WIDTH - UI_SCROLLBAR_WIDTH - padding // 2
-            pygame.draw.rect(panel_surface, UI_SCROLLBAR_COLOR, (scrollbar_x, param_list_area_y_on_panel, UI_SCROLLBAR_WIDTH, scrollbar_track_h), border_radius=UI_SCROLLBAR_WIDTH//2)
-            handle_h_min = 20
-            handle_h = max(handle_h_min, scrollbar_track_h * (param_list_area_h / simulated_total_item_height) if simulated_total_item_height > 0 else handle_h_min)
-            handle_h = min(handle_h, scrollbar_track_h)
-            scroll_ratio = physics_panel_scroll / physics_panel_scroll_max if physics_panel_scroll_max > 0 else 0
-            handle_y_on_track = scroll_ratio * (scrollbar_track_h - handle_h)
-            handle_rect_rel = pygame.Rect(scrollbar_x, param_list_area_y_on_panel + handle_y_on_track, UI_SCROLLBAR_WIDTH, handle_h)
-            handle_abs_coords = handle_rect_rel.move(panel_x, panel_y)
-            hover_scrollbar_handle = handle_abs_coords.collidepoint(mx_abs, my_abs)
-            handle_col = UI_SCROLLBAR_HANDLE_HOVER_COLOR if hover_scrollbar_handle or dragging_scrollbar else UI_SCROLLBAR_HANDLE_COLOR
-            pygame.draw.rect(panel_surface, handle_col, handle_rect_rel, border_radius=UI_SCROLLBAR_WIDTH//2)
-
-    resize_handle_rect_rel = pygame.Rect(PHYSICS_PANEL_WIDTH - UI_PANEL_RESIZE_HANDLE_SIZE,
-                                       total_panel_h - UI_PANEL_RESIZE_HANDLE_SIZE,
-                                       UI_PANEL_RESIZE_HANDLE_SIZE, UI_PANEL_RESIZE_HANDLE_SIZE)
-    resize_handle_abs_coords = resize_handle_rect_rel.move(panel_x, panel_y)
-    hover_resize = resize_handle_abs_coords.collidepoint(mx_abs, my_abs)
+    resize_handle_rect_rel = rects["resize"]
     rh_points = [(resize_handle_rect_rel.left, resize_handle_rect_rel.bottom), (resize_handle_rect_rel.right, resize_handle_rect_rel.bottom), (resize_handle_rect_rel.right, resize_handle_rect_rel.top)]
-    pygame.draw.polygon(panel_surface, (150,150,180) if hover_resize or dragging_panel_resize else (100,100,120), rh_points)
+    pygame.draw.polygon(panel_surface, (150,150,180) if hover == "resize" or dragging_panel_resize else (100,100,120), rh_points)
+
+    pygame.draw.rect(panel_surface, PHYSICS_PANEL_BORDER_COLOR, rects["panel"], 1)
+
+# --- Frame Profiler HUD ---
+profiler_hud_lines, profiler_hud_frame = [], -1
+PROFILER_HUD_REFRESH_FRAMES = 15 # Percentiles are re-sorted a few times a second, not every frame
+def update_profiler_hud(font):
+    """Refreshes the pooled HUD surface every PROFILER_HUD_REFRESH_FRAMES. Returns (surface, screen rect, redrawn)."""
+    global profiler_hud_lines, profiler_hud_frame
+    elapsed = frame_profiler.frames - profiler_hud_frame
+    redrawn = profiler_hud_frame < 0 or elapsed < 0 or elapsed >= PROFILER_HUD_REFRESH_FRAMES # elapsed < 0: history reset by re-enabling
+    if redrawn:
+        phases, counters = frame_profiler.summary()
+        profiler_hud_lines = [f"Profiler: {min(frame_profiler.frames, frame_profiler.capacity)} frames   p50 / p99 ms"]
+        profiler_hud_lines += [f"{phase:<9} {p50:6.2f} {p99:6.2f}" for phase, (p50, p99) in phases.items()]
+        profiler_hud_lines += [f"{name}: {mean:.1f}/frame" for name, mean in counters.items()]
+        profiler_hud_frame = frame_profiler.frames
+    line_h = font.get_linesize()
+    hud_s = surface_pool.get("profiler_hud", (230, line_h * len(profiler_hud_lines) + 10), pygame.SRCALPHA)
+    if redrawn:
+        hud_s.fill((0,0,0,170))
+        for i, line in enumerate(profiler_hud_lines): hud_s.blit(render_text(font, line, WHITE), (5, 5 + i * line_h))
+    return hud_s, hud_s.get_rect(topright=(SCREEN_WIDTH - 10, TOOLBAR_HEIGHT + 10)), redrawn
+
+def export_frame_profile():
+    base = time.strftime("frame_profile_%Y%m%d_%H%M%S")
+    frames = frame_profiler.export_chrome_trace(base + ".json"); frame_profiler.export_csv(base + ".csv")
+    print(f"Frame profile: {frames} frames written to {base}.json (Chrome trace) and {base}.csv" if frames else "Frame profile: nothing recorded yet (F3 starts the profiler)")
+
+# --- Config Hot-Reload ---
+# Globals fed by a config key of another name or type. Other keys with a same-named global are assigned directly.
+CONFIG_KEY_GLOBALS = {
+    "PLAYER_SCALE": ("PLAYER_SCALE_cfg", None), "CULLING_THRESHOLD": ("CULLING_THRESHOLD_cfg", None),
+    "UI_PHYSICS_PANEL_WIDTH": ("PHYSICS_PANEL_WIDTH", None), "UI_PHYSICS_PANEL_CONTENT_HEIGHT": ("physics_panel_content_height", None),
+    "UI_PHYSICS_PANEL_TITLE_BAR_HEIGHT": ("PHYSICS_PANEL_TITLE_BAR_HEIGHT", None), "UI_PHYSICS_PANEL_CLOSE_BTN_SIZE": ("PHYSICS_PANEL_CLOSE_BTN_SIZE", None),
+    "UI_PHYSICS_PANEL_TITLE_COLOR": ("PHYSICS_PANEL_TITLE_COLOR", tuple), "UI_PHYSICS_PANEL_BORDER_COLOR": ("PHYSICS_PANEL_BORDER_COLOR", tuple),
+    "UI_PHYSICS_PANEL_CLOSE_BTN_COLOR": ("PHYSICS_PANEL_CLOSE_BTN_COLOR", tuple), "UI_PHYSICS_PANEL_CLOSE_BTN_HOVER_COLOR": ("PHYSICS_PANEL_CLOSE_BTN_HOVER_COLOR", tuple),
+    "UI_SCROLLBAR_COLOR": ("UI_SCROLLBAR_COLOR", tuple), "UI_SCROLLBAR_HANDLE_COLOR": ("UI_SCROLLBAR_HANDLE_COLOR", tuple), "UI_SCROLLBAR_HANDLE_HOVER_COLOR": ("UI_SCROLLBAR_HANDLE_HOVER_COLOR", tuple),
+}
+# Caches each key makes stale. Scale, culling threshold and render backend are already part of the frame-transform
+# and sprite cache keys, so changing them needs no invalidation.
+CONFIG_KEY_INVALIDATES = {"VOXEL_SIZE": ("ground", "transform", "sprites"), "GROUND_RANGE": ("terrain",), "TERRAIN_HILL_HEIGHT": ("terrain",),
+                          "PLAYER_SPRITE_CACHE_ROTATION_STEPS": ("sprites",), "PLAYER_SPRITE_CACHE_SQUISH_STEPS": ("sprites",), "PLAYER_LOD_MAX_LEVELS": ("lods",)}
+RESTART_ONLY_CONFIG_KEYS = ("SCREEN_WIDTH", "SCREEN_HEIGHT", "UI_TOOLBAR_HEIGHT", "PHYSICS_THREADED", "PLAYER_MODEL_PATH") # Window layout (the window owns these while running), the physics thread and the player model
 
-    pygame.draw.rect(panel_surface, PHYSICS_PANEL_BORDER_COLOR, (0,0,PHYSICS_PANEL_WIDTH, total_panel_h), 1)
-    screen_surf.blit(panel_surface, physics_panel_pos)
+def set_voxel_size(voxel_size):
+    global VOXEL_SIZE, ISO_TILE_WIDTH_HALF_BASE, ISO_TILE_HEIGHT_HALF_BASE, ISO_Z_FACTOR_BASE, ISO_VIEW_DIRECTION
+    VOXEL_SIZE = voxel_size
+    ISO_TILE_WIDTH_HALF_BASE, ISO_TILE_HEIGHT_HALF_BASE, ISO_Z_FACTOR_BASE = VOXEL_SIZE * 0.866, VOXEL_SIZE * 0.5, VOXEL_SIZE
+    ISO_VIEW_DIRECTION = normalize_vector((1,1,2*ISO_TILE_HEIGHT_HALF_BASE/ISO_Z_FACTOR_BASE))
+
+def invalidate_config_caches(stale):
+    """Drops the caches named in stale (values of CONFIG_KEY_INVALIDATES); adds "ground" when the terrain is rebuilt."""
+    global player_frame_transform_key, player_lods
+    if "terrain" in stale: build_terrain(); stale.add("ground")
+    if "ground" in stale: ground_tiles.invalidate()
+    if "transform" in stale: player_frame_transform_key = None
+    if "sprites" in stale: player_sprite_cache.clear()
+    if "lods" in stale and player_voxel_model is not None: player_lods = build_player_lods(player_voxel_model) # The frame loop clamps its level
+
+def apply_config_changes(changed):
+    """Applies reloaded config values to the running game, dropping only the caches they make stale."""
+    global QUALITY_TARGET_FPS, QUALITY_GOVERNOR_ENABLED
+    stale = set()
+    for key, value in changed.items():
+        if key in PHYSICS_PARAM_KEYS and player_physics is not None: player_physics.params[key] = value
+        if key in RESTART_ONLY_CONFIG_KEYS: print(f"Config: {key} changed on disk; takes effect after a restart"); continue
+        if key == "VOXEL_SIZE": set_voxel_size(value)
+        elif key == "PHYSICS_TICK_RATE":
+            if player_physics is not None: player_physics.fixed_dt = 1.0 / value
+        elif key == "PLAYER_SPRITE_CACHE_MB": player_sprite_cache.resize(int(value * 1024 * 1024))
+        elif key == "GROUND_TILE_CACHE_MB": ground_tiles.tiles.resize(int(value * 1024 * 1024))
+        elif key == "GROUND_TILE_SIZE": ground_tiles.set_tile_size(value)
+        elif key == "QUALITY_TARGET_FPS": QUALITY_TARGET_FPS = value; quality_governor.set_target_fps(value)
+        elif key == "QUALITY_LEVEL": quality_governor.set_level(value)
+        elif key == "QUALITY_GOVERNOR_ENABLED":
+            QUALITY_GOVERNOR_ENABLED = value
+            if not value: quality_governor.set_level(0)
+        elif key == "PHYSICS_PANEL_POS": physics_panel_pos[:] = value
+        elif key in CONFIG_KEY_GLOBALS:
+            name, convert = CONFIG_KEY_GLOBALS[key]
+            globals()[name] = convert(value) if convert else value
+        elif key in globals(): globals()[key] = value
+        stale.update(CONFIG_KEY_INVALIDATES.get(key, ()))
+    invalidate_config_caches(stale)
+    print(f"Config reloaded: {', '.join(sorted(k for k in changed if k not in RESTART_ONLY_CONFIG_KEYS))}" + (f" (invalidated: {', '.join(sorted(stale))})" if stale else ""))
+
+# --- Frame Capture ---
+# F5 saves every presented frame under CAPTURE_DIR/capture_<time>/ through a FrameCapture ring; see frame_capture.
+def start_frame_capture(screen):
+    out_dir = os.path.join(cfg.get("CAPTURE_DIR"), time.strftime("capture_%Y%m%d_%H%M%S"))
+    capture = FrameCapture(out_dir, screen, cfg.get("CAPTURE_RING_FRAMES"), cfg.get("CAPTURE_ENCODERS"), cfg.get("CAPTURE_FORMAT"))
+    print(f"Frame capture: recording {capture.fmt} frames to {out_dir}")
+    return capture
+
+def stop_frame_capture(capture):
+    capture.stop()
+    st = capture.stats()
+    print(f"Frame capture: {st['saved']} of {st['frames']} frames saved to {capture.out_dir} ({st['dropped']} dropped, {st['errors']} failed, {st['encode_ms']:.1f} ms to encode each)")
+
+# --- Recording & Replay ---
+# --record logs every frame's input and dt (see input_recording); --replay feeds a recording back headless, with no
+# frame cap, and writes a frame-time report and the player trajectory for replay_diff.py to compare between builds.
+def load_recorded_config(recorded):
+    """Makes the running settings match a recording's, in memory only, before main() opens the window."""
+    global SCREEN_WIDTH, SCREEN_HEIGHT, TOOLBAR_HEIGHT, GAME_SCREEN_HEIGHT, QUALITY_GOVERNOR_ENABLED
+    cfg.persist = False # Nothing a replay does may end up in the user's settings file
+    changed = {key: value for key, value in recorded.items() if cfg.config.get(key) != value}
+    cfg.config.update(changed)
+    SCREEN_WIDTH, SCREEN_HEIGHT, TOOLBAR_HEIGHT = cfg.get("SCREEN_WIDTH"), cfg.get("SCREEN_HEIGHT"), cfg.get("UI_TOOLBAR_HEIGHT")
+    GAME_SCREEN_HEIGHT = SCREEN_HEIGHT - TOOLBAR_HEIGHT
+    changed = {key: value for key, value in changed.items() if key not in RESTART_ONLY_CONFIG_KEYS}
+    if changed: apply_config_changes(changed)
+    QUALITY_GOVERNOR_ENABLED = False; quality_governor.set_level(0) # Fixed full quality, so timings compare across runs
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))] if sorted_values else 0.0
+
+def write_replay_report(path, replay, frame_times, wall_s):
+    """Frame-time summary of a replay (ms), with the profiler's per-phase p50/p99 and mean counters."""
+    ordered = sorted(frame_times)
+    phases, counters = frame_profiler.summary()
+    report = {"recording": replay.path, "frames": len(frame_times), "wall_s": wall_s, "fps": len(frame_times) / wall_s if wall_s > 0 else 0.0,
+              "frame_ms": {"mean": sum(ordered) / len(ordered) if ordered else 0.0, "p50": percentile(ordered, 0.5), "p90": percentile(ordered, 0.9),
+                           "p99": percentile(ordered, 0.99), "max": ordered[-1] if ordered else 0.0},
+              "phases_ms": {phase: {"p50": p50, "p99": p99} for phase, (p50, p99) in phases.items()}, "counters": counters}
+    with open(path, "w") as f: json.dump(report, f, indent=2)
+    fm = report["frame_ms"]
+    print(f"Replay: {report['frames']} frames in {wall_s:.2f} s ({report['fps']:.0f} fps); frame ms mean {fm['mean']:.2f} p50 {fm['p50']:.2f} p99 {fm['p99']:.2f} max {fm['max']:.2f}; report in {path}")
 
 # --- Main Game Loop ---
-def main():
+def main(record_path=None, replay=None, report_path="replay_report.json", trajectory_path="replay_trajectory.jsonl"):
     global SCREEN_WIDTH, SCREEN_HEIGHT, GAME_SCREEN_HEIGHT, PLAYER_SCALE_cfg, CULLING_THRESHOLD_cfg
-    global zoom, light_direction, player_rotation, light_mode
-    global squish, jump_charge_start_time, is_charging_jump, is_on_ground, target_squish, squish_velocity
-    global cached_ground_surface, cached_ground_zoom, cached_camera_offset
+    global zoom, light_direction, light_mode, player_physics, player_voxel_model, player_lods
     global show_physics_panel, physics_panel_pos, dragging_physics_panel, physics_panel_drag_start_offset, \
            dragging_panel_resize, panel_resize_drag_start_mouse_pos, panel_resize_drag_start_dims
     global active_text_input_param_key, text_input_string # dragging_slider_param_key (for phase 2)
     global physics_panel_scroll, physics_panel_scroll_max, physics_panel_collapsed, physics_panel_search, \
            physics_panel_show_only_changed, physics_panel_active_search_box, \
            dragging_scrollbar, scrollbar_drag_start_mouse_y, scrollbar_drag_start_scroll_y
-    global PHYSICS_PANEL_WIDTH, physics_panel_content_height
+    global PHYSICS_PANEL_WIDTH, physics_panel_content_height, QUALITY_GOVERNOR_ENABLED, frame_profiler
 
     pygame.init()
     load_physics_params_from_config() # Load all params into globals
@@ -376,104 +827,108 @@ def main():
         if not pygame.scrap.get_init(): print("Warning: Pygame scrap (clipboard) could not be initialized.")
     except Exception as e: print(f"Clipboard init error: {e}")
 
-    game_surface = pygame.Surface((SCREEN_WIDTH, GAME_SCREEN_HEIGHT), pygame.SRCALPHA)
-    toolbar_surface = pygame.Surface((SCREEN_WIDTH, TOOLBAR_HEIGHT))
-    
     clock = pygame.time.Clock()
     font_small = pygame.font.Font(None, 20); font_medium = pygame.font.Font(None, 24); font_large = pygame.font.Font(None, 48)
 
-    player_voxels_shape = []
-    current_radius = BASE_RADIUS * PLAYER_SCALE_cfg
-    for i in range(-BASE_RADIUS,BASE_RADIUS+1):
-        for j in range(-BASE_RADIUS,BASE_RADIUS+1):
-            for k in range(-BASE_RADIUS,BASE_RADIUS+1):
-                if (i+0.5)**2+(j+0.5)**2+(k+0.5)**2 <= BASE_RADIUS**2*1.05: player_voxels_shape.append((i,j,k,GREEN_BASE))
-    player_voxels_shape.sort(key=lambda v:(v[2],v[1],v[0]))
-    ground_level_z = -1
+    player_voxel_model = load_player_voxel_model()
+    player_lods = build_player_lods(player_voxel_model) # Each level keeps only shell voxels and their exposed faces
+    player_lod_level = 0
     origin_x_base, origin_y_base = SCREEN_WIDTH//2, GAME_SCREEN_HEIGHT//2
     camera_offset_x, camera_offset_y = 0,0
     dragging_camera, drag_start_camera = False, (0,0)
-    player_pos_world = [0.0,0.0,float(current_radius if current_radius>0 else 1.0)]
-    player_vel = [0.0,0.0,0.0]; prev_player_xy = (player_pos_world[0],player_pos_world[1])
+    build_terrain()
+    player_physics = BlobPhysics(base_radius=player_model_radius(player_voxel_model), ground_z=GROUND_LEVEL_Z, ground=terrain)
+    # Recording and replaying step physics in the loop with each frame's dt, so a replay ticks exactly as the session did
+    sim_thread = SimulationThread(player_physics).start() if cfg.get("PHYSICS_THREADED") and replay is None and record_path is None else None
+    if record_path and cfg.get("PHYSICS_THREADED"): print("Recording: physics ticks in the frame loop (PHYSICS_THREADED is ignored) so the replay can reproduce it")
     show_help, paused, current_fps = False,False,0.0
-    jump_initiated_this_frame, just_landed_this_frame, landing_impact_velocity = False,False,0.0
 
     panel_total_h_approx = PHYSICS_PANEL_TITLE_BAR_HEIGHT + physics_panel_content_height + 75
     physics_panel_pos[0] = max(0, min(physics_panel_pos[0], SCREEN_WIDTH - PHYSICS_PANEL_WIDTH))
     physics_panel_pos[1] = max(TOOLBAR_HEIGHT, min(physics_panel_pos[1], SCREEN_HEIGHT - panel_total_h_approx))
 
-    running = True
+    next_config_poll = time.monotonic()
+    recorder = InputRecorder(record_path, dict(cfg.config)) if record_path else None
+    trajectory_file, frame_times, replay_start = None, [], time.perf_counter()
+    if replay is not None:
+        trajectory_file = open(trajectory_path, "w")
+        frame_profiler = FrameProfiler(PROFILER_PHASES, PROFILER_COUNTERS, max(1, len(replay))); frame_profiler.set_enabled(True) # Whole replay, every phase
+    config_writes_seen = cfg.save_stats["writes"]
+    # What each layer showed last frame; a layer whose key changes marks its old and new screen rects dirty
+    last_ground_key, last_player_key, last_player_rect = None, None, None
+    last_zoom_time = -math.inf # A zoom gesture is in progress until GROUND_ZOOM_SETTLE_S after the last wheel step
+    last_toolbar_key, last_panel_key, last_overlay_key, last_hud_rect = None, None, None, None
+    running, frame_count = True, 0
+    frame_capture = None
     while running:
-        dt = min(clock.get_time()/1000.0, 0.1); current_time = time.time(); current_fps = clock.get_fps()
-        current_radius = BASE_RADIUS * PLAYER_SCALE_cfg
-        if not pygame.mouse.get_pressed()[2]: dragging_camera = False
-        jump_initiated_this_frame, just_landed_this_frame = False, False
+        frame_profiler.begin_frame()
+        frame_work_start = time.perf_counter()
+        current_fps = clock.get_fps()
+        if replay is not None: # Input, dt and time all come from the recording
+            if frame_count >= len(replay): break
+            frame_input = replay.frame(frame_count)
+            dt, frame_now, frame_events, frame_keys = frame_input["dt"], frame_input["now"], frame_input["events"], frame_input["keys"]
+            mouse_pos, mouse_buttons = frame_input["mouse_pos"], frame_input["mouse_buttons"]
+        else:
+            dt, frame_now, frame_events, frame_keys = min(clock.get_time()/1000.0, 0.1), time.monotonic(), pygame.event.get(), pygame.key.get_pressed()
+            mouse_pos, mouse_buttons = pygame.mouse.get_pos(), pygame.mouse.get_pressed()
+            if recorder is not None: recorder.record(dt, frame_now, frame_events, frame_keys, mouse_pos, mouse_buttons)
+        frame_count += 1
+        config_poll_interval = cfg.get("CONFIG_HOT_RELOAD_INTERVAL_S") if replay is None else 0
+        if config_poll_interval and time.monotonic() >= next_config_poll: # A stat() per interval; the file is only parsed when it changed
+            next_config_poll = time.monotonic() + config_poll_interval
+            changed_config = cfg.poll_file_changes()
+            if changed_config: apply_config_changes(changed_config)
+        frame_profiler.mark("config")
+        if not mouse_buttons[2]: dragging_camera = False
+        jump_pressed_this_frame = False
 
-        for event in pygame.event.get():
+        for event in frame_events:
             if event.type == pygame.QUIT: running = False
             elif event.type == pygame.VIDEORESIZE:
                 SCREEN_WIDTH,SCREEN_HEIGHT=event.w,event.h; GAME_SCREEN_HEIGHT=SCREEN_HEIGHT-TOOLBAR_HEIGHT
                 screen=pygame.display.set_mode((SCREEN_WIDTH,SCREEN_HEIGHT),pygame.RESIZABLE)
-                try: game_surface=pygame.Surface((SCREEN_WIDTH,GAME_SCREEN_HEIGHT),pygame.SRCALPHA); toolbar_surface=pygame.Surface((SCREEN_WIDTH,TOOLBAR_HEIGHT))
-                except pygame.error: game_surface=pygame.Surface((max(100,SCREEN_WIDTH),max(100,GAME_SCREEN_HEIGHT)),pygame.SRCALPHA); toolbar_surface=pygame.Surface((max(100,SCREEN_WIDTH),TOOLBAR_HEIGHT))
                 origin_x_base,origin_y_base=SCREEN_WIDTH//2,GAME_SCREEN_HEIGHT//2
                 PHYSICS_PANEL_WIDTH=max(UI_PHYSICS_PANEL_MIN_WIDTH,min(PHYSICS_PANEL_WIDTH,UI_PHYSICS_PANEL_MAX_WIDTH,SCREEN_WIDTH-20))
                 physics_panel_content_height=max(UI_PHYSICS_PANEL_MIN_CONTENT_HEIGHT,min(physics_panel_content_height,UI_PHYSICS_PANEL_MAX_CONTENT_HEIGHT,SCREEN_HEIGHT-TOOLBAR_HEIGHT-PHYSICS_PANEL_TITLE_BAR_HEIGHT-100))
                 panel_h_approx=PHYSICS_PANEL_TITLE_BAR_HEIGHT+physics_panel_content_height+75
                 physics_panel_pos[0]=max(0,min(physics_panel_pos[0],SCREEN_WIDTH-PHYSICS_PANEL_WIDTH))
                 physics_panel_pos[1]=max(TOOLBAR_HEIGHT,min(physics_panel_pos[1],SCREEN_HEIGHT-panel_h_approx))
-                cfg.set_param("SCREEN_WIDTH",SCREEN_WIDTH); cfg.set_param("SCREEN_HEIGHT",SCREEN_HEIGHT); cached_ground_surface=None
+                cfg.update_multiple({"SCREEN_WIDTH": SCREEN_WIDTH, "SCREEN_HEIGHT": SCREEN_HEIGHT})
+                if frame_capture is not None: stop_frame_capture(frame_capture); frame_capture = start_frame_capture(screen) # The ring holds frames of one size
             
             panel_event_consumed = False
             if show_physics_panel:
-                mouse_abs_x, mouse_abs_y = event.pos if hasattr(event,'pos') else pygame.mouse.get_pos()
-                panel_header_h = PHYSICS_PANEL_TITLE_BAR_HEIGHT
-                panel_controls_h = 26+4+22+10
-                panel_current_total_h = panel_header_h + panel_controls_h + (0 if physics_panel_collapsed else physics_panel_content_height)
-                close_btn_abs_rect = pygame.Rect(physics_panel_pos[0]+PHYSICS_PANEL_WIDTH-PHYSICS_PANEL_CLOSE_BTN_SIZE-5, physics_panel_pos[1]+(panel_header_h-PHYSICS_PANEL_CLOSE_BTN_SIZE)//2, PHYSICS_PANEL_CLOSE_BTN_SIZE,PHYSICS_PANEL_CLOSE_BTN_SIZE)
-                title_bar_abs_rect = pygame.Rect(physics_panel_pos[0],physics_panel_pos[1],PHYSICS_PANEL_WIDTH,panel_header_h)
-                resize_handle_abs_rect = pygame.Rect(physics_panel_pos[0]+PHYSICS_PANEL_WIDTH-UI_PANEL_RESIZE_HANDLE_SIZE, physics_panel_pos[1]+panel_current_total_h-UI_PANEL_RESIZE_HANDLE_SIZE, UI_PANEL_RESIZE_HANDLE_SIZE,UI_PANEL_RESIZE_HANDLE_SIZE)
-                param_list_abs_y_start = physics_panel_pos[1]+panel_header_h+panel_controls_h
-                param_list_abs_h = 0 if physics_panel_collapsed else physics_panel_content_height
-                scrollbar_track_abs_rect, scrollbar_handle_abs_rect = None,None
-                if not physics_panel_collapsed and physics_panel_scroll_max > 0 and param_list_abs_h > 0: # Ensure param_list_abs_h is positive
-                    scrollbar_x_abs = physics_panel_pos[0]+PHYSICS_PANEL_WIDTH-UI_SCROLLBAR_WIDTH-10//2
-                    scrollbar_track_abs_rect = pygame.Rect(scrollbar_x_abs,param_list_abs_y_start,UI_SCROLLBAR_WIDTH,param_list_abs_h)
-                    sim_total_h = param_list_abs_h + 300 # Placeholder
-                    handle_h = max(20, param_list_abs_h*(param_list_abs_h/sim_total_h) if sim_total_h > 0 else 20)
-                    handle_h = min(handle_h, param_list_abs_h)
-                    scroll_ratio = physics_panel_scroll/physics_panel_scroll_max if physics_panel_scroll_max > 0 else 0
-                    handle_y_on_track = scroll_ratio*(param_list_abs_h-handle_h)
-                    scrollbar_handle_abs_rect = pygame.Rect(scrollbar_x_abs,param_list_abs_y_start+handle_y_on_track,UI_SCROLLBAR_WIDTH,handle_h)
-
-                if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                    if close_btn_abs_rect.collidepoint(mouse_abs_x,mouse_abs_y): show_physics_panel=False; cfg.set_param("PHYSICS_PANEL_POS",physics_panel_pos); cfg.set_param("UI_PHYSICS_PANEL_WIDTH",PHYSICS_PANEL_WIDTH); cfg.set_param("UI_PHYSICS_PANEL_CONTENT_HEIGHT",physics_panel_content_height); active_text_input_param_key=None; physics_panel_active_search_box=False; panel_event_consumed=True
-                    elif resize_handle_abs_rect.collidepoint(mouse_abs_x,mouse_abs_y): dragging_panel_resize=True; panel_resize_drag_start_mouse_pos=(mouse_abs_x,mouse_abs_y); panel_resize_drag_start_dims=(PHYSICS_PANEL_WIDTH,physics_panel_content_height); panel_event_consumed=True
-                    elif scrollbar_handle_abs_rect and scrollbar_handle_abs_rect.collidepoint(mouse_abs_x,mouse_abs_y): dragging_scrollbar=True; scrollbar_drag_start_mouse_y=mouse_abs_y; scrollbar_drag_start_scroll_y=physics_panel_scroll; panel_event_consumed=True
-                    elif scrollbar_track_abs_rect and scrollbar_track_abs_rect.collidepoint(mouse_abs_x,mouse_abs_y): relative_y_on_track=mouse_abs_y-scrollbar_track_abs_rect.top; scroll_ratio_clicked=relative_y_on_track/scrollbar_track_abs_rect.height if scrollbar_track_abs_rect.height > 0 else 0; physics_panel_scroll=scroll_ratio_clicked*physics_panel_scroll_max; physics_panel_scroll=max(0,min(physics_panel_scroll,physics_panel_scroll_max)); panel_event_consumed=True
-                    elif title_bar_abs_rect.collidepoint(mouse_abs_x,mouse_abs_y): dragging_physics_panel=True; physics_panel_drag_start_offset=(mouse_abs_x-physics_panel_pos[0],mouse_abs_y-physics_panel_pos[1]); panel_event_consumed=True
-                    else: # Check other panel buttons (simplified)
-                        # This needs to map to the rects drawn in draw_physics_panel_ui
-                        # Example for search box:
-                        search_box_rel = pygame.Rect(10, panel_header_h + 10//2, PHYSICS_PANEL_WIDTH - 2*10 - 95, 26)
-                        if search_box_rel.move(physics_panel_pos[0], physics_panel_pos[1]).collidepoint(mouse_abs_x, mouse_abs_y):
-                            physics_panel_active_search_box = True; active_text_input_param_key = None; panel_event_consumed = True
-                        # ... similar checks for "Changed", "Collapse", "Copy", "Reset" ...
-                        # If click is within panel but not on a specific control:
-                        elif pygame.Rect(physics_panel_pos[0], physics_panel_pos[1], PHYSICS_PANEL_WIDTH, panel_current_total_h).collidepoint(mouse_abs_x, mouse_abs_y):
-                            if active_text_input_param_key: active_text_input_param_key = None; text_input_string = ""
-                            if physics_panel_active_search_box: physics_panel_active_search_box = False
-                            panel_event_consumed = True
+                mouse_abs_x, mouse_abs_y = event.pos if hasattr(event,'pos') else mouse_pos
+                panel_layout = get_physics_panel_layout(); panel_rects = panel_layout["rects"]
+                panel_widget = physics_panel_widget_at(panel_layout, mouse_abs_x, mouse_abs_y) if event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEWHEEL) else None
+                panel_target = panel_widget.name if panel_widget is not None else None
+                scrollbar_track_rect = panel_rects.get("scrollbar")
+
+                if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and panel_target is not None:
+                    panel_event_consumed = True
+                    if panel_target == "close": show_physics_panel=False; save_panel_layout(); active_text_input_param_key=None; physics_panel_active_search_box=False
+                    elif panel_target == "resize": dragging_panel_resize=True; panel_resize_drag_start_mouse_pos=(mouse_abs_x,mouse_abs_y); panel_resize_drag_start_dims=(PHYSICS_PANEL_WIDTH,physics_panel_content_height)
+                    elif panel_target == "scroll_handle": dragging_scrollbar=True; scrollbar_drag_start_mouse_y=mouse_abs_y; scrollbar_drag_start_scroll_y=physics_panel_scroll
+                    elif panel_target == "scrollbar": relative_y_on_track=mouse_abs_y-physics_panel_pos[1]-scrollbar_track_rect.top; physics_panel_scroll=max(0,min(relative_y_on_track/scrollbar_track_rect.height*physics_panel_scroll_max,physics_panel_scroll_max))
+                    elif panel_target == "title": dragging_physics_panel=True; physics_panel_drag_start_offset=(mouse_abs_x-physics_panel_pos[0],mouse_abs_y-physics_panel_pos[1])
+                    elif panel_target == "search": physics_panel_active_search_box = True; active_text_input_param_key = None
+                    elif panel_target == "changed": physics_panel_show_only_changed = not physics_panel_show_only_changed; physics_panel_scroll = 0
+                    elif panel_target == "collapse": physics_panel_collapsed = not physics_panel_collapsed
+                    elif panel_target == "copy": copy_current_config_to_clipboard()
+                    elif panel_target == "reset": reset_all_physics_params_to_defaults()
+                    else: # Panel background or a parameter row: leave any text input
+                        if active_text_input_param_key: active_text_input_param_key = None; text_input_string = ""
+                        if physics_panel_active_search_box: physics_panel_active_search_box = False
                 elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
-                    if dragging_panel_resize: dragging_panel_resize=False; cfg.set_param("UI_PHYSICS_PANEL_WIDTH",PHYSICS_PANEL_WIDTH); cfg.set_param("UI_PHYSICS_PANEL_CONTENT_HEIGHT",physics_panel_content_height)
+                    if dragging_panel_resize: dragging_panel_resize=False; cfg.update_multiple({"UI_PHYSICS_PANEL_WIDTH": PHYSICS_PANEL_WIDTH, "UI_PHYSICS_PANEL_CONTENT_HEIGHT": physics_panel_content_height})
                     dragging_physics_panel=False; dragging_scrollbar=False
                 elif event.type == pygame.MOUSEMOTION:
-                    if dragging_panel_resize: dx,dy=mouse_abs_x-panel_resize_drag_start_mouse_pos[0],mouse_abs_y-panel_resize_drag_start_mouse_pos[1]; PHYSICS_PANEL_WIDTH=panel_resize_drag_start_dims[0]+dx; physics_panel_content_height=panel_resize_drag_start_dims[1]+dy; PHYSICS_PANEL_WIDTH=max(UI_PHYSICS_PANEL_MIN_WIDTH,min(PHYSICS_PANEL_WIDTH,UI_PHYSICS_PANEL_MAX_WIDTH)); physics_panel_content_height=max(UI_PHYSICS_PANEL_MIN_CONTENT_HEIGHT,min(physics_panel_content_height,UI_PHYSICS_PANEL_MAX_CONTENT_HEIGHT)); cached_ground_surface=None; panel_event_consumed=True
-                    elif dragging_physics_panel: physics_panel_pos[0]=mouse_abs_x-physics_panel_drag_start_offset[0]; physics_panel_pos[1]=mouse_abs_y-physics_panel_drag_start_offset[1]; panel_h_approx=panel_header_h+physics_panel_content_height+75; physics_panel_pos[0]=max(0,min(physics_panel_pos[0],SCREEN_WIDTH-PHYSICS_PANEL_WIDTH)); physics_panel_pos[1]=max(TOOLBAR_HEIGHT,min(physics_panel_pos[1],SCREEN_HEIGHT-panel_h_approx)); panel_event_consumed=True
-                    elif dragging_scrollbar and scrollbar_track_abs_rect and scrollbar_track_abs_rect.height > 0: mouse_y_delta=mouse_abs_y-scrollbar_drag_start_mouse_y; scroll_delta_ratio=mouse_y_delta/scrollbar_track_abs_rect.height; physics_panel_scroll=scrollbar_drag_start_scroll_y+scroll_delta_ratio*physics_panel_scroll_max; physics_panel_scroll=max(0,min(physics_panel_scroll,physics_panel_scroll_max)); panel_event_consumed=True
-                elif event.type == pygame.MOUSEWHEEL and not physics_panel_collapsed:
-                    param_list_content_abs_rect = pygame.Rect(physics_panel_pos[0],param_list_abs_y_start,PHYSICS_PANEL_WIDTH,param_list_abs_h)
-                    if param_list_content_abs_rect.collidepoint(mouse_abs_x,mouse_abs_y): physics_panel_scroll-=event.y*30; physics_panel_scroll=max(0,min(physics_panel_scroll,physics_panel_scroll_max)); panel_event_consumed=True
+                    if dragging_panel_resize: dx,dy=mouse_abs_x-panel_resize_drag_start_mouse_pos[0],mouse_abs_y-panel_resize_drag_start_mouse_pos[1]; PHYSICS_PANEL_WIDTH=panel_resize_drag_start_dims[0]+dx; physics_panel_content_height=panel_resize_drag_start_dims[1]+dy; PHYSICS_PANEL_WIDTH=max(UI_PHYSICS_PANEL_MIN_WIDTH,min(PHYSICS_PANEL_WIDTH,UI_PHYSICS_PANEL_MAX_WIDTH)); physics_panel_content_height=max(UI_PHYSICS_PANEL_MIN_CONTENT_HEIGHT,min(physics_panel_content_height,UI_PHYSICS_PANEL_MAX_CONTENT_HEIGHT)); panel_event_consumed=True
+                    elif dragging_physics_panel: physics_panel_pos[0]=mouse_abs_x-physics_panel_drag_start_offset[0]; physics_panel_pos[1]=mouse_abs_y-physics_panel_drag_start_offset[1]; panel_h_approx=panel_rects["panel"].height; physics_panel_pos[0]=max(0,min(physics_panel_pos[0],SCREEN_WIDTH-PHYSICS_PANEL_WIDTH)); physics_panel_pos[1]=max(TOOLBAR_HEIGHT,min(physics_panel_pos[1],SCREEN_HEIGHT-panel_h_approx)); panel_event_consumed=True
+                    elif dragging_scrollbar and scrollbar_track_rect and scrollbar_track_rect.height > 0: mouse_y_delta=mouse_abs_y-scrollbar_drag_start_mouse_y; scroll_delta_ratio=mouse_y_delta/scrollbar_track_rect.height; physics_panel_scroll=scrollbar_drag_start_scroll_y+scroll_delta_ratio*physics_panel_scroll_max; physics_panel_scroll=max(0,min(physics_panel_scroll,physics_panel_scroll_max)); panel_event_consumed=True
+                elif event.type == pygame.MOUSEWHEEL and panel_target in ("params", "param", "scrollbar", "scroll_handle"):
+                    physics_panel_scroll-=event.y*30; physics_panel_scroll=max(0,min(physics_panel_scroll,physics_panel_scroll_max)); panel_event_consumed=True
                 elif event.type == pygame.KEYDOWN and (physics_panel_active_search_box): # or active_text_input_param_key
                     if physics_panel_active_search_box:
                         if event.key==pygame.K_ESCAPE: physics_panel_active_search_box=False; physics_panel_search=""
@@ -490,158 +945,203 @@ def main():
                 elif event.key == pygame.K_p: paused = not paused
                 elif event.key == pygame.K_t:
                     show_physics_panel = not show_physics_panel
-                    if not show_physics_panel: cfg.set_param("PHYSICS_PANEL_POS",physics_panel_pos); cfg.set_param("UI_PHYSICS_PANEL_WIDTH",PHYSICS_PANEL_WIDTH); cfg.set_param("UI_PHYSICS_PANEL_CONTENT_HEIGHT",physics_panel_content_height)
+                    if not show_physics_panel: save_panel_layout()
                     else: panel_h_approx=PHYSICS_PANEL_TITLE_BAR_HEIGHT+physics_panel_content_height+75; physics_panel_pos[0]=max(0,min(physics_panel_pos[0],SCREEN_WIDTH-PHYSICS_PANEL_WIDTH)); physics_panel_pos[1]=max(TOOLBAR_HEIGHT,min(physics_panel_pos[1],SCREEN_HEIGHT-panel_h_approx))
                 elif event.key == pygame.K_ESCAPE:
-                    if show_physics_panel: show_physics_panel=False; cfg.set_param("PHYSICS_PANEL_POS",physics_panel_pos); cfg.set_param("UI_PHYSICS_PANEL_WIDTH",PHYSICS_PANEL_WIDTH); cfg.set_param("UI_PHYSICS_PANEL_CONTENT_HEIGHT",physics_panel_content_height)
+                    if show_physics_panel: show_physics_panel=False; save_panel_layout()
                     elif show_help: show_help=False
-                elif event.key == pygame.K_c: camera_offset_x,camera_offset_y,zoom=0,0,1.0; cached_ground_surface=None
+                elif event.key == pygame.K_c: camera_offset_x,camera_offset_y,zoom=0,0,1.0
                 elif event.key == pygame.K_m: light_mode = not light_mode
+                elif event.key == pygame.K_F3 and replay is None: frame_profiler.set_enabled(not frame_profiler.enabled) # A replay profiles every frame
+                elif event.key == pygame.K_F4: export_frame_profile()
+                elif event.key == pygame.K_F5:
+                    if frame_capture is None: frame_capture = start_frame_capture(screen)
+                    else: stop_frame_capture(frame_capture); frame_capture = None
+                elif event.key == pygame.K_g:
+                    QUALITY_GOVERNOR_ENABLED = not QUALITY_GOVERNOR_ENABLED
+                    if not QUALITY_GOVERNOR_ENABLED: quality_governor.set_level(0); quality_governor.last_change = None # Full quality while off
+                    cfg.update_multiple({"QUALITY_GOVERNOR_ENABLED": QUALITY_GOVERNOR_ENABLED, "QUALITY_LEVEL": quality_governor.level})
                 elif event.key == pygame.K_SPACE:
-                    if is_on_ground and not is_charging_jump: player_vel[2]=INITIAL_JUMP_VELOCITY_UPS; is_on_ground=False; is_charging_jump=True; jump_charge_start_time=current_time; jump_initiated_this_frame=True; target_squish=SQUISH_ON_JUMP_START
-            elif event.type == pygame.KEYUP and event.key == pygame.K_SPACE and is_charging_jump: is_charging_jump=False; jump_charge_start_time=None
+                    jump_pressed_this_frame = True
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 3 and event.pos[1] > TOOLBAR_HEIGHT: dragging_camera=True; drag_start_camera=(event.pos[0]-camera_offset_x,event.pos[1]-camera_offset_y)
-                elif event.button == 1 and light_mode and event.pos[1] > TOOLBAR_HEIGHT: light_dir_x=event.pos[0]-SCREEN_WIDTH//2; light_dir_y=event.pos[1]-GAME_SCREEN_HEIGHT//2; light_direction=normalize_vector([-light_dir_x,-light_dir_y,200]); light_mode=False; cached_ground_surface=None
+                elif event.button == 1 and light_mode and event.pos[1] > TOOLBAR_HEIGHT: light_dir_x=event.pos[0]-SCREEN_WIDTH//2; light_dir_y=event.pos[1]-GAME_SCREEN_HEIGHT//2; light_direction=normalize_vector([-light_dir_x,-light_dir_y,200]); light_mode=False; ground_tiles.invalidate()
             elif event.type == pygame.MOUSEBUTTONUP and event.button == 3: dragging_camera=False
-            elif event.type == pygame.MOUSEMOTION and dragging_camera and event.pos[1] > TOOLBAR_HEIGHT: camera_offset_x=event.pos[0]-drag_start_camera[0]; camera_offset_y=event.pos[1]-drag_start_camera[1]; cached_ground_surface=None
-            elif event.type == pygame.MOUSEWHEEL: zoom_factor=1.1 if event.y>0 else 1/1.1; zoom*=zoom_factor; zoom=max(0.1,min(zoom,5.0)); cached_ground_surface=None
-
-        if not paused:
-            # --- Full Physics Update (using global parameters) ---
-            keys = pygame.key.get_pressed()
-            accel_input = [0.0, 0.0]
-            current_accel_rate_val = FAST_ACCEL_RATE if keys[pygame.K_LSHIFT] or keys[pygame.K_RSHIFT] else BASE_ACCEL_RATE
-            current_max_speed_val = FAST_MAX_SPEED_UPS if keys[pygame.K_LSHIFT] or keys[pygame.K_RSHIFT] else BASE_MAX_SPEED_UPS
-            current_max_speed_val *= BASE_SPEED_MULTIPLIER
-            if keys[pygame.K_w]: accel_input[1] -= 1
-            if keys[pygame.K_s]: accel_input[1] += 1
-            if keys[pygame.K_a]: accel_input[0] -= 1
-            if keys[pygame.K_d]: accel_input[0] += 1
-            accel_mag = math.hypot(accel_input[0], accel_input[1])
-            if accel_mag > 0: accel_input = [ (a / accel_mag) * current_accel_rate_val for a in accel_input]
-            else: accel_input = [0.0, 0.0]
-            player_vel[0] += accel_input[0] * dt; player_vel[1] += accel_input[1] * dt
-            speed_xy = math.hypot(player_vel[0], player_vel[1])
-            if speed_xy > 0:
-                damping_force_x = -player_vel[0] / speed_xy * DAMPING_FACTOR
-                damping_force_y = -player_vel[1] / speed_xy * DAMPING_FACTOR
-                player_vel[0] += damping_force_x * dt; player_vel[1] += damping_force_y * dt
-            if accel_mag == 0:
-                player_vel[0] *= (1.0 - EXTRA_FRICTION); player_vel[1] *= (1.0 - EXTRA_FRICTION)
-                if speed_xy < STICTION_THRESHOLD: player_vel[0] = 0.0; player_vel[1] = 0.0
-            current_speed_xy_check = math.hypot(player_vel[0], player_vel[1]) # Use a different var name
-            if current_speed_xy_check > current_max_speed_val:
-                scale = current_max_speed_val / current_speed_xy_check
-                player_vel[0] *= scale; player_vel[1] *= scale
-            if not is_on_ground: player_vel[2] += GRAVITY_ACCEL * dt
-            if is_charging_jump and keys[pygame.K_SPACE] and jump_charge_start_time is not None:
-                charge_duration = current_time - jump_charge_start_time
-                if charge_duration < MAX_JUMP_CHARGE_DURATION: player_vel[2] += JUMP_CHARGE_BOOST_ACCEL_RATE * dt
-                else: is_charging_jump = False
-            player_pos_world[0]+=player_vel[0]*dt; player_pos_world[1]+=player_vel[1]*dt; player_pos_world[2]+=player_vel[2]*dt
-            player_bottom_z = player_pos_world[2] - current_radius
-            if player_bottom_z <= ground_level_z + GROUND_CONTACT_THRESHOLD:
-                if not is_on_ground:
-                    just_landed_this_frame = True; landing_impact_velocity = abs(player_vel[2])
-                    if landing_impact_velocity > BOUNCE_THRESHOLD: player_vel[2] = landing_impact_velocity * COEFFICIENT_OF_RESTITUTION
-                    else: player_vel[2] = 0; player_pos_world[2] = ground_level_z + current_radius
-                else: player_vel[2] = 0; player_pos_world[2] = ground_level_z + current_radius
-                is_on_ground = True
-            else: is_on_ground = False
-            if is_on_ground and abs(player_vel[2]) < REST_VELOCITY_THRESHOLD: player_vel[2] = 0.0
-            dx_world = player_pos_world[0]-prev_player_xy[0]; dy_world = player_pos_world[1]-prev_player_xy[1]
-            prev_player_xy = (player_pos_world[0],player_pos_world[1])
-            if is_on_ground and (abs(dx_world)>1e-5 or abs(dy_world)>1e-5) and current_radius > 1e-5:
-                dist_moved=math.hypot(dx_world,dy_world); angle_rolled=dist_moved/current_radius
-                roll_axis=normalize_vector((-dy_world,dx_world,0))
-                if roll_axis!=(0,0,0):
-                    delta_rot=quat_from_axis_angle(roll_axis,angle_rolled); player_rotation=quat_mult(delta_rot,player_rotation)
-                    norm_sq=sum(c*c for c in player_rotation)
-                    if norm_sq>1e-9: player_rotation=tuple(c/math.sqrt(norm_sq) for c in player_rotation)
-            if jump_initiated_this_frame: target_squish = SQUISH_ON_JUMP_START
-            elif just_landed_this_frame:
-                norm_impact=0
-                if MAX_IMPACT_VELOCITY > IMPACT_VELOCITY_THRESHOLD: norm_impact = (landing_impact_velocity - IMPACT_VELOCITY_THRESHOLD) / (MAX_IMPACT_VELOCITY - IMPACT_VELOCITY_THRESHOLD)
-                norm_impact=max(0,min(1,norm_impact))
-                target_squish = MIN_SQUISH_ON_LANDING - norm_impact * (MIN_SQUISH_ON_LANDING - MAX_SQUISH_ON_LANDING)
-                target_squish=max(0.1,min(1.0,target_squish))
-            elif is_on_ground and not is_charging_jump: target_squish = 1.0
-            squish_force=elasticity*(target_squish-squish); damping_squish_force=SQUISH_DAMPING*squish_velocity
-            squish_accel=squish_force-damping_squish_force; squish_velocity+=squish_accel*dt; squish+=squish_velocity*dt
-            squish=max(0.1,min(2.0,squish))
-
-        game_surface.fill(BLACK); toolbar_surface.fill(TOOLBAR_COLOR)
+            elif event.type == pygame.MOUSEMOTION and dragging_camera and event.pos[1] > TOOLBAR_HEIGHT: camera_offset_x=event.pos[0]-drag_start_camera[0]; camera_offset_y=event.pos[1]-drag_start_camera[1]
+            elif event.type == pygame.MOUSEWHEEL: zoom_factor=1.1 if event.y>0 else 1/1.1; zoom*=zoom_factor; zoom=max(0.1,min(zoom,5.0)); last_zoom_time=frame_now
+
+        frame_profiler.mark("events")
+        # --- Physics Update: fixed-timestep ticks in BlobPhysics, on the simulation thread or here ---
+        keys = frame_keys
+        player_inputs = BlobInputs(move_x=keys[pygame.K_d]-keys[pygame.K_a], move_y=keys[pygame.K_s]-keys[pygame.K_w],
+                                   sprint=bool(keys[pygame.K_LSHIFT] or keys[pygame.K_RSHIFT]),
+                                   jump_held=bool(keys[pygame.K_SPACE]), jump_pressed=jump_pressed_this_frame)
+        if sim_thread is not None:
+            sim_thread.paused = paused
+            if not paused: sim_thread.send_input(player_inputs)
+            player_pos_world, player_vel, player_rotation, squish = sim_thread.render_state(time.perf_counter())
+        else:
+            if not paused: player_physics.step(dt, player_inputs)
+            player_pos_world, player_vel, player_rotation, squish = player_physics.render_state()
+        if trajectory_file is not None:
+            trajectory_file.write(json.dumps({"f": frame_count - 1, "pos": player_pos_world, "vel": player_vel, "squish": squish, "rot": player_rotation}, separators=(",", ":")) + "\n")
+        frame_profiler.mark("physics")
+
+        # --- Layers: each is updated off-screen and reports the screen rects it changed ---
+        dirty_rects.begin(screen.get_rect())
+        game_rect = pygame.Rect(0, TOOLBAR_HEIGHT, SCREEN_WIDTH, max(0, GAME_SCREEN_HEIGHT))
         draw_origin_x, draw_origin_y = origin_x_base+camera_offset_x, origin_y_base+camera_offset_y
-        if cached_ground_surface is None or cached_ground_zoom!=zoom or abs(cached_camera_offset[0]-camera_offset_x)>GROUND_CACHE_MARGIN/4 or abs(cached_camera_offset[1]-camera_offset_y)>GROUND_CACHE_MARGIN/4:
-            cached_ground_surface = render_ground_surface(zoom, ground_level_z) # Pass only zoom and z
-            cached_ground_zoom=zoom; cached_camera_offset=(camera_offset_x,camera_offset_y)
-        blit_x = draw_origin_x - cached_ground_surface.get_width()//2 # Center cache on draw_origin
-        blit_y = draw_origin_y - cached_ground_surface.get_height()//2
-        game_surface.blit(cached_ground_surface, (blit_x, blit_y))
-
-        # Player Rendering (as before)
-        player_render_voxels = []
-        effective_squish_xy = 1.0 / squish if squish != 0 else 1.0
-        for rel_ix, rel_iy, rel_iz_shape, base_color in player_voxels_shape:
-            s_rel_x, s_rel_y, s_rel_z = rel_ix * PLAYER_SCALE_cfg, rel_iy * PLAYER_SCALE_cfg, rel_iz_shape * PLAYER_SCALE_cfg * squish
-            rot_sub_voxel_rel = quat_rotate_point(player_rotation, (s_rel_x, s_rel_y, s_rel_z))
-            vx,vy,vz = player_pos_world[0]+rot_sub_voxel_rel[0], player_pos_world[1]+rot_sub_voxel_rel[1], player_pos_world[2]+rot_sub_voxel_rel[2]
-            player_render_voxels.append(((vx,vy,vz), base_color))
-        player_render_voxels.sort(key=lambda item: (item[0][2], item[0][1], item[0][0]), reverse=True)
-        for (voxel_w_center_x, voxel_w_center_y, voxel_w_center_z), base_color in player_render_voxels:
-            for face_key, unrot_normal in FACE_NORMALS.items():
-                world_face_normal = normalize_vector(quat_rotate_point(player_rotation, unrot_normal))
-                dot_view_normal = sum(n*v for n,v in zip(world_face_normal, VIEW_DIRECTION_FOR_CULLING))
-                if dot_view_normal > CULLING_THRESHOLD_cfg:
-                    unit_corners = VOXEL_CORNER_OFFSETS[face_key]
-                    face_pts_3d = []
-                    for off_x,off_y,off_z in unit_corners:
-                        lc_x,lc_y,lc_z = off_x-0.5, off_y-0.5, off_z-0.5
-                        sl_x,sl_y,sl_z = lc_x*PLAYER_SCALE_cfg, lc_y*PLAYER_SCALE_cfg, lc_z*PLAYER_SCALE_cfg*squish
-                        rot_lc = quat_rotate_point(player_rotation, (sl_x,sl_y,sl_z))
-                        wc_x,wc_y,wc_z = voxel_w_center_x+rot_lc[0], voxel_w_center_y+rot_lc[1], voxel_w_center_z+rot_lc[2]
-                        face_pts_3d.append((wc_x,wc_y,wc_z))
-                    poly_2d = [ (int(sx+draw_origin_x), int(sy+draw_origin_y)) for sx,sy in 
-                                [project_iso(p[0],p[1],p[2],zoom) for p in face_pts_3d] ]
-                    face_col = compute_face_color_with_normal(base_color, world_face_normal, light_direction)
-                    pygame.draw.polygon(game_surface, face_col, poly_2d)
-        
-        screen.blit(game_surface, (0, TOOLBAR_HEIGHT))
+        screen_origin = (draw_origin_x, draw_origin_y + TOOLBAR_HEIGHT) # Where the world origin projects on screen
+        ground_scaled_from = None
+        if frame_now - last_zoom_time < GROUND_ZOOM_SETTLE_S and not ground_tiles.is_cached(zoom, screen_origin, game_rect):
+            ground_scaled_from = ground_tiles.nearest_cached_zoom(zoom, screen_origin, game_rect) # Stretch a cached zoom until the wheel settles
+        ground_smooth = quality_settings()["smooth_ground_zoom"]
+        ground_key = (ground_tiles.version, zoom, screen_origin, game_rect.size, ground_scaled_from, ground_smooth)
+        if ground_key != last_ground_key: # Camera moved: the whole game area changes, and only newly exposed tiles get rendered
+            if ground_scaled_from is None: ground_tiles.prefetch(zoom, screen_origin, game_rect)
+            dirty_rects.add(game_rect); last_ground_key = ground_key
+        frame_profiler.mark("ground")
+
+        player_lod_level = select_player_lod(player_lod_level, player_voxel_px(zoom), len(player_lods))
+        player_model = player_lods[min(player_lod_level + quality_settings()["lod_bias"], len(player_lods) - 1)]
+        player_sprite = get_player_sprite(player_model, player_rotation, squish, zoom) if PLAYER_SPRITE_CACHE_ENABLED else None
+        player_rect = player_screen_rect(player_model, player_pos_world, squish, zoom, screen_origin, player_sprite)
+        player_key = (player_pos_world, player_rotation, squish, zoom, screen_origin, id(player_sprite[0]) if player_sprite else None, player_model["lod_level"],
+                      PLAYER_RENDER_BACKEND, PLAYER_SCALE_cfg, player_culling_threshold(), tuple(light_direction))
+        if player_key != last_player_key: dirty_rects.add(last_player_rect); dirty_rects.add(player_rect) # Erase the old bounds, draw the new
+        last_player_key, last_player_rect = player_key, player_rect
+        frame_profiler.mark("player")
+
         help_txt_str = f"H:Help P:Pause T:Tune Esc:Close C:CamReset M:LightMode FPS:{current_fps:.0f}"
-        help_surf = font_medium.render(help_txt_str, True, TEXT_COLOR)
-        toolbar_surface.blit(help_surf, (10, (TOOLBAR_HEIGHT - help_surf.get_height()) // 2))
-        settings_btn_rect_tb = pygame.Rect(SCREEN_WIDTH - 160, (TOOLBAR_HEIGHT - 24)//2, 32, 24)
-        pygame.draw.rect(toolbar_surface, (80,120,180), settings_btn_rect_tb, border_radius=5)
-        settings_icon_font = pygame.font.Font(None,28); settings_icon_surf = settings_icon_font.render("⚙", True,WHITE)
-        toolbar_surface.blit(settings_icon_surf, (settings_btn_rect_tb.centerx - settings_icon_surf.get_width()//2, settings_btn_rect_tb.centery - settings_icon_surf.get_height()//2))
-        reset_player_btn_rect_tb = pygame.Rect(SCREEN_WIDTH - 120, (TOOLBAR_HEIGHT - 24)//2, 110, 24)
-        pygame.draw.rect(toolbar_surface, (180,100,100), reset_player_btn_rect_tb, border_radius=5)
-        reset_player_text_surf = font_medium.render("Reset Player",True,WHITE)
-        toolbar_surface.blit(reset_player_text_surf, (reset_player_btn_rect_tb.centerx - reset_player_text_surf.get_width()//2, reset_player_btn_rect_tb.centery - reset_player_text_surf.get_height()//2))
-        screen.blit(toolbar_surface, (0,0))
-
-        if show_physics_panel: draw_physics_panel_ui(screen, font_small, font_medium)
+        if frame_capture is not None:
+            fc = frame_capture.stats(); help_txt_str += f" REC {fc['saved']}/{fc['captured']} drop:{fc['dropped']}"
+        if QUALITY_GOVERNOR_ENABLED: help_txt_str += f" Quality:{len(quality_governor.levels) - 1 - quality_governor.level}/{len(quality_governor.levels) - 1}" + {"down": " lowered", "up": " raised"}.get(quality_governor.last_change, "")
+        toolbar_surface = surface_pool.get("toolbar", (max(1, SCREEN_WIDTH), TOOLBAR_HEIGHT))
+        if (help_txt_str, SCREEN_WIDTH) != last_toolbar_key:
+            last_toolbar_key = (help_txt_str, SCREEN_WIDTH)
+            toolbar_surface.fill(TOOLBAR_COLOR)
+            help_surf = render_text(font_medium, help_txt_str, TEXT_COLOR)
+            toolbar_surface.blit(help_surf, (10, (TOOLBAR_HEIGHT - help_surf.get_height()) // 2))
+            settings_btn_rect_tb = pygame.Rect(SCREEN_WIDTH - 160, (TOOLBAR_HEIGHT - 24)//2, 32, 24)
+            pygame.draw.rect(toolbar_surface, (80,120,180), settings_btn_rect_tb, border_radius=5)
+            settings_icon_surf = render_text(get_font(28), "⚙", WHITE)
+            toolbar_surface.blit(settings_icon_surf, (settings_btn_rect_tb.centerx - settings_icon_surf.get_width()//2, settings_btn_rect_tb.centery - settings_icon_surf.get_height()//2))
+            reset_player_btn_rect_tb = pygame.Rect(SCREEN_WIDTH - 120, (TOOLBAR_HEIGHT - 24)//2, 110, 24)
+            pygame.draw.rect(toolbar_surface, (180,100,100), reset_player_btn_rect_tb, border_radius=5)
+            reset_player_text_surf = render_text(font_medium, "Reset Player", WHITE)
+            toolbar_surface.blit(reset_player_text_surf, (reset_player_btn_rect_tb.centerx - reset_player_text_surf.get_width()//2, reset_player_btn_rect_tb.centery - reset_player_text_surf.get_height()//2))
+            dirty_rects.add(toolbar_surface.get_rect())
+        frame_profiler.mark("toolbar")
+
+        panel_redrawn = show_physics_panel and update_physics_panel_ui(font_small, font_medium, mouse_pos)
+        panel_rect = physics_panel_surface.get_rect(topleft=physics_panel_pos) if show_physics_panel else None
+        if panel_redrawn or panel_rect != last_panel_key:
+            if last_panel_key is not None: dirty_rects.add(last_panel_key) # Uncovers what was under the old panel
+            dirty_rects.add(panel_rect)
+            last_panel_key = panel_rect
+        frame_profiler.mark("panel")
+
+        help_text_lines = None
         if show_help:
-            help_s = pygame.Surface((SCREEN_WIDTH, GAME_SCREEN_HEIGHT), pygame.SRCALPHA); help_s.fill((0,0,0,180))
-            help_text_lines = ["--- Controls ---", "WASD: Move", "Shift: Sprint", "Space: Jump (Hold to boost)", "Mouse Wheel: Zoom", "RMB Drag: Pan Camera", "C: Reset Camera", "H: Help", "P: Pause", "T: Tune Physics", "Esc: Close UI / Exit Input", "M: Light Mode"]
-            for i, line in enumerate(help_text_lines): line_surf = font_medium.render(line, True, WHITE); help_s.blit(line_surf, (50, 50 + i * 30))
-            screen.blit(help_s, (0,TOOLBAR_HEIGHT))
-        if paused:
-            pause_s = pygame.Surface((SCREEN_WIDTH, GAME_SCREEN_HEIGHT), pygame.SRCALPHA); pause_s.fill((0,0,0,120))
-            pause_text = font_large.render("PAUSED", True, WHITE)
-            pause_s.blit(pause_text, (SCREEN_WIDTH//2 - pause_text.get_width()//2, GAME_SCREEN_HEIGHT//2 - pause_text.get_height()//2))
-            screen.blit(pause_s, (0,TOOLBAR_HEIGHT))
-
-        pygame.display.flip()
-        clock.tick(60)
-
-    if show_physics_panel: # Save panel state on quit
-        cfg.set_param("PHYSICS_PANEL_POS", physics_panel_pos)
-        cfg.set_param("UI_PHYSICS_PANEL_WIDTH", PHYSICS_PANEL_WIDTH)
-        cfg.set_param("UI_PHYSICS_PANEL_CONTENT_HEIGHT", physics_panel_content_height)
+            help_text_lines = ["--- Controls ---", "WASD: Move", "Shift: Sprint", "Space: Jump (Hold to boost)", "Mouse Wheel: Zoom", "RMB Drag: Pan Camera", "C: Reset Camera", "H: Help", "P: Pause", "T: Tune Physics", "Esc: Close UI / Exit Input", "M: Light Mode", "G: Quality Governor", "F3: Frame Profiler", "F4: Export Frame Profile", "F5: Capture Frames"]
+            ss = cfg.save_stats
+            help_text_lines += ["", "--- Stats ---", f"Settings saves: {ss['writes']} written / {ss['requests']} requested ({ss['skipped']} coalesced, {ss['errors']} failed), {len(cfg.dirty_keys)} pending",
+                                f"Settings reloads: {cfg.reload_stats['reloads']} ({cfg.reload_stats['keys_applied']} keys applied) in {cfg.reload_stats['polls']} polls"]
+            help_text_lines += [f"Physics panel: {physics_panel_stats['rebuilds']} redraws in {physics_panel_stats['frames']} frames shown; text cache {text_cache.hits} hits / {text_cache.misses} misses"]
+            if PLAYER_SPRITE_CACHE_ENABLED:
+                sc = player_sprite_cache.stats()
+                help_text_lines += [f"Sprite cache: {sc['hits']} hits / {sc['misses']} misses ({sc['hit_rate']:.0%}), {sc['entries']} sprites, {sc['used_bytes']/1048576:.1f}/{sc['max_bytes']/1048576:.0f} MB, {sc['evictions']} evicted"]
+            if sim_thread is not None:
+                help_text_lines += [f"Simulation: own thread at {1.0/player_physics.fixed_dt:.0f} Hz, measured {sim_thread.measured_rate():.1f} Hz, {sim_thread.ticks} ticks ({sim_thread.tick_seconds/max(1, sim_thread.ticks)*1e6:.0f} us each), {sim_thread.dropped_ticks} dropped"]
+            else: help_text_lines += [f"Simulation: in the frame loop at {1.0/player_physics.fixed_dt:.0f} Hz"]
+            if frame_capture is not None:
+                fc = frame_capture.stats()
+                help_text_lines += [f"Frame capture: {fc['saved']} saved / {fc['captured']} captured / {fc['frames']} frames, {fc['dropped']} dropped, {fc['pending']}/{fc['ring']} queued, {fc['encode_ms']:.1f} ms per {frame_capture.fmt}"]
+            help_text_lines += [f"Player LOD: level {player_model['lod_level']} of {len(player_lods)} ({player_voxel_px(zoom):.2f} px voxels), {len(player_model['shape'])} voxels / {sum(bin(m).count('1') for m in player_model['face_masks'])} faces"]
+            qg = quality_governor
+            help_text_lines += [f"Quality governor: {'on' if QUALITY_GOVERNOR_ENABLED else 'off'}, level {qg.level}/{len(qg.levels) - 1}, p90 work {qg.recent_ms():.1f} ms of {qg.budget_s*1000:.1f} ms budget, {qg.downgrades} lowered / {qg.upgrades} raised"]
+            gt = ground_tiles.stats()
+            help_text_lines += [f"Ground tiles: {gt['entries']} cached ({gt['used_bytes']/1048576:.1f}/{gt['max_bytes']/1048576:.0f} MB, {gt['zoom_levels']} zooms), {gt['rendered']} rendered, {gt['evictions']} evicted, {gt['scaled_draws']} scaled draws"]
+            meshed = [c for c in terrain.chunks.values() if c.mesh is not None]
+            help_text_lines += [f"Terrain: {len(terrain.chunks)} chunks, {len(meshed)} meshed into {sum(len(c.mesh) for c in meshed)} faces ({terrain.meshes_built} mesh builds)"]
+            help_text_lines += [f"Presentation: {dirty_rects.full_frames} full / {dirty_rects.frames} frames, {dirty_rects.presented_pixels/1000:.0f}k px last frame; surface pool {surface_pool.allocations} allocated, {surface_pool.reuses} reused"]
+        overlay_size = (max(1, SCREEN_WIDTH), max(1, GAME_SCREEN_HEIGHT))
+        overlay_key = (help_text_lines, paused, overlay_size)
+        if overlay_key != last_overlay_key: # The overlays cover the game area, so any change redraws all of it
+            if help_text_lines is not None:
+                help_s = surface_pool.get("help_overlay", overlay_size, pygame.SRCALPHA); help_s.fill((0,0,0,180))
+                for i, line in enumerate(help_text_lines): help_s.blit(render_text(font_medium, line, WHITE), (50, 50 + i * 30))
+            if paused and (last_overlay_key is None or not last_overlay_key[1] or last_overlay_key[2] != overlay_size):
+                pause_s = surface_pool.get("pause_overlay", overlay_size, pygame.SRCALPHA); pause_s.fill((0,0,0,120))
+                pause_text = render_text(font_large, "PAUSED", WHITE)
+                pause_s.blit(pause_text, (overlay_size[0]//2 - pause_text.get_width()//2, overlay_size[1]//2 - pause_text.get_height()//2))
+            dirty_rects.add(game_rect); last_overlay_key = overlay_key
+        frame_profiler.mark("overlays")
+
+        hud_surface = hud_rect = None
+        if frame_profiler.enabled:
+            hud_surface, hud_rect, hud_redrawn = update_profiler_hud(font_small)
+            if hud_redrawn: dirty_rects.add(hud_rect)
+        if hud_rect != last_hud_rect: dirty_rects.add(last_hud_rect); dirty_rects.add(hud_rect); last_hud_rect = hud_rect
+        frame_profiler.mark("hud")
+
+        # --- Compose: redraw every layer back to front, clipped to each dirty rect, straight onto the screen ---
+        redraw_rects = dirty_rects.merged()
+        player_layer = player_sprite[0] if player_sprite is not None else None # Without the sprite cache, rendered on first use below
+        for rect in redraw_rects:
+            game_clip = rect.clip(game_rect)
+            if game_clip.width and game_clip.height:
+                screen.set_clip(game_clip)
+                screen.fill(BLACK, game_clip)
+                ground_tiles.draw(screen, screen_origin, zoom, game_clip, ground_scaled_from, ground_smooth)
+                if player_rect.colliderect(game_clip):
+                    if player_layer is None: # Rasterize once per frame, however many dirty rects the player spans
+                        player_layer = surface_pool.get("player_layer", player_rect.size, pygame.SRCALPHA); player_layer.fill((0,0,0,0))
+                        draw_player(player_layer, player_model, player_pos_world, player_rotation, squish, zoom, (screen_origin[0] - player_rect.x, screen_origin[1] - player_rect.y))
+                    screen.blit(player_layer, player_rect)
+            screen.set_clip(rect)
+            if rect.top < TOOLBAR_HEIGHT: screen.blit(toolbar_surface, (0,0))
+            if panel_rect is not None and rect.colliderect(panel_rect): screen.blit(physics_panel_surface, panel_rect)
+            if help_text_lines is not None and game_clip.height: screen.blit(surface_pool.surfaces["help_overlay"], game_rect)
+            if paused and game_clip.height: screen.blit(surface_pool.surfaces["pause_overlay"], game_rect)
+            if hud_rect is not None and rect.colliderect(hud_rect): screen.blit(hud_surface, hud_rect)
+        screen.set_clip(None)
+        frame_profiler.mark("compose")
+
+        dirty_rects.present(redraw_rects)
+        frame_profiler.mark("present")
+        if frame_capture is not None: frame_capture.capture(screen)
+        frame_profiler.mark("capture")
+        frame_profiler.count("dirty_rects", len(redraw_rects)); frame_profiler.count("presented_kpixels", dirty_rects.presented_pixels // 1000)
+        if QUALITY_GOVERNOR_ENABLED and not paused and quality_governor.record(time.perf_counter() - frame_work_start) is not None:
+            cfg.set_param("QUALITY_LEVEL", quality_governor.level)
+        if replay is None: clock.tick(QUALITY_TARGET_FPS)
+        else: frame_times.append((time.perf_counter() - frame_work_start) * 1000.0) # No frame cap: as fast as it goes
+        frame_profiler.mark("wait")
+        frame_profiler.count("config_writes", cfg.save_stats["writes"] - config_writes_seen); config_writes_seen = cfg.save_stats["writes"]
+        frame_profiler.end_frame()
+
+    if sim_thread is not None: sim_thread.stop()
+    if frame_capture is not None: stop_frame_capture(frame_capture) # Waits for queued frames to be written
+    if recorder is not None: recorder.close(); print(f"Recorded {recorder.frames} frames to {recorder.path}")
+    if replay is not None:
+        trajectory_file.close()
+        write_replay_report(report_path, replay, frame_times, time.perf_counter() - replay_start)
+    if show_physics_panel: save_panel_layout() # Save panel state on quit
+    cfg.flush() # Don't leave pending settings to the background writer
     pygame.quit()
     sys.exit()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Voxel blob game.")
+    parser.add_argument("--record", metavar="PATH", help="Log every frame's input and dt to PATH (.jsonl, or .jsonl.gz)")
+    parser.add_argument("--replay", metavar="PATH", help="Replay a recording headless at full speed, then exit")
+    parser.add_argument("--report", default="replay_report.json", help="Replay frame-time report (JSON)")
+    parser.add_argument("--trajectory", default="replay_trajectory.jsonl", help="Replay player trajectory (JSONL, one line per frame)")
+    args = parser.parse_args()
+    replay = None
+    if args.replay:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy"); os.environ.setdefault("SDL_AUDIODRIVER", "dummy") # Before pygame.init() in main()
+        replay = InputReplay(args.replay)
+        load_recorded_config(replay.config)
+    main(args.record, replay, args.report, args.trajectory)
\ No newline at end of file
@@ -0,0 +1,19 @@
+# voxel_math.py
+# Vector and quaternion helpers shared by the renderer and the headless simulation. Quaternions are (w, x, y, z).
+import math
+
+def normalize_vector(v): mag = math.sqrt(sum(c*c for c in v)); return tuple(c/mag for c in v) if mag else (0,0,0)
+
+# --- Quaternion Functions ---
+def quat_from_axis_angle(axis, angle): ax,ay,az=axis; half_angle=angle/2.0; s=math.sin(half_angle); return (math.cos(half_angle),ax*s,ay*s,az*s)
+def quat_mult(q1,q2): w1,x1,y1,z1=q1; w2,x2,y2,z2=q2; return (w1*w2-x1*x2-y1*y2-z1*z2, w1*x2+x1*w2+y1*z2-z1*y2, w1*y2-x1*z2+y1*w2+z1*x2, w1*z2+x1*y2-y1*x2+z1*w2)
+def quat_conjugate(q): w,x,y,z=q; return (w,-x,-y,-z)
+def quat_rotate_point(q,point): p=(0.0,point[0],point[1],point[2]); qc=quat_conjugate(q); p_rot=quat_mult(quat_mult(q,p),qc); return (p_rot[1],p_rot[2],p_rot[3])
+def quat_to_matrix(q): # 3x3 row-major rotation matrix equivalent to quat_rotate_point for a unit quaternion
+    w,x,y,z=q
+    return ((1-2*(y*y+z*z), 2*(x*y-w*z), 2*(x*z+w*y)),
+            (2*(x*y+w*z), 1-2*(x*x+z*z), 2*(y*z-w*x)),
+            (2*(x*z-w*y), 2*(y*z+w*x), 1-2*(x*x+y*y)))
+def quat_nlerp(q1, q2, t): # Normalized lerp along the shorter arc; plenty for interpolating between nearby physics ticks
+    if sum(a*b for a,b in zip(q1,q2)) < 0: q2 = tuple(-c for c in q2)
+    return normalize_vector(tuple(a + (b-a)*t for a,b in zip(q1,q2)))
@@ -0,0 +1,267 @@
+# voxel_model.py
+# Voxel models on disk and in memory. A VoxelModel is packed: int16 x/y/z per voxel in one flat array plus one
+# palette index byte per voxel (7 bytes a voxel, against 40+ for an (i, j, k, color) tuple), sorted by (z, y, x).
+# Models load from MagicaVoxel .vox files or the native .bvox format, whose arrays are laid out so that large
+# files are memory-mapped rather than read. Data derived from a model (LOD shells, face masks, draw orders) is
+# cached in a file next to it, keyed by a hash of the model's content. Kept free of pygame.
+# Usage: python voxel_model.py info MODEL | convert SRC DST.bvox
+import argparse
+import array
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import time
+from voxel_shape import build_lod_pyramid, build_draw_orders
+
+BVOX_MAGIC, BVOX_VERSION = b"BVOX", 1
+BVOX_HEADER = struct.Struct("<4sHHI4x") # magic, version, palette entries, voxel count
+MMAP_MIN_BYTES = 1 << 20 # .bvox files at least this big are memory-mapped
+DERIVED_MAGIC, DERIVED_VERSION = b"VOXDERIV", 2 # Bump DERIVED_VERSION when derived data changes shape
+DERIVED_LEVEL = struct.Struct("<IIc3x") # shell voxels, voxel size, coordinate typecode (b"h" int16 or b"d" float64)
+DERIVED_OCTANTS = tuple((sx, sy, sz) for sx in (-1, 1) for sy in (-1, 1) for sz in (-1, 1)) # build_draw_orders' keys, in file order
+VOX_RGBA_BYTES = 256 * 4
+LITTLE_ENDIAN = sys.byteorder == "little"
+
+def _magicavoxel_default_palette():
+    """MagicaVoxel's palette for files without an RGBA chunk, indexed like the file's colour indices (0 unused)."""
+    levels, ramp = (0xff, 0xcc, 0x99, 0x66, 0x33, 0x00), (0xee, 0xdd, 0xbb, 0xaa, 0x88, 0x77, 0x55, 0x44, 0x22, 0x11)
+    palette = [(0, 0, 0)] + [(r, g, b) for r in levels for g in levels for b in levels if (r, g, b) != (0, 0, 0)]
+    palette += [(v, 0, 0) for v in ramp] + [(0, v, 0) for v in ramp] + [(0, 0, v) for v in ramp] + [(v, v, v) for v in ramp]
+    return palette
+
+class VoxelModel:
+    """coords: flat int16 sequence x0,y0,z0,x1,... (an array, or a memoryview into a mapped file);
+    indices: one palette index byte per voxel; palette: list of (r, g, b)."""
+    def __init__(self, coords, indices, palette, source=None):
+        if len(coords) != 3 * len(indices): raise ValueError(f"{len(coords)} coordinates for {len(indices)} voxels")
+        self.coords, self.indices, self.palette, self.source = coords, indices, palette, source
+        self._mapping = None # Open mmap backing coords/indices, if any
+
+    def __len__(self):
+        return len(self.indices)
+
+    @property
+    def nbytes(self):
+        return 2 * len(self.coords) + len(self.indices) + 3 * len(self.palette)
+
+    @classmethod
+    def from_shape(cls, voxels_shape):
+        """Packs a list of (i, j, k, color) tuples; at most 256 distinct colours."""
+        palette, lookup = [], {}
+        for v in voxels_shape:
+            if v[3] not in lookup: lookup[v[3]] = len(palette); palette.append(tuple(v[3]))
+        if len(palette) > 256: raise ValueError(f"{len(palette)} colours do not fit a 256-entry palette")
+        ordered = sorted(voxels_shape, key=lambda v: (v[2], v[1], v[0]))
+        return cls(array.array("h", [c for v in ordered for c in v[:3]]), bytes(lookup[v[3]] for v in ordered), palette)
+
+    def to_shape(self):
+        """The (i, j, k, color) tuples the shape pipeline (voxel_shape) works on."""
+        c, palette = self.coords, self.palette
+        return [(c[3*n], c[3*n+1], c[3*n+2], palette[p]) for n, p in enumerate(self.indices)]
+
+    def bounds(self):
+        """((min_x, max_x), (min_y, max_y), (min_z, max_z)) of the voxel indices; None when empty."""
+        if not len(self): return None
+        c = self.coords
+        return tuple((min(c[axis::3]), max(c[axis::3])) for axis in range(3))
+
+    def centred(self):
+        """Copy translated so the bounding box is centred on the origin (to the nearest voxel); players rotate about it."""
+        if not len(self): return self
+        c = self.coords
+        shift = [round((low + high) / 2) for low, high in self.bounds()]
+        if shift == [0, 0, 0]: return self
+        return VoxelModel(array.array("h", [v - shift[n % 3] for n, v in enumerate(c)]), bytes(self.indices), self.palette, self.source)
+
+    def content_hash(self):
+        """Hex digest of the voxels and palette; the same model from a .vox or a .bvox hashes the same."""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(BVOX_HEADER.pack(BVOX_MAGIC, BVOX_VERSION, len(self.palette), len(self)))
+        h.update(bytes(c for rgb in self.palette for c in rgb))
+        coords = self.coords if LITTLE_ENDIAN else _swapped(self.coords)
+        h.update(memoryview(coords).cast("B")); h.update(self.indices)
+        return h.hexdigest()
+
+    def close(self):
+        """Releases the file mapping of a memory-mapped model; its arrays are unusable afterwards."""
+        if self._mapping is not None:
+            self.coords.release(); self.indices.release(); self._mapping.close(); self._mapping = None
+
+def _swapped(coords):
+    swapped = array.array("h", coords); swapped.byteswap()
+    return swapped
+
+def _sorted_model(xyz, indices, palette, source):
+    order = sorted(range(len(indices)), key=lambda n: (xyz[3*n+2], xyz[3*n+1], xyz[3*n]))
+    return VoxelModel(array.array("h", [xyz[3*n+axis] for n in order for axis in range(3)]), bytes(indices[n] for n in order), palette, source)
+
+def load_vox(path, model_index=0):
+    """Reads one model (by default the first) of a MagicaVoxel .vox file. Scene graph chunks (nTRN/nGRP/nSHP)
+    are ignored, so multi-model scenes are not assembled."""
+    with open(path, "rb") as f: data = f.read()
+    if data[:4] != b"VOX ": raise ValueError(f"{path}: not a MagicaVoxel .vox file")
+    models, rgba, pos = [], None, 8
+    while pos + 12 <= len(data): # MAIN's children follow its (empty) content, so one flat walk visits every chunk
+        chunk_id, content_size, _ = struct.unpack_from("<4sii", data, pos)
+        if content_size < 0 or pos + 12 + content_size > len(data): raise ValueError(f"{path}: truncated {chunk_id!r} chunk at byte {pos}")
+        content = data[pos+12:pos+12+content_size]
+        if chunk_id == b"XYZI":
+            count = struct.unpack_from("<i", content)[0] if content_size >= 4 else -1
+            if count < 0 or 4 + 4*count > content_size: raise ValueError(f"{path}: XYZI chunk at byte {pos} is too short for its voxels")
+            models.append(content[4:4+4*count])
+        elif chunk_id == b"RGBA":
+            if content_size < VOX_RGBA_BYTES: raise ValueError(f"{path}: RGBA chunk of {content_size} bytes, expected {VOX_RGBA_BYTES}")
+            rgba = content
+        pos += 12 + content_size
+    if model_index >= len(models): raise ValueError(f"{path}: has {len(models)} models, no model {model_index}")
+    packed = models[model_index]
+    if rgba is not None: palette = [(0, 0, 0)] + [tuple(rgba[4*n:4*n+3]) for n in range(255)] # File colour index c is RGBA entry c-1
+    else: palette = _magicavoxel_default_palette()
+    return _sorted_model([packed[n] for n in range(len(packed)) if n % 4 != 3], packed[3::4], palette, path)
+
+def save_bvox(model, path):
+    """Writes the native format: header, RGB palette, padding to an even offset, int16 coords, index bytes."""
+    palette_bytes = bytes(c for rgb in model.palette for c in rgb)
+    coords = model.coords if LITTLE_ENDIAN else _swapped(model.coords)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(BVOX_HEADER.pack(BVOX_MAGIC, BVOX_VERSION, len(model.palette), len(model)))
+        f.write(palette_bytes + b"\0" * (len(palette_bytes) % 2)) # int16 coords start 2-byte aligned
+        f.write(memoryview(coords).cast("B")); f.write(model.indices)
+    os.replace(tmp_path, path)
+
+def load_bvox(path, mmap_min_bytes=MMAP_MIN_BYTES):
+    """Reads a .bvox file. Files of at least mmap_min_bytes are memory-mapped: the model's coords and indices are
+    views into the mapping, so only the pages that are touched are ever read."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        mapped = size >= mmap_min_bytes and LITTLE_ENDIAN # Big-endian hosts swap bytes, so they need a copy anyway
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if mapped else f.read()
+    if size < BVOX_HEADER.size: raise ValueError(f"{path}: truncated ({size} bytes)")
+    magic, version, palette_count, count = BVOX_HEADER.unpack_from(data)
+    if magic != BVOX_MAGIC or version != BVOX_VERSION: raise ValueError(f"{path}: not a version {BVOX_VERSION} .bvox file")
+    coords_at = BVOX_HEADER.size + 3 * palette_count + (3 * palette_count) % 2
+    indices_at = coords_at + 6 * count
+    if size < indices_at + count: raise ValueError(f"{path}: truncated ({size} bytes, {count} voxels)")
+    palette = [tuple(data[BVOX_HEADER.size + 3*n:BVOX_HEADER.size + 3*n + 3]) for n in range(palette_count)]
+    view = memoryview(data)
+    if mapped:
+        model = VoxelModel(view[coords_at:indices_at].cast("h"), view[indices_at:indices_at + count], palette, path)
+        model._mapping = data
+        return model
+    coords = array.array("h"); coords.frombytes(view[coords_at:indices_at])
+    if not LITTLE_ENDIAN: coords.byteswap()
+    return VoxelModel(coords, bytes(view[indices_at:indices_at + count]), palette, path)
+
+def load_model(path):
+    """Loads a .vox or .bvox model by extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".vox": return load_vox(path)
+    if ext == ".bvox": return load_bvox(path)
+    raise ValueError(f"{path}: unknown voxel model format {ext!r} (expected .vox or .bvox)")
+
+# --- Derived data cache ---
+# LOD shells, face masks and draw orders take a few passes over every voxel; for a model loaded from a file they
+# are stored beside it as <model>.derived. The file starts with the key it was built for (content hash, derived
+# format version and parameters) and is rebuilt when the key no longer matches. Like .bvox, the payload is plain
+# little-endian arrays (per level: a DERIVED_LEVEL header, coordinates, RGB bytes, face mask bytes, then one
+# uint32 draw order per octant), so a cache file shared along with a model is only ever read as data.
+def derived_cache_path(model_path):
+    return model_path + ".derived"
+
+def derive_lods(model, max_levels):
+    """[(shell_shape, face_masks, voxel_size, draw_orders)] for each level of the model's LOD pyramid, finest first.
+    Draw orders are compact unsigned int arrays of indices into the level's shell."""
+    return [(shell, masks, voxel_size, {octant: array.array("I", order) for octant, order in build_draw_orders(shell).items()})
+            for shell, masks, voxel_size in build_lod_pyramid(model.to_shape(), max_levels)]
+
+def _array_bytes(values, typecode):
+    a = array.array(typecode, values)
+    if not LITTLE_ENDIAN: a.byteswap()
+    return memoryview(a).cast("B")
+
+def _read_array(data, pos, typecode, count):
+    """(array of count items read from data at pos, position after it)."""
+    a = array.array(typecode)
+    end = pos + a.itemsize * count
+    if end > len(data): raise ValueError("truncated")
+    a.frombytes(data[pos:end])
+    if not LITTLE_ENDIAN: a.byteswap()
+    return a, end
+
+def _write_derived(f, levels):
+    f.write(struct.pack("<I", len(levels)))
+    for shell, masks, voxel_size, orders in levels:
+        typecode = "h" if all(type(c) is int for v in shell for c in v[:3]) else "d" # Level 0 keeps the model's integer grid
+        f.write(DERIVED_LEVEL.pack(len(shell), voxel_size, typecode.encode()))
+        f.write(_array_bytes([c for v in shell for c in v[:3]], typecode))
+        f.write(bytes(c for v in shell for c in v[3])); f.write(bytes(masks))
+        for octant in DERIVED_OCTANTS: f.write(_array_bytes(orders[octant], "I"))
+
+def _read_derived(data):
+    """Levels written by _write_derived; raises ValueError on anything inconsistent."""
+    if len(data) < 4: raise ValueError("truncated")
+    (level_count,), pos, levels = struct.unpack_from("<I", data), 4, []
+    for _ in range(level_count):
+        if pos + DERIVED_LEVEL.size > len(data): raise ValueError("truncated")
+        count, voxel_size, typecode = DERIVED_LEVEL.unpack_from(data, pos); pos += DERIVED_LEVEL.size
+        if typecode not in (b"h", b"d"): raise ValueError(f"unknown coordinate type {typecode!r}")
+        coords, pos = _read_array(data, pos, typecode.decode(), 3 * count)
+        if pos + 4 * count > len(data): raise ValueError("truncated")
+        rgb, masks = data[pos:pos + 3*count], list(data[pos + 3*count:pos + 4*count]); pos += 4 * count
+        colors = {}
+        shell = [(coords[3*n], coords[3*n+1], coords[3*n+2], colors.setdefault(rgb[3*n:3*n+3], tuple(rgb[3*n:3*n+3]))) for n in range(count)]
+        orders = {}
+        for octant in DERIVED_OCTANTS:
+            orders[octant], pos = _read_array(data, pos, "I", count)
+            if count and max(orders[octant]) >= count: raise ValueError("draw order index out of range")
+        levels.append((shell, masks, voxel_size, orders))
+    if pos != len(data): raise ValueError(f"{len(data) - pos} trailing bytes")
+    return levels
+
+def load_derived_lods(model, max_levels, cache_path=None):
+    """derive_lods() through the on-disk cache at cache_path (no caching when None). Returns (levels, cache_hit)."""
+    if cache_path is None: return derive_lods(model, max_levels), False
+    key = f"{model.content_hash()}-v{DERIVED_VERSION}-levels{max_levels}".encode()
+    try:
+        with open(cache_path, "rb") as f:
+            if f.read(len(DERIVED_MAGIC)) == DERIVED_MAGIC and f.readline().rstrip(b"\n") == key: return _read_derived(f.read()), True
+    except (OSError, ValueError, struct.error) as e:
+        if not isinstance(e, FileNotFoundError): print(f"Voxel model: ignoring unreadable cache {cache_path}: {e}")
+    levels = derive_lods(model, max_levels)
+    try:
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(DERIVED_MAGIC + key + b"\n"); _write_derived(f, levels)
+        os.replace(tmp_path, cache_path)
+    except OSError as e: print(f"Voxel model: could not write cache {cache_path}: {e}") # e.g. a read-only model folder
+    return levels, False
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect voxel models or convert them to the native .bvox format.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    info = sub.add_parser("info", help="Voxel count, bounds, memory and LOD build time of a model")
+    info.add_argument("model"); info.add_argument("--levels", type=int, default=3, help="LOD levels to derive")
+    convert = sub.add_parser("convert", help="Write a .vox or .bvox model as .bvox")
+    convert.add_argument("src"); convert.add_argument("dst")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        model = load_model(args.src); save_bvox(model, args.dst)
+        print(f"{args.src}: {len(model)} voxels -> {args.dst} ({os.path.getsize(args.dst)} bytes)")
+        return
+    start = time.perf_counter(); model = load_model(args.model); load_ms = (time.perf_counter() - start) * 1000.0
+    bounds = " ".join(f"{low}..{high}" for low, high in model.bounds()) if len(model) else "empty"
+    tuples_mb = sum(sys.getsizeof(v) for v in model.to_shape()[:1000]) / max(1, min(1000, len(model))) * len(model) / 1e6 # Sampled
+    print(f"{args.model}: {len(model)} voxels, {len(model.palette)} palette entries, bounds x/y/z {bounds}, loaded in {load_ms:.1f} ms"
+          + (" (memory-mapped)" if model._mapping is not None else ""))
+    print(f"  packed {model.nbytes / 1e6:.2f} MB vs about {tuples_mb:.2f} MB as (i, j, k, color) tuples; content hash {model.content_hash()}")
+    for label, cache_path in (("build", None), ("cached", derived_cache_path(args.model))):
+        start = time.perf_counter(); levels, hit = load_derived_lods(model.centred(), args.levels, cache_path) # Centred, as the game loads it
+        print(f"  LODs {label}{' (hit)' if hit else ''}: {(time.perf_counter() - start) * 1000.0:.1f} ms, shell voxels per level "
+              + ", ".join(str(len(shell)) for shell, _, _, _ in levels))
+
+if __name__ == "__main__":
+    main()
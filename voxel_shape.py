@@ -0,0 +1,86 @@
+# voxel_shape.py
+# Build-time processing of voxel shapes: lists of (i, j, k, color) tuples on an integer grid.
+# Kept free of pygame so it can be used by headless tools.
+
+# Face order is shared with the renderer (voxel.FACE_NORMALS); bit n of a face mask refers to FACE_KEYS[n].
+FACE_NORMALS = {"iso_top":(0,0,1),"iso_bottom":(0,0,-1),"iso_left_side":(-1,0,0),"iso_right_side":(1,0,0),"iso_front_side":(0,1,0),"iso_back_side":(0,-1,0)}
+FACE_KEYS = tuple(FACE_NORMALS.keys())
+ALL_FACES_MASK = (1 << len(FACE_KEYS)) - 1
+
+def build_sphere_shape(radius, color):
+    """Solid voxel sphere of the given integer radius, sorted by (z, y, x)."""
+    shape = []
+    for i in range(-radius, radius+1):
+        for j in range(-radius, radius+1):
+            for k in range(-radius, radius+1):
+                if (i+0.5)**2+(j+0.5)**2+(k+0.5)**2 <= radius**2*1.05: shape.append((i,j,k,color))
+    shape.sort(key=lambda v:(v[2],v[1],v[0]))
+    return shape
+
+def compute_face_masks(voxels_shape):
+    """Bitmask per voxel of the faces that border empty space (bit n = FACE_KEYS[n])."""
+    occupied = {(v[0],v[1],v[2]) for v in voxels_shape}
+    masks = []
+    for v in voxels_shape:
+        mask = 0
+        for bit, (nx,ny,nz) in enumerate(FACE_NORMALS.values()):
+            if (v[0]+nx, v[1]+ny, v[2]+nz) not in occupied: mask |= 1 << bit
+        masks.append(mask)
+    return masks
+
+def extract_shell(voxels_shape):
+    """Drops fully enclosed voxels. Returns (shell_shape, face_masks) with masks aligned to shell_shape."""
+    shell_shape, shell_masks = [], []
+    for v, mask in zip(voxels_shape, compute_face_masks(voxels_shape)):
+        if mask: shell_shape.append(v); shell_masks.append(mask)
+    return shell_shape, shell_masks
+
+def view_octant(local_view_dir):
+    """Sign pattern (sx, sy, sz) of a view direction (pointing towards the viewer) in shape-local coordinates."""
+    return tuple(1 if c >= 0 else -1 for c in local_view_dir)
+
+def build_draw_orders(voxels_shape):
+    """Back-to-front (painter's) index orders into voxels_shape, one per view octant.
+
+    For axis-aligned cubes on a grid under a parallel projection, walking each axis away from the viewer
+    (z slabs, then y rows, then x) never draws a voxel after one it occludes, so the order only depends on
+    which octant the local view direction falls in.
+    """
+    orders = {}
+    for sx in (-1,1):
+        for sy in (-1,1):
+            for sz in (-1,1):
+                orders[(sx,sy,sz)] = sorted(range(len(voxels_shape)), key=lambda n: (sz*voxels_shape[n][2], sy*voxels_shape[n][1], sx*voxels_shape[n][0]))
+    return orders
+
+def downsample_shape(voxels_shape, min_fill=0.5):
+    """Halves the resolution of a solid shape: each 2x2x2 block of voxels becomes one voxel at the block's index,
+    kept when at least min_fill of its cells are occupied and coloured by their average. Sorted by (z, y, x)."""
+    blocks = {}
+    for i, j, k, color in voxels_shape: blocks.setdefault((i//2, j//2, k//2), []).append(color)
+    shape = [(i, j, k, tuple(sum(c[n] for c in colors) // len(colors) for n in range(3)))
+             for (i, j, k), colors in blocks.items() if len(colors) >= 8 * min_fill]
+    shape.sort(key=lambda v:(v[2],v[1],v[0]))
+    return shape
+
+def build_lod_pyramid(voxels_shape, max_levels=3, min_voxels=8):
+    """Level-of-detail pyramid of a solid shape: level 0 is the shape itself, each further level halves the
+    resolution of the one before, until max_levels extra levels or a level would have fewer than min_voxels voxels.
+    Returns [(shell_shape, face_masks, voxel_size)] where voxel_size is a level voxel's edge in level-0 voxels and
+    shell coordinates are voxel centres in level-0 units, shifted so every level keeps the shape's bounding-box
+    centre (an odd-sized shape cannot be split into 2x2x2 blocks symmetrically)."""
+    def bbox_centre(shape, size, offset):
+        return [(min(v[n] for v in shape) + max(v[n] for v in shape)) * size / 2 + offset for n in range(3)]
+    levels, level_shape, size = [], voxels_shape, 1
+    centre = bbox_centre(voxels_shape, 1, 0.0)
+    while True:
+        offset = (size - 1) / 2 # Centre of block index 0 in level-0 units
+        shift = [c - l for c, l in zip(centre, bbox_centre(level_shape, size, offset))]
+        shell, masks = extract_shell(level_shape)
+        if size == 1: levels.append((shell, masks, 1))
+        else: levels.append(([(i*size+offset+shift[0], j*size+offset+shift[1], k*size+offset+shift[2], color) for i, j, k, color in shell], masks, size))
+        if len(levels) > max_levels: break
+        level_shape = downsample_shape(level_shape)
+        if len(level_shape) < min_voxels: break
+        size *= 2
+    return levels
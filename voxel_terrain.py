@@ -0,0 +1,170 @@
+# voxel_terrain.py
+# Chunked sparse voxel terrain. Chunks of CHUNK_SIZE^3 voxels are kept in a dict keyed by chunk coordinate, each
+# storing one material byte per voxel (0 = empty) in a bytearray; chunks with no solid voxels are not stored.
+# Chunks are greedy-meshed on demand into merged rectangular faces, cached until the chunk or a neighbour whose
+# faces it borders is edited. Voxel (x, y, z) fills [x, x+1) x [y, y+1) x [z, z+1). No pygame dependency, so the
+# physics and headless tools can query it.
+import math
+
+CHUNK_SIZE = 16
+EMPTY = 0
+# Faces the fixed isometric camera can see, with the axis their normal points along (+1). The other three never
+# face the viewer, so they are never meshed. Only top faces are merged; see chunk_mesh() for why.
+MESH_FACES = (("iso_top", 2, True), ("iso_right_side", 0, False), ("iso_front_side", 1, False))
+
+class TerrainChunk:
+    __slots__ = ("coord", "blocks", "solid_count", "mesh")
+    def __init__(self, coord, size):
+        self.coord = coord
+        self.blocks = bytearray(size ** 3) # Index x + S*y + S*S*z in chunk-local coordinates
+        self.solid_count = 0
+        self.mesh = None # [(corners, material, face key)], built by VoxelTerrain.chunk_mesh()
+
+class VoxelTerrain:
+    def __init__(self, palette=(), chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.palette = [None] + [tuple(c) for c in palette] # Material id -> base colour; id 0 is empty
+        self.chunks = {}
+        self.min_chunk_z = self.max_chunk_z = None # Chunk layers that hold anything; column scans stay between them
+        self.version = 0 # Bumped by every edit
+        self.meshes_built = 0
+
+    def get(self, x, y, z):
+        S = self.chunk_size
+        chunk = self.chunks.get((x // S, y // S, z // S))
+        return chunk.blocks[x % S + S * (y % S) + S * S * (z % S)] if chunk is not None else EMPTY
+
+    def set(self, x, y, z, material):
+        self.fill_box(x, y, z, x + 1, y + 1, z + 1, material)
+
+    def fill_box(self, x0, y0, z0, x1, y1, z1, material):
+        """Sets every voxel in [x0, x1) x [y0, y1) x [z0, z1) to material, a row slice per chunk at a time."""
+        if x0 >= x1 or y0 >= y1 or z0 >= z1: return
+        S = self.chunk_size
+        row = bytes((material,)) * S
+        touched = set()
+        for z in range(z0, z1):
+            for y in range(y0, y1):
+                for cx in range(x0 // S, (x1 - 1) // S + 1):
+                    coord = (cx, y // S, z // S)
+                    chunk = self.chunks.get(coord)
+                    if chunk is None:
+                        if material == EMPTY: continue
+                        chunk = self.chunks[coord] = TerrainChunk(coord, S)
+                    lx0, lx1 = max(x0 - cx * S, 0), min(x1 - cx * S, S)
+                    base = S * (y % S) + S * S * (z % S)
+                    chunk.blocks[base + lx0:base + lx1] = row[:lx1 - lx0]
+                    touched.add(coord)
+        for coord in touched:
+            chunk = self.chunks[coord]
+            chunk.solid_count = len(chunk.blocks) - chunk.blocks.count(EMPTY)
+            if chunk.solid_count == 0: del self.chunks[coord]
+        # Meshes that can change: the edited chunks, plus the -x/-y/-z neighbours whose boundary faces they cover
+        for cx, cy, cz in touched:
+            for coord in ((cx, cy, cz), (cx - 1, cy, cz), (cx, cy - 1, cz), (cx, cy, cz - 1)):
+                chunk = self.chunks.get(coord)
+                if chunk is not None: chunk.mesh = None
+        self.min_chunk_z = min((cz for _, _, cz in self.chunks), default=None)
+        self.max_chunk_z = max((cz for _, _, cz in self.chunks), default=None)
+        self.version += 1
+
+    def surface_z_below(self, x, y, z):
+        """Top of the highest solid voxel in the column containing (x, y) whose top is at or below z (which may be
+        math.inf), or None."""
+        S = self.chunk_size
+        if self.min_chunk_z is None: return None
+        ix, iy = math.floor(x), math.floor(y)
+        iz = math.floor(z) - 1 if z < (self.max_chunk_z + 1) * S else (self.max_chunk_z + 1) * S - 1
+        lx, ly = ix % S, iy % S
+        column_offset = lx + S * ly
+        for cz in range(iz // S, self.min_chunk_z - 1, -1):
+            chunk = self.chunks.get((ix // S, iy // S, cz))
+            if chunk is None: continue
+            blocks = chunk.blocks
+            for lz in range(min(S - 1, iz - cz * S), -1, -1):
+                if blocks[column_offset + S * S * lz]: return cz * S + lz + 1
+        return None
+
+    def _slice(self, chunk, axis, d):
+        """The S*S voxels of chunk at local coordinate d along axis, ordered (a fastest, then b) over the other two
+        axes in x, y, z order. A missing chunk reads as empty."""
+        S = self.chunk_size
+        if chunk is None: return bytes(S * S)
+        blocks = chunk.blocks
+        if axis == 2: return blocks[S * S * d:S * S * (d + 1)]
+        if axis == 0: return blocks[d::S]
+        return b"".join(blocks[S * S * z + S * d:S * S * z + S * d + S] for z in range(S))
+
+    def chunk_mesh(self, chunk):
+        """Greedy mesh of the chunk's camera-facing faces: [(four world-space corners, material, face key)] in
+        back-to-front order for the isometric view. A face is kept where a solid voxel borders empty space, and
+        equal-material top faces in a slice merge into rectangles.
+        Ordering: whatever hides a point lies strictly further along +x, +y and +z from it (the view direction is
+        (1, 1, 1)), so drawing by lowest z, tops before sides at equal z, is exact as long as side faces are one voxel
+        tall. Side faces therefore stay unit squares, ordered among themselves by voxel depth x + y. Across chunks,
+        drawing chunks by ascending cx + cy + cz keeps this order, since an occluder's chunk is >= on every axis."""
+        if chunk.mesh is not None: return chunk.mesh
+        S = self.chunk_size
+        cx, cy, cz = chunk.coord
+        origin = (cx * S, cy * S, cz * S)
+        quads = []
+        for face_key, axis, merge in MESH_FACES:
+            a_axis, b_axis = [i for i in range(3) if i != axis]
+            step = [0, 0, 0]; step[axis] = 1
+            beyond = self.chunks.get((cx + step[0], cy + step[1], cz + step[2]))
+            for d in range(S):
+                layer = self._slice(chunk, axis, d)
+                if not any(layer): continue
+                cover = self._slice(chunk, axis, d + 1) if d + 1 < S else self._slice(beyond, axis, 0)
+                mask = [m if m and not c else 0 for m, c in zip(layer, cover)]
+                plane = origin[axis] + d + 1
+                for b in range(S):
+                    a = 0
+                    while a < S:
+                        m = mask[a + S * b]
+                        if not m: a += 1; continue
+                        w = h = 1
+                        if merge:
+                            while a + w < S and mask[a + w + S * b] == m: w += 1
+                            while b + h < S and all(mask[a + k + S * (b + h)] == m for k in range(w)): h += 1
+                        for bb in range(b, b + h): mask[a + S * bb:a + w + S * bb] = [0] * w
+                        corners = []
+                        for ca, cb in ((a, b), (a + w, b), (a + w, b + h), (a, b + h)):
+                            p = [0, 0, 0]; p[axis] = plane; p[a_axis] = origin[a_axis] + ca; p[b_axis] = origin[b_axis] + cb
+                            corners.append(tuple(p))
+                        quads.append((corners, m, face_key))
+                        a += w
+        quads.sort(key=lambda q: (min(c[2] for c in q[0]), q[2] != "iso_top", min(c[0] + c[1] for c in q[0])))
+        chunk.mesh = quads; self.meshes_built += 1
+        return quads
+
+    def chunk_bounds(self, coord):
+        """World-space box (min corner, max corner) of a chunk."""
+        S = self.chunk_size
+        return tuple(c * S for c in coord), tuple(c * S + S for c in coord)
+
+def build_heightfield_terrain(half_extent, top_z, hill_height, material_colors, chunk_size=CHUNK_SIZE, base_depth=2):
+    """Terrain over [-half_extent, half_extent)^2 whose surface is at top_z, raised by rolling hills up to
+    hill_height voxels. material_colors: (soil, surface) base colours; the top voxel of each column is surface."""
+    terrain = VoxelTerrain(material_colors, chunk_size)
+    soil, surface = 1, 2
+    bottom = top_z - base_depth
+    def column_top(x, y):
+        if hill_height <= 0: return top_z
+        bump = 0.5 + 0.25 * (math.sin(x * 0.11) + math.cos(y * 0.13)) # 0..1, smooth
+        return top_z + int(round(hill_height * bump * bump))
+    tops = {(x, y): column_top(x, y) for y in range(-half_extent, half_extent) for x in range(-half_extent, half_extent)}
+    for z in range(bottom, top_z + max(0, hill_height) + 1):
+        for y in range(-half_extent, half_extent):
+            x = -half_extent
+            while x < half_extent: # Runs of equal material along x become one fill_box each
+                top = tops[(x, y)]
+                material = EMPTY if z >= top else (surface if z == top - 1 else soil)
+                run_end = x + 1
+                while run_end < half_extent:
+                    t = tops[(run_end, y)]
+                    if (EMPTY if z >= t else (surface if z == t - 1 else soil)) != material: break
+                    run_end += 1
+                if material != EMPTY: terrain.fill_box(x, y, z, run_end, y + 1, z + 1, material)
+                x = run_end
+    return terrain
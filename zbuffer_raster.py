@@ -0,0 +1,124 @@
+# zbuffer_raster.py
+# NumPy depth-buffered rasterizer for instanced voxel faces.
+# Every voxel face with the same orientation projects to the same parallelogram, so each face template is
+# rasterized once per frame and then stamped at every voxel's projected centre. Fragments are depth-tested
+# into a depth buffer, which is expanded to colour and pushed into a pygame surface in one pass.
+import numpy as np
+import pygame
+
+TEMPLATE_EDGE_TOLERANCE = 0.75 # Pixels; slight dilation hides cracks from snapping voxel centres to whole pixels
+
+def rasterize_face_template(corners_2d, corners_depth, tolerance=TEMPLATE_EDGE_TOLERANCE):
+    """Pixel offsets covered by a convex quad centred near (0, 0).
+
+    corners_2d is (4,2) screen offsets, corners_depth the depth (larger = nearer the viewer) at each corner.
+    Returns (dx, dy, ddepth) int/int/float arrays, with depth interpolated across the face plane.
+    """
+    corners_2d = np.asarray(corners_2d, dtype=float)
+    edges = np.roll(corners_2d, -1, axis=0) - corners_2d
+    lengths = np.hypot(edges[:,0], edges[:,1])
+    if not (lengths > 1e-9).all(): return np.zeros(0, int), np.zeros(0, int), np.zeros(0)
+    x0, y0 = np.floor(corners_2d.min(axis=0) - tolerance).astype(int)
+    x1, y1 = np.ceil(corners_2d.max(axis=0) + tolerance).astype(int)
+    gx, gy = np.meshgrid(np.arange(x0, x1+1), np.arange(y0, y1+1), indexing="xy")
+    px, py = gx.ravel().astype(float), gy.ravel().astype(float)
+
+    # Signed distance of every pixel to every edge, made winding-independent with the polygon's area sign
+    cross = edges[:,0][:,None]*(py[None,:]-corners_2d[:,1][:,None]) - edges[:,1][:,None]*(px[None,:]-corners_2d[:,0][:,None])
+    winding = np.sign(np.sum(corners_2d[:,0]*np.roll(corners_2d[:,1], -1) - np.roll(corners_2d[:,0], -1)*corners_2d[:,1])) or 1.0
+    inside = ((winding * cross) / lengths[:,None] >= -tolerance).all(axis=0)
+    px, py = px[inside], py[inside]
+
+    # Depth is affine across the face: fit d = a*x + b*y + c through the corners
+    design = np.column_stack((corners_2d, np.ones(len(corners_2d))))
+    coeffs = np.linalg.lstsq(design, np.asarray(corners_depth, dtype=float), rcond=None)[0]
+    return px.astype(int), py.astype(int), coeffs[0]*px + coeffs[1]*py + coeffs[2]
+
+DEPTH_SCALE = 4096.0   # Depth quantization steps per world unit
+PALETTE_BITS = 24      # Low bits of a depth key hold the fragment's palette index
+EMPTY_KEY = np.iinfo(np.int64).min
+
+class ZBuffer:
+    """Depth buffer for one render target, packed with colour.
+
+    Each pixel holds an int64 key: quantized depth (larger = nearer) in the high bits and an index into this
+    frame's colour palette in the low bits, so a single np.maximum.at both depth-tests and picks the colour.
+    present() expands the touched region into an RGB colour buffer and writes it into a surface in one pass.
+    The key buffer only ever grows (see fit), so targets of changing size, such as sprites, reuse one allocation.
+    """
+    def __init__(self, width, height):
+        self.width, self.height = width, height # Current target size: the top-left region of the key buffer in use
+        self.stride, self.rows = width, height # Allocated key buffer size
+        self.keys = np.full(width * height, EMPTY_KEY, dtype=np.int64)
+        self.palette, self.palette_size = [], 0
+        self.dirty = None # (x0, y0, x1, y1), exclusive max
+        self.fragments_drawn = 0
+        self.allocations = 1
+
+    def fit(self, width, height):
+        """Clears and targets a width x height surface; reallocates only when it is larger than the buffer."""
+        self.clear()
+        if width > self.stride or height > self.rows:
+            self.stride, self.rows = max(width, self.stride), max(height, self.rows)
+            self.keys = np.full(self.stride * self.rows, EMPTY_KEY, dtype=np.int64)
+            self.allocations += 1
+        self.width, self.height = width, height
+
+    def clear(self):
+        if self.dirty is not None:
+            x0, y0, x1, y1 = self.dirty
+            self.keys.reshape(self.rows, self.stride)[y0:y1, x0:x1] = EMPTY_KEY
+        self.palette, self.palette_size = [], 0
+        self.dirty = None; self.fragments_drawn = 0
+
+    def draw_instances(self, centers_2d, centers_depth, batches):
+        """Depth-tests stamped face templates into the buffer.
+
+        centers_2d (N,2) projected instance centres and centers_depth (N,) their depths. batches is a list of
+        (instance_idx, (dx, dy, ddepth), colors) with colors an (len(instance_idx),3) array.
+        """
+        base = np.rint(centers_2d).astype(np.int64)
+        depth_q = (centers_depth * DEPTH_SCALE).astype(np.int64)
+        for instance_idx, (dx, dy, ddepth), colors in batches:
+            if len(instance_idx) == 0 or len(dx) == 0: continue
+            if self.palette_size + len(instance_idx) >= 1 << PALETTE_BITS: raise ValueError("ZBuffer palette overflow; clear() between frames")
+            bx, by = base[instance_idx,0], base[instance_idx,1]
+            # Per-instance and per-template parts of each fragment's flat index and key; one add per fragment combines them
+            instance_keys = (depth_q[instance_idx] << PALETTE_BITS) | (self.palette_size + np.arange(len(instance_idx)))
+            template_keys = (ddepth * DEPTH_SCALE).astype(np.int64) << PALETTE_BITS
+            self.palette.append(np.asarray(colors, dtype=np.uint8).reshape(-1,3)); self.palette_size += len(instance_idx)
+            on_target = (bx + dx.min() >= 0) & (bx + dx.max() < self.width) & (by + dy.min() >= 0) & (by + dy.max() < self.height)
+            if on_target.all():
+                flat = ((by*self.stride + bx)[:,None] + (dy*self.stride + dx)[None,:]).ravel()
+                frag_keys = (instance_keys[:,None] + template_keys[None,:]).ravel()
+            else: # Some instances straddle the edge: clip fragment by fragment
+                xs, ys = (bx[:,None] + dx[None,:]).ravel(), (by[:,None] + dy[None,:]).ravel()
+                inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+                flat = ys[inside]*self.stride + xs[inside]
+                frag_keys = (instance_keys[:,None] + template_keys[None,:]).ravel()[inside]
+            if len(flat) == 0: continue
+            np.maximum.at(self.keys, flat, frag_keys)
+            self.fragments_drawn += len(flat)
+            x_lo, x_hi = max(0, int(bx.min() + dx.min())), min(self.width, int(bx.max() + dx.max()) + 1)
+            y_lo, y_hi = max(0, int(by.min() + dy.min())), min(self.height, int(by.max() + dy.max()) + 1)
+            box = (x_lo, y_lo, x_hi, y_hi)
+            self.dirty = box if self.dirty is None else (min(self.dirty[0], box[0]), min(self.dirty[1], box[1]), max(self.dirty[2], box[2]), max(self.dirty[3], box[3]))
+
+    def present(self, surf):
+        """Writes every covered pixel inside surf's clip rect into surf (the size last passed to fit) through a pixels3d view."""
+        if self.dirty is None: return
+        x0, y0, x1, y1 = self.dirty
+        clip = surf.get_clip()
+        x0, y0, x1, y1 = max(x0, clip.left), max(y0, clip.top), min(x1, clip.right), min(y1, clip.bottom)
+        if x0 >= x1 or y0 >= y1: return
+        region = self.keys.reshape(self.rows, self.stride)[y0:y1, x0:x1]
+        ys, xs = np.nonzero(region != EMPTY_KEY)
+        color = np.concatenate(self.palette)[region[ys, xs] & ((1 << PALETTE_BITS) - 1)]
+        xs += x0; ys += y0
+        view = pygame.surfarray.pixels3d(surf) # (width, height, 3), locks surf until released
+        view[xs, ys] = color
+        del view
+        if surf.get_flags() & pygame.SRCALPHA:
+            alpha = pygame.surfarray.pixels_alpha(surf)
+            alpha[xs, ys] = 255
+            del alpha